@@ -4,8 +4,8 @@ import re
 import json
 import time
 import uuid
-import joblib
-import pandas as pd
+import logging
+import threading
 from typing import Dict, List, Optional, Any
 
 from fastapi import FastAPI, HTTPException
@@ -14,36 +14,38 @@ from pydantic import BaseModel, Field
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from session_store import SessionStore, create_session_store
+from loan_services.education_loan import EducationLoanService
+from logging_config import configure_logging
+
 # Load environment variables
 load_dotenv()
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # ---------- Config ----------
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # set this in your env
 if not OPENAI_API_KEY:
-    print("Warning: OPENAI_API_KEY not set. OpenAI features will be disabled.")
+    logger.warning("OPENAI_API_KEY not set. OpenAI features will be disabled.")
     client = None
 else:
     client = OpenAI(api_key=OPENAI_API_KEY)
 
 MODEL_PATH = "models/education _loan_models"
-MODEL_FILES = {
-    "xgb_loan": os.path.join(MODEL_PATH, "xgb_loan_amount_v2.pkl"),
-    "xgb_interest": os.path.join(MODEL_PATH, "xgb_interest_rate_v2.pkl"),
-    "encoders": os.path.join(MODEL_PATH, "encoders_v2.pkl"),
-    "scaler": os.path.join(MODEL_PATH, "scaler_v2.pkl"),
-}
-
-# ---------- Load models at startup ----------
-try:
-    xgb_loan = joblib.load(MODEL_FILES["xgb_loan"])
-    xgb_interest = joblib.load(MODEL_FILES["xgb_interest"])
-    encoders: Dict[str, Any] = joblib.load(MODEL_FILES["encoders"])
-    scaler = joblib.load(MODEL_FILES["scaler"])
-    print("All model files loaded successfully")
-except Exception as e:
-    print(f"Warning: Failed to load model artifacts: {e}")
-    print("Model prediction features will be disabled until model files are available")
-    xgb_loan = xgb_interest = encoders = scaler = None
+
+# ---------- Models (shared EducationLoanService, loaded on first use or by the startup warm-up) ----------
+# Going through the service means this app reads the same native artifacts as loan_app
+# and keeps a single copy of the education models instead of its own pickles.
+education_service = EducationLoanService(MODEL_PATH, lazy=True)
+
+def load_models():
+    """Load the model artifacts once; later calls return immediately"""
+    started = time.perf_counter()
+    education_service.ensure_models_loaded()
+    if education_service.scorer is None:
+        logger.warning("Education model artifacts unavailable; prediction features are disabled")
+    else:
+        logger.info("Education models ready in %.2fs", time.perf_counter() - started)
 
 # ---------- FastAPI app ----------
 app = FastAPI(title="Education Loan Chatbot API", version="1.0.0")
@@ -57,8 +59,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ---------- In-memory session store ----------
-SESSIONS: Dict[str, Dict[str, Any]] = {}
+# ---------- Session store ----------
+SESSIONS: SessionStore = create_session_store(system_prompt_for=lambda state: SYSTEM_PROMPT)
+
+@app.on_event("shutdown")
+def close_session_store():
+    SESSIONS.close()
+
+@app.on_event("startup")
+def warm_up_models():
+    # MODEL_WARMUP=all (or education) preloads in the background instead of on the first prediction
+    if os.getenv("MODEL_WARMUP", "").strip().lower() in ("all", "education"):
+        threading.Thread(target=load_models, name="model-warmup", daemon=True).start()
 
 # ---------- Domain logic ----------
 REQUIRED_FIELDS = [
@@ -102,49 +114,11 @@ Guidelines:
 Start by introducing yourself and asking about their educational plans.
 """
 
-def repayment_capacity(income: float, networth: float, cibil: float) -> float:
-    return (income * 4) + (networth * 0.05) + (cibil / 2)
-
-def predict_loan(user_input: Dict[str, Any]):
-    # computed feature
-    user_input["Repayment_Capacity"] = repayment_capacity(
-        user_input["Coapplicant_Income"],
-        user_input["Guarantor_Networth"],
-        user_input["CIBIL_Score"]
-    )
-
-    # encode categoricals
-    for col in ["Academic_Performance", "Intended_Course", "University_Tier", "Loan_Type"]:
-        if col not in encoders:
-            raise ValueError(f"Encoder for {col} not found.")
-        user_input[col] = encoders[col].transform([user_input[col]])[0]
-
-    # features & scaling
-    features = [
-        "Age", "Academic_Performance", "Intended_Course", "University_Tier",
-        "Coapplicant_Income", "Guarantor_Networth", "CIBIL_Score",
-        "Loan_Type", "Repayment_Capacity", "Loan_Term"
-    ]
-
-    X = pd.DataFrame([{k: user_input[k] for k in features}])
-    numeric_cols = ["Age", "Coapplicant_Income", "Guarantor_Networth", "CIBIL_Score", "Repayment_Capacity", "Loan_Term"]
-    X[numeric_cols] = scaler.transform(X[numeric_cols])
-
-    loan_amt = xgb_loan.predict(X)[0]
-    interest = xgb_interest.predict(X)[0]
-    return round(float(loan_amt)), round(float(interest), 2)
-
-def extract_info_from_response(user_text: str, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
-    if not client:
-        return {}  # Return empty dict if OpenAI client not available
-        
-    extraction_prompt = f"""
+# Same for every extraction request, so it goes first and OpenAI can cache it;
+# the conversation snippet and the user's message are appended after it
+EXTRACTION_INSTRUCTIONS = """
 Based on the conversation history and the user's latest response, extract any loan-related information.
 
-Conversation so far: {conversation[-3:] if len(conversation) > 3 else conversation}
-
-User's latest response: "{user_text}"
-
 Extract information for these fields (only if mentioned):
 - Age: number (18-100)
 - Academic_Performance: exactly one of ["Excellent","Good","Average","Poor"]
@@ -157,23 +131,40 @@ Extract information for these fields (only if mentioned):
 - Loan_Term: number (years, typically 1-20)
 - Expected_Loan_Amount: number in INR
 
-Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {{}}.
-Example: {{"Age": 25, "Academic_Performance": "Good", "Coapplicant_Income": 500000}}
+Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {}.
+Example: {"Age": 25, "Academic_Performance": "Good", "Coapplicant_Income": 500000}
 """.strip()
 
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": extraction_prompt}],
-            temperature=0
+def predict_loan(user_input: Dict[str, Any]):
+    return education_service.predict_loan(user_input)
+
+def extract_info_from_response(user_text: str, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
+    def ask_openai() -> Optional[Dict[str, Any]]:
+        extraction_prompt = (
+            f"{EXTRACTION_INSTRUCTIONS}\n\n"
+            f"Conversation so far: {conversation[-3:] if len(conversation) > 3 else conversation}\n\n"
+            f'User\'s latest response: "{user_text}"'
         )
-        extracted_text = resp.choices[0].message.content.strip()
-        m = re.search(r"\{.*\}", extracted_text, re.DOTALL)
-        if m:
-            return json.loads(m.group())
-        return {}
-    except Exception:
-        return {}
+        try:
+            resp = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": extraction_prompt}],
+                temperature=0
+            )
+            education_service.extraction_usage.record(resp)
+            m = re.search(r"\{.*\}", resp.choices[0].message.content.strip(), re.DOTALL)
+            return json.loads(m.group()) if m else None
+        except Exception:
+            return None
+
+    # Same regex rules as the multi-loan app's education service; short answers they
+    # are confident about don't need an OpenAI call, and OpenAI calls show up in
+    # /admin/extraction
+    extracted = education_service.route_extraction(user_text, conversation, ask_openai if client else None)
+    if "Academic_Score" in extracted:
+        score = float(extracted.pop("Academic_Score"))
+        extracted["Academic_Performance"] = education_service.convert_academic_score_to_performance(score)
+    return extracted
 
 # ---------- Schemas ----------
 class StartChatResponse(BaseModel):
@@ -209,6 +200,7 @@ def assistant_greeting(conversation: List[Dict[str, str]]) -> str:
             messages=conversation,
             temperature=0.7
         )
+        education_service.greeting_usage.record(resp)
         return resp.choices[0].message.content
     except Exception:
         return "Hello! I'm here to help you with your education loan prediction. What course are you planning to pursue?"
@@ -218,20 +210,20 @@ def assistant_followup(conversation: List[Dict[str, str]], user_profile: Dict[st
         # fallback single-question when OpenAI not available
         return f"I'd like to know more about your {missing_fields[0].replace('_',' ').lower()}. Could you please provide that information?"
         
-    context_info = f"""
-    Current user profile: {user_profile}
-    Missing fields: {missing_fields}
-
-    Continue the conversation naturally to collect the missing information.
-    If you have all required fields, respond with "INFORMATION_COMPLETE".
-    """
-    conversation.append({"role": "system", "content": context_info})
+    # Bounded window (system prompt, recent turns, profile summary); the session's
+    # conversation is left as it is
+    messages = education_service.prompt_window.build(
+        conversation, user_profile, missing_fields,
+        "Continue the conversation naturally to collect the missing information. "
+        'If you have all required fields, respond with "INFORMATION_COMPLETE".'
+    )
     try:
         resp = client.chat.completions.create(
             model="gpt-4o-mini",
-            messages=conversation,
+            messages=messages,
             temperature=0.7
         )
+        education_service.prompt_window.record_usage(resp)
         return resp.choices[0].message.content
     except Exception:
         # fallback single-question
@@ -242,20 +234,32 @@ def assistant_followup(conversation: List[Dict[str, str]], user_profile: Dict[st
 def health():
     return {"status": "ok"}
 
+@app.get("/admin/extraction")
+def get_extraction_stats():
+    """Turns extracted by the regex rules alone vs with OpenAI"""
+    return education_service.extraction_stats()
+
+@app.get("/admin/prompts")
+def get_prompt_stats():
+    """Follow-up prompt sizes, and prompt / cached token counts OpenAI reported per request kind"""
+    return education_service.prompt_stats()
+
 @app.post("/chat/start", response_model=StartChatResponse)
 def chat_start():
     session_id = init_session()
-    conv = SESSIONS[session_id]["conversation"]
+    state = SESSIONS[session_id]
+    conv = state["conversation"]
     greeting = assistant_greeting(conv)
     conv.append({"role": "assistant", "content": greeting})
+    SESSIONS.save(session_id, state)
     return StartChatResponse(session_id=session_id, message=greeting)
 
 @app.post("/chat/message", response_model=MessageResponse)
 def chat_message(req: MessageRequest):
-    if req.session_id not in SESSIONS:
+    state = SESSIONS.get(req.session_id)
+    if state is None:
         raise HTTPException(status_code=404, detail="Invalid session_id.")
 
-    state = SESSIONS[req.session_id]
     conversation = state["conversation"]
     user_profile = state["user_profile"]
 
@@ -279,7 +283,8 @@ def chat_message(req: MessageRequest):
         conversation.append({"role": "assistant", "content": "INFORMATION_COMPLETE"})
 
         try:
-            if not all([xgb_loan, xgb_interest, encoders, scaler]):
+            load_models()
+            if education_service.scorer is None and not education_service.models.get("xgb_loan"):
                 raise HTTPException(status_code=503, detail="ML models not available. Please ensure model files are loaded.")
                 
             # Build a copy with numeric conversions where needed
@@ -324,12 +329,13 @@ def chat_message(req: MessageRequest):
                 "result": {
                     "eligible_amount": int(predicted_loan),
                     "interest_rate": float(predicted_interest),
-                    "status": "APPROVED" if predicted_loan >= typed["Expected_Loan_Amount"] else "PARTIAL_APPROVAL"
+                    "status": "APPROVED" if predicted_loan >= typed["Expected_Loan_Amount"] else "PARTIAL_APPROVAL",
+                    **education_service.repayment_summary(typed, predicted_loan, predicted_interest)
                 }
             }
 
             # Reset for a new run but keep conversation
-            SESSIONS[req.session_id]["user_profile"] = {}
+            state["user_profile"] = {}
 
             # Assistant closing message (optional UX)
             assistant_msg = (
@@ -341,6 +347,7 @@ def chat_message(req: MessageRequest):
                 f"{'🎉 APPROVED!' if predicted_loan >= typed['Expected_Loan_Amount'] else '⚠️ PARTIAL APPROVAL.'}"
             )
             conversation.append({"role": "assistant", "content": assistant_msg})
+            SESSIONS.save(req.session_id, state)
 
             return MessageResponse(
                 message=assistant_msg,
@@ -354,6 +361,7 @@ def chat_message(req: MessageRequest):
     # Otherwise, ask for the next missing fields
     followup = assistant_followup(conversation, user_profile, missing_fields)
     conversation.append({"role": "assistant", "content": followup})
+    SESSIONS.save(req.session_id, state)
 
     return MessageResponse(
         message=followup,
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Turn latency of the slot-filling dialog (loan_services/slot_filling.py).
+
+Plays one scripted applicant per loan type through the turn loop /chat/message
+runs in "slots" mode - parse the reply, validate_field(), record, pick the next
+question - including a few replies that need a reprompt. Checks that every
+required field gets collected, then reports turns/sec and the p50/p99 turn time.
+Model scoring at the end of the chat is not included (see bench_predict.py).
+
+Run from the repository root:
+    python benchmarks/bench_dialog.py [--seconds 2] [--show]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loan_services.loan_factory import LoanServiceFactory
+
+CONTACT = ["I'm Priya Sharma", "priya.sharma92@gmail.com, +91 98765 43210"]
+
+SCRIPTS = {
+    "education": CONTACT + ["22", "I got 86%", "MBA, tier 1", "12 lakh", "not sure", "1.5 crore", "760",
+                            "unsecured", "7 years", "25 lakh"],
+    "home": CONTACT + ["34", "1.2 lakh", "no guarantor", "20", "780", "salaried", "15 lakh", "25k",
+                       "60 lakh", "80 lakh"],
+    "personal": CONTACT + ["31", "self employed", "6 years", "9 lakh", "720", "none", "4", "5 lakh"],
+    "gold": CONTACT + ["45", "6 lakh", "710", "retired", "3 lakh", "2 lakh", "2"],
+    "business": CONTACT + ["8 years", "2.5 crore", "18 lakh", "740", "manufacturing", "nil", "5", "yes",
+                           "no, we don't", "healthcare in a tier-2 city", "50 lakh"],
+    "car": CONTACT + ["29", "9.5 lakh", "none", "750", "compact SUV", "something", "20%", "5", "8 lakh"],
+}
+
+
+def missing(service, profile):
+    return [f for f in service.get_required_fields() if f not in profile]
+
+
+def play(service, replies, show=False):
+    """Run one scripted chat; returns per-turn seconds and the collected profile"""
+    dialog = service.slot_dialog()
+    state = {"user_profile": {}}
+    message = dialog.start(state)
+    timings = []
+    for reply in replies:
+        if show:
+            print(f"  bot:  {message}\n  user: {reply}")
+        started = time.perf_counter()
+        recorded, errors = {}, []
+        for field, value in dialog.parse(state, reply).items():
+            valid, error = service.validate_field(field, value)
+            if valid:
+                state["user_profile"][field] = recorded[field] = value
+            else:
+                errors.append(error)
+        remaining = missing(service, state["user_profile"])
+        if errors:
+            message = "\n".join(errors)
+        elif remaining:
+            message = dialog.next_question(state, remaining, recorded)
+        else:
+            message = "complete"
+        timings.append(time.perf_counter() - started)
+    if show:
+        print(f"  bot:  {message}\n  profile: {state['user_profile']}\n")
+    return timings, state["user_profile"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Run time per loan type")
+    parser.add_argument("--show", action="store_true", help="Print each scripted conversation")
+    args = parser.parse_args()
+
+    print(f"{'loan type':10} {'turns':>6} {'turns/sec':>11} {'p50 ms':>8} {'p99 ms':>8}")
+    for loan_type, replies in SCRIPTS.items():
+        service = LoanServiceFactory.get_service(loan_type)
+        if args.show:
+            print(loan_type)
+        _, profile = play(service, replies, args.show)
+        left = missing(service, profile)
+        if left:
+            print(f"{loan_type:10} script left fields uncollected: {left}")
+            continue
+
+        timings = []
+        deadline = time.perf_counter() + args.seconds
+        while time.perf_counter() < deadline:
+            timings.extend(play(service, replies)[0])
+        timings.sort()
+        p50 = timings[len(timings) // 2] * 1000
+        p99 = timings[int(len(timings) * 0.99)] * 1000
+        print(f"{loan_type:10} {len(replies):>6} {len(timings) / sum(timings):>11,.0f} {p50:>8.3f} {p99:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the regex fallback extractor (loan_services/extraction.py).
+
+Replays a corpus of chat turns - the assistant's question and the user's reply -
+through each loan type's compiled engine and reports messages/sec, plus the share
+of turns the rules are confident enough about to skip OpenAI. The built-in
+corpus holds typical replies from the chat flows; --corpus takes an NDJSON file
+of real turns instead, one {"loan_type", "question", "message"} object per line
+(e.g. exported from saved sessions).
+
+Run from the repository root:
+    python benchmarks/bench_extraction.py [--seconds 2] [--corpus turns.ndjson] [--threshold 0.8] [--show]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loan_services.extraction import engine_for, Turn, KEYWORD_MATCH
+
+COMMON = [
+    ("Hello! May I have your full name?", "My name is Priya Sharma"),
+    ("Hello! May I have your full name?", "Rahul Verma"),
+    ("Thanks! What's your email address?", "priya.sharma92@gmail.com"),
+    ("Could you share your phone number?", "9876543210"),
+    ("Could you share your phone number?", "+91 98765 43210 is my number"),
+    ("How old are you?", "I am 27 years old"),
+    ("How old are you?", "27"),
+    ("What is your CIBIL score?", "750"),
+    ("What is your CIBIL score?", "my cibil is around 712"),
+    ("Anything else?", "I'm not sure, can you explain what you need?"),
+]
+
+CORPUS = {
+    "education": COMMON + [
+        ("What was your academic score (percentage)?", "I scored 86% in my final year"),
+        ("What was your academic score (percentage)?", "86"),
+        ("Which course do you intend to pursue?", "An MBA from a tier 1 college"),
+        ("Which tier is the university?", "tier 2"),
+        ("What is your co-applicant's annual income?", "My father is the coapplicant, income 12 lakh"),
+        ("What is your guarantor's networth?", "guarantor networth is about 1.5 crore"),
+        ("Secured or unsecured loan?", "unsecured please"),
+        ("For how many years do you want the loan term?", "7"),
+        ("What loan amount do you need?", "I need 25 lakh for the course"),
+    ],
+    "business": COMMON + [
+        ("How long has your business been operating?", "We have been in business for 8 years"),
+        ("What is your annual revenue?", "Annual turnover is 2.5 crore"),
+        ("What is your annual revenue?", "1,20,00,000"),
+        ("What is your net profit?", "profit around 18 lakh last year"),
+        ("What type of business do you run?", "A small manufacturing unit"),
+        ("Do you have collateral to offer?", "Yes, we have a warehouse"),
+        ("Do you have a guarantor?", "No, I don't have one"),
+        ("How much loan amount do you require?", "We require 50 lakh for expansion"),
+    ],
+    "car": COMMON + [
+        ("What is your annual salary?", "My salary is 9.5 lakh per annum"),
+        ("What is your co-applicant's annual income?", "6 lakh"),
+        ("Which car type are you buying?", "Looking at a compact SUV"),
+        ("How much down payment (percent) can you make?", "20%"),
+        ("What tenure would you like?", "5 years tenure"),
+        ("What loan amount do you need?", "need about 8 lakh"),
+    ],
+    "home": COMMON + [("What is your credit score?", "credit score is 780")],
+    "personal": COMMON + [("Tell me about yourself", "I'm Arjun, 31 years old, cibil 690")],
+    "gold": COMMON + [("What is your age?", "age: 45")],
+}
+
+
+def load_corpus(path):
+    corpus = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                turn = json.loads(line)
+                corpus.setdefault(turn["loan_type"], []).append((turn.get("question", ""), turn["message"]))
+    return corpus
+
+
+def bench(loan_type, turns, seconds):
+    engine = engine_for(loan_type)
+    conversations = [[{"role": "assistant", "content": q}] for q, _ in turns]
+    messages = [m for _, m in turns]
+    processed = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for message, conversation in zip(messages, conversations):
+            engine.extract(message, conversation)
+        processed += len(messages)
+    return processed / (time.perf_counter() - start)
+
+
+def regex_only_share(loan_type, turns, threshold):
+    engine = engine_for(loan_type)
+    confident = sum(engine.route_turn(Turn(message, [], question.lower()), threshold)[1] >= threshold
+                    for question, message in turns)
+    return confident / len(turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Run time per loan type")
+    parser.add_argument("--corpus", help="NDJSON file of {loan_type, question, message} turns")
+    parser.add_argument("--threshold", type=float, default=KEYWORD_MATCH,
+                        help="Confidence needed to skip OpenAI (EXTRACTION_CONFIDENCE)")
+    parser.add_argument("--show", action="store_true", help="Print what each turn extracts")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else CORPUS
+
+    start = time.perf_counter()
+    for loan_type in corpus:
+        engine_for(loan_type)
+    print(f"compiled {len(corpus)} engines in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    if args.show:
+        for loan_type, turns in corpus.items():
+            engine = engine_for(loan_type)
+            for question, message in turns:
+                extracted, confidence = engine.route_turn(Turn(message, [], question.lower()), args.threshold)
+                print(f"{loan_type:9} {message!r:55} {confidence:4.2f} -> {extracted}")
+        print()
+
+    print(f"{'loan type':10} {'turns':>6} {'messages/sec':>14} {'us/message':>11} {'regex only':>11}")
+    for loan_type, turns in corpus.items():
+        rate = bench(loan_type, turns, args.seconds)
+        share = regex_only_share(loan_type, turns, args.threshold)
+        print(f"{loan_type:10} {len(turns):>6} {rate:>14,.0f} {1e6 / rate:>11.1f} {share:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Resident memory per worker for the loan models, loaded per worker vs preloaded before fork.
+
+Forks --workers processes the way a pre-forking server does. In "per-worker" mode
+every worker loads the models itself after the fork (uvicorn --workers); in
+"preload" mode the parent loads them once and the workers inherit the pages
+(gunicorn --preload with MODEL_PRELOAD=true). While all workers are alive each
+one reports RSS, PSS (its proportional share of shared pages) and USS (pages
+only it holds) from /proc/self/smaps_rollup.
+
+Native artifacts are used when <model_path>/native exists (python convert_models.py);
+USE_NATIVE_ARTIFACTS=false forces the pickles.
+
+Run from the repository root (Linux only):
+    python benchmarks/bench_memory.py [--workers 4] [--loan-types all] [--mode both]
+"""
+
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loan_services.loan_factory import LoanServiceFactory
+
+
+def memory_kb():
+    """RSS, PSS and USS of the current process in kB"""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1])
+    uss = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    return values.get("Rss", 0), values.get("Pss", 0), uss
+
+
+def worker(loan_types, preloaded, ready, done, results):
+    if not preloaded:
+        LoanServiceFactory.warmup(loan_types)
+    # A collection is what un-shares inherited object headers in a real worker
+    gc.collect()
+    results.put(memory_kb())
+    ready.release()
+    done.wait()
+
+
+def run(mode, workers, loan_types):
+    ctx = multiprocessing.get_context("fork")
+    preloaded = mode == "preload"
+    if preloaded:
+        LoanServiceFactory.warmup(loan_types)
+        gc.freeze()
+
+    ready, done, results = ctx.Semaphore(0), ctx.Event(), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(loan_types, preloaded, ready, done, results))
+             for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    for _ in procs:
+        ready.acquire()
+    samples = [results.get() for _ in procs]
+    done.set()
+    for proc in procs:
+        proc.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--loan-types", default="all", help='"all" or a comma-separated list')
+    parser.add_argument("--mode", choices=["per-worker", "preload", "both"], default="both")
+    args = parser.parse_args()
+
+    if args.loan_types == "all":
+        loan_types = LoanServiceFactory.get_available_loan_types()
+    else:
+        loan_types = [t.strip() for t in args.loan_types.split(",") if t.strip()]
+
+    modes = ["per-worker", "preload"] if args.mode == "both" else [args.mode]
+    print(f"workers={args.workers} loan_types={','.join(loan_types)} "
+          f"native={os.getenv('USE_NATIVE_ARTIFACTS', 'true')}")
+    print(f"{'mode':>10} {'rss MB':>8} {'pss MB':>8} {'uss MB':>8} {'total pss MB':>12}")
+    for mode in modes:
+        # Run each mode in its own child so one mode's loaded models don't leak into the next
+        ctx = multiprocessing.get_context("fork")
+        queue = ctx.Queue()
+        proc = ctx.Process(target=lambda: queue.put(run(mode, args.workers, loan_types)))
+        proc.start()
+        samples = queue.get()
+        proc.join()
+
+        rss = sum(s[0] for s in samples) / len(samples) / 1024
+        pss = sum(s[1] for s in samples) / len(samples) / 1024
+        uss = sum(s[2] for s in samples) / len(samples) / 1024
+        total_pss = sum(s[1] for s in samples) / 1024
+        print(f"{mode:>10} {rss:>8.1f} {pss:>8.1f} {uss:>8.1f} {total_pss:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for single-row predict_loan.
+Compares the compiled NumPy fast path against the pandas pipeline.
+
+Run from the repository root:
+    python benchmarks/bench_predict.py [loan_type ...] [--iterations N]
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loan_services.loan_factory import LoanServiceFactory
+
+SAMPLE_PROFILES = {
+    "education": {
+        "Age": 22.0, "Academic_Score": 82.0, "Intended_Course": "MBA", "University_Tier": "Tier1",
+        "Coapplicant_Income": 800000.0, "Guarantor_Networth": 5000000.0, "CIBIL_Score": 750.0,
+        "Loan_Type": "Secured", "Loan_Term": 5.0, "Expected_Loan_Amount": 1500000.0,
+    },
+    "home": {
+        "Age": 35.0, "Income": 120000.0, "Guarantor_income": 0.0, "Tenure": 20.0, "CIBIL_score": 780.0,
+        "Employment_type": "Salaried", "Down_payment": 1500000.0, "Existing_total_EMI": 10000.0,
+        "Loan_amount_requested": 6000000.0, "Property_value": 7500000.0,
+    },
+    "personal": {
+        "Age": 30.0, "Employment_Type": "Salaried", "Employment_Duration_Years": 5.0, "Annual_Income": 1200000.0,
+        "CIBIL_Score": 760.0, "Existing_EMIs": 5000.0, "Loan_Term_Years": 3.0, "Expected_Loan_Amount": 500000.0,
+    },
+    "gold": {
+        "Age": 45.0, "Annual_Income": 900000.0, "CIBIL_Score": 720.0, "Occupation": "Salaried",
+        "Gold_Value": 400000.0, "Loan_Amount": 300000.0, "Loan_Tenure": 2.0,
+    },
+    "business": {
+        "Business_Age_Years": 6.0, "Annual_Revenue": 5000000.0, "Net_Profit": 800000.0, "CIBIL_Score": 740.0,
+        "Business_Type": "Manufacturing", "Existing_Loan_Amount": 500000.0, "Loan_Tenure_Years": 5.0,
+        "Has_Collateral": "Yes", "Has_Guarantor": "No", "Industry_Risk_Rating": "FMCG",
+        "Location_Tier": "Tier-1 City", "Expected_Loan_Amount": 2000000.0,
+    },
+    "car": {
+        "Age": 30.0, "applicant_annual_salary": 900000.0, "Coapplicant_Annual_Income": 0.0, "CIBIL": 760.0,
+        "Car_Type": "SUV", "down_payment_percent": 20.0, "Tenure": 5.0, "loan_amount": 800000.0,
+    },
+}
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def time_calls(fn, iterations):
+    timings = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(iterations):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return percentile(timings, 50), percentile(timings, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("loan_types", nargs="*", default=list(SAMPLE_PROFILES))
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'loan type':<10} {'path':<8} {'p50 ms':>9} {'p99 ms':>9}")
+    for loan_type in args.loan_types:
+        service = LoanServiceFactory.get_service(loan_type)
+        profile = SAMPLE_PROFILES[loan_type]
+        scorer = service.scorer
+
+        try:
+            service.predict_loan(profile)
+        except Exception as e:
+            print(f"{loan_type:<10} skipped: {e}")
+            continue
+
+        if scorer is not None:
+            p50, p99 = time_calls(lambda: service.predict_loan(profile), args.iterations)
+            print(f"{loan_type:<10} {'compiled':<8} {p50:>9.3f} {p99:>9.3f}")
+
+        # pandas pipeline for comparison
+        service.scorer = None
+        try:
+            p50, p99 = time_calls(lambda: service.predict_loan(profile), max(1, args.iterations // 10))
+            print(f"{loan_type:<10} {'pandas':<8} {p50:>9.3f} {p99:>9.3f}")
+        finally:
+            service.scorer = scorer
+
+
+if __name__ == "__main__":
+    main()
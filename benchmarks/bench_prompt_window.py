@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Prompt size per follow-up request with and without the conversation window
+(loan_services/prompt_window.py).
+
+Simulates a chat of --turns exchanges and prints, every few turns, the
+estimated prompt tokens of one follow-up request when the whole conversation is
+sent versus the windowed prompt, plus the running totals. Without the window the
+per-request size grows linearly and the total quadratically; with it both stay
+bounded by the window and the token budget.
+
+Run from the repository root:
+    python benchmarks/bench_prompt_window.py [--turns 40] [--window 4] [--budget 2000]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loan_services.prompt_window import ConversationWindow, message_tokens
+
+# About the size of the loan services' system prompts
+SYSTEM_PROMPT = "You are a friendly and professional loan advisor chatbot. Collect each required field. " * 20
+ASSISTANT = "Thanks for sharing that! Could you also tell me your annual income so I can check your eligibility?"
+USER = "Sure, I earn around 9.5 lakh a year from my salaried job."
+INSTRUCTIONS = "Continue the conversation naturally to collect the missing information."
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--window", type=int, default=4, help="Exchanges kept (PROMPT_WINDOW_TURNS)")
+    parser.add_argument("--budget", type=int, default=2000, help="Token budget (PROMPT_TOKEN_BUDGET)")
+    args = parser.parse_args()
+
+    window = ConversationWindow(args.window, args.budget)
+    conversation = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "assistant", "content": ASSISTANT}]
+    profile = {}
+    fields = [f"Field_{i}" for i in range(args.turns + 1)]
+    full_total = windowed_total = 0
+
+    print(f"{'turn':>5} {'full prompt':>12} {'windowed':>9} {'full total':>11} {'windowed total':>15}")
+    for turn in range(1, args.turns + 1):
+        conversation.append({"role": "user", "content": USER})
+        profile[fields[turn - 1]] = 950000
+        missing = fields[turn:]
+        context = [{"role": "system", "content": INSTRUCTIONS}, {"role": "system", "content": window.summary(profile, missing)}]
+        full = message_tokens(conversation) + message_tokens(context)
+        windowed = message_tokens(window.build(conversation, profile, missing, INSTRUCTIONS))
+        full_total += full
+        windowed_total += windowed
+        if turn == 1 or turn % 5 == 0:
+            print(f"{turn:>5} {full:>12,} {windowed:>9,} {full_total:>11,} {windowed_total:>15,}")
+        conversation.append({"role": "assistant", "content": ASSISTANT})
+
+    stats = window.stats()
+    print(f"\ntokens saved: {stats['tokens_saved_rate']:.0%}, p95 prompt {stats['p95_prompt_tokens']} tokens, "
+          f"{stats['messages_dropped']} messages left out")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the shared SQLite session store across worker processes.
+
+Each worker process plays chat turns the way /chat/message does: load a random
+session, append a user/assistant exchange, update the profile and save it back.
+--turn-ms adds simulated per-turn CPU work (validation, prediction) so the run
+reflects a worker's real budget instead of only the store round trip.
+
+Run from the repository root:
+    python benchmarks/bench_sessions.py [--workers 1 2 4 8] [--seconds 5] [--turn-ms 2]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_store import SharedSQLiteSessionStore
+
+SYSTEM_PROMPT = "You are a friendly loan advisor. " * 200
+
+
+def system_prompt_for(state):
+    return SYSTEM_PROMPT
+
+
+def seed_sessions(db_path, count):
+    store = SharedSQLiteSessionStore(db_path, system_prompt_for=system_prompt_for)
+    session_ids = []
+    for _ in range(count):
+        session_id = uuid.uuid4().hex
+        store.put(session_id, {
+            "loan_type": "home",
+            "conversation": [{"role": "system", "content": SYSTEM_PROMPT},
+                             {"role": "assistant", "content": "Hello! What is your name?"}],
+            "user_profile": {},
+            "created_at": time.time(),
+        })
+        session_ids.append(session_id)
+    store.close()
+    return session_ids
+
+
+def busy_wait(ms):
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+def worker(db_path, session_ids, seconds, turn_ms, start_event, results):
+    store = SharedSQLiteSessionStore(db_path, system_prompt_for=system_prompt_for)
+    rng = random.Random(os.getpid())
+    start_event.wait()
+
+    turns = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        session_id = rng.choice(session_ids)
+        state = store.get(session_id)
+        state["conversation"].append({"role": "user", "content": "My income is 12 lakh"})
+        state["user_profile"][f"field_{len(state['user_profile']) % 12}"] = rng.random()
+        if turn_ms:
+            busy_wait(turn_ms)
+        state["conversation"].append({"role": "assistant", "content": "Thanks! What is your CIBIL score?"})
+        # Keep the conversation from growing without bound over a long run
+        del state["conversation"][2:-8]
+        store.save(session_id, state)
+        turns += 1
+
+    store.close()
+    results.put(turns)
+
+
+def run(workers, session_ids, db_path, seconds, turn_ms):
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=worker, args=(db_path, session_ids, seconds, turn_ms, start_event, results))
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    time.sleep(0.5)  # let every worker open its connection before the clock starts
+    start_event.set()
+    total = sum(results.get() for _ in procs)
+    for proc in procs:
+        proc.join()
+    return total / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--turn-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "sessions.db")
+        session_ids = seed_sessions(db_path, args.sessions)
+
+        print(f"cpus={os.cpu_count()} sessions={args.sessions} turn_ms={args.turn_ms}")
+        print(f"{'workers':>7} {'turns/s':>10} {'speedup':>8} {'efficiency':>10}")
+        baseline = None
+        for workers in args.workers:
+            throughput = run(workers, session_ids, db_path, args.seconds, args.turn_ms)
+            baseline = baseline or throughput / workers
+            speedup = throughput / baseline
+            print(f"{workers:>7} {throughput:>10.0f} {speedup:>8.2f} {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
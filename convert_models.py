@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Convert the joblib model pickles under models/ into native artifacts.
+
+For each loan type this writes <model_path>/native: one XGBoost .ubj booster per
+output, mean.npy/scale.npy scaler vectors and manifest.json (format version,
+feature order, categorical vocabularies, output transforms such as expm1, the
+sha256 of every source pickle and the library versions used). The services load
+these instead of the pickles and fall back to the pickles when a source checksum
+no longer matches.
+
+Every conversion is checked by scoring a random sample through both the pickle
+scorer and the freshly written artifacts before it replaces the old directory.
+    python convert_models.py                     # convert every loan type with models
+    python convert_models.py --loan-types home   # convert selected loan types
+    python convert_models.py --check             # report missing/stale artifacts, exit 1 if any
+"""
+
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from loan_services.loan_factory import LoanServiceFactory
+from loan_services.compiled_scorer import CompiledScorer, MANIFEST_FILE, read_manifest
+from logging_config import configure_logging
+
+
+def sample_matrix(scorer: CompiledScorer, rows: int, seed: int = 0) -> np.ndarray:
+    """Random encoded rows: known category codes, numeric columns around the scaler mean"""
+    rng = np.random.default_rng(seed)
+    X = np.empty((rows, scorer.n_features), dtype=np.float64)
+    for j, (_, lookup, _) in enumerate(scorer.columns):
+        if lookup:
+            X[:, j] = rng.choice(sorted(set(lookup.values())), size=rows)
+        else:
+            X[:, j] = scorer.mean[j] + scorer.scale[j] * rng.standard_normal(rows)
+    return X
+
+
+def max_difference(reference: CompiledScorer, candidate: CompiledScorer, rows: int = 256) -> float:
+    """Largest relative difference between two scorers' outputs on the same sample"""
+    X = sample_matrix(reference, rows)
+    expected = reference.score_matrix(X.copy())
+    actual = candidate.score_matrix(X.copy())
+    return max(float(np.max(np.abs(a - e) / np.maximum(np.abs(e), 1.0))) for e, a in zip(expected, actual))
+
+
+def pickle_service(loan_type: str):
+    """The loan service with its scorer compiled from the pickles, ignoring existing artifacts"""
+    service = LoanServiceFactory.get_service(loan_type)
+    service.prefer_native = False
+    service.ensure_models_loaded()
+    return service
+
+
+def convert(loan_type: str, tolerance: float) -> bool:
+    service = pickle_service(loan_type)
+    if service.scorer is None:
+        print(f"⚠️  {loan_type}: no compiled scorer (models missing or unsupported), skipped")
+        return not service.source_checksums()
+
+    native_dir = service.native_artifact_dir()
+    staging_dir = native_dir + ".tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    manifest = service.save_native_artifacts(staging_dir)
+
+    difference = max_difference(service.scorer, CompiledScorer.load(staging_dir, mmap=False))
+    if difference > tolerance:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        print(f"❌ {loan_type}: native artifacts differ from the pickles by {difference:.2e}, not written")
+        return False
+
+    shutil.rmtree(native_dir, ignore_errors=True)
+    os.replace(staging_dir, native_dir)
+    print(f"✅ {loan_type}: wrote {len(manifest['predictors'])} booster(s), "
+          f"{len(manifest['feature_names'])} features to {native_dir} (max difference {difference:.2e})")
+    return True
+
+
+def check(loan_type: str) -> bool:
+    service = LoanServiceFactory.get_service(loan_type)
+    native_dir = service.native_artifact_dir()
+    if not os.path.exists(os.path.join(native_dir, MANIFEST_FILE)):
+        if not service.source_checksums():
+            print(f"⚠️  {loan_type}: no models, skipped")
+            return True
+        print(f"❌ {loan_type}: no native artifacts")
+        return False
+
+    manifest = read_manifest(native_dir)
+    stale = service.stale_native_sources(manifest)
+    if stale:
+        print(f"❌ {loan_type}: stale, {', '.join(stale)} changed since {manifest.get('created_at')}")
+        return False
+    print(f"✅ {loan_type}: format v{manifest['format_version']} from {manifest.get('created_at')} "
+          f"({manifest.get('libraries')})")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loan-types", default="all", help='"all" or a comma-separated list')
+    parser.add_argument("--check", action="store_true", help="only report whether artifacts are present and current")
+    parser.add_argument("--tolerance", type=float, default=1e-5, help="max relative output difference accepted")
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.loan_types == "all":
+        loan_types = LoanServiceFactory.get_available_loan_types()
+    else:
+        loan_types = [t.strip().lower() for t in args.loan_types.split(",") if t.strip()]
+
+    if args.check:
+        results = [check(loan_type) for loan_type in loan_types]
+    else:
+        results = [convert(loan_type, args.tolerance) for loan_type in loan_types]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
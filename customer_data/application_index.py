@@ -0,0 +1,339 @@
+import json
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Tuple
+from .stats import COUNTERS, EXTREMES, application_contribution, summarize
+from .application_query import cibil_score
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    file_path TEXT PRIMARY KEY,
+    loan_type TEXT NOT NULL,
+    session_id TEXT,
+    timestamp TEXT NOT NULL,
+    status TEXT,
+    approval_status TEXT,
+    customer_name TEXT,
+    customer_email TEXT,
+    approved_amount REAL,
+    interest_rate REAL,
+    requested_amount REAL,
+    cibil_score REAL
+);
+CREATE TABLE IF NOT EXISTS loan_stats (
+    loan_type TEXT PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    approved INTEGER NOT NULL DEFAULT 0,
+    partial INTEGER NOT NULL DEFAULT 0,
+    amount_sum REAL NOT NULL DEFAULT 0,
+    amount_count INTEGER NOT NULL DEFAULT 0,
+    interest_sum REAL NOT NULL DEFAULT 0,
+    interest_count INTEGER NOT NULL DEFAULT 0,
+    amount_min REAL,
+    amount_max REAL,
+    interest_min REAL,
+    interest_max REAL
+);
+"""
+
+# Created after the cibil_score column is guaranteed to exist (older indexes lack it).
+# Every index ends in (timestamp, file_path) so keyset pages are a range scan in order.
+INDEXES = """
+DROP INDEX IF EXISTS idx_applications_type_time;
+CREATE INDEX IF NOT EXISTS idx_applications_keyset ON applications(loan_type, timestamp, file_path);
+CREATE INDEX IF NOT EXISTS idx_applications_type_status ON applications(loan_type, status, timestamp);
+CREATE INDEX IF NOT EXISTS idx_applications_type_approval ON applications(loan_type, approval_status, timestamp);
+CREATE INDEX IF NOT EXISTS idx_applications_type_cibil ON applications(loan_type, cibil_score, timestamp);
+"""
+COLUMNS = ["file_path", "loan_type", "session_id", "timestamp", "status", "approval_status",
+           "customer_name", "customer_email", "approved_amount", "interest_rate", "requested_amount",
+           "cibil_score"]
+
+
+def index_row(application: Dict[str, Any], file_path: str) -> Dict[str, Any]:
+    """Flatten an application record into the columns kept in the index"""
+    customer_info = application.get("customer_info") or {}
+    result = (application.get("prediction_result") or {}).get("result") or {}
+    approved_amount = result.get("eligible_amount", result.get("approved_amount"))
+    return {
+        "file_path": file_path,
+        "loan_type": application.get("loan_type", ""),
+        "session_id": application.get("session_id", ""),
+        "timestamp": application.get("timestamp", ""),
+        "status": application.get("status", ""),
+        "approval_status": result.get("status"),
+        "customer_name": customer_info.get("name", ""),
+        "customer_email": customer_info.get("email", ""),
+        "approved_amount": approved_amount,
+        "interest_rate": result.get("interest_rate"),
+        "requested_amount": result.get("requested_amount"),
+        "cibil_score": cibil_score(application.get("loan_type", ""), application.get("loan_data")),
+    }
+
+
+class ApplicationIndex:
+    """SQLite index over the per-application JSON files, kept up to date on save"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        # Waits out another worker's migration or rebuild rather than failing with "database is locked"
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        if not self._has_column("cibil_score"):
+            # Checked again under the write lock: another worker may be migrating the same index
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if not self._has_column("cibil_score"):
+                    self._conn.execute("ALTER TABLE applications ADD COLUMN cibil_score REAL")
+                    self._backfill_cibil()
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        self._conn.executescript(INDEXES)
+        self._conn.commit()
+        
+        # Indexes created before running stats existed start with an empty stats table
+        has_stats = self._conn.execute("SELECT 1 FROM loan_stats LIMIT 1").fetchone()
+        if not has_stats and not self.is_empty():
+            self.rebuild_stats()
+
+    def _has_column(self, column: str) -> bool:
+        return column in {row[1] for row in self._conn.execute("PRAGMA table_info(applications)")}
+
+    def _backfill_cibil(self):
+        """Fill the cibil_score column added to an existing index from the application files"""
+        updates = []
+        for file_path, loan_type in self._conn.execute("SELECT file_path, loan_type FROM applications").fetchall():
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    loan_data = json.load(f).get("loan_data")
+            except Exception:
+                continue
+            updates.append((cibil_score(loan_type, loan_data), file_path))
+        self._conn.executemany("UPDATE applications SET cibil_score = ? WHERE file_path = ?", updates)
+    
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM applications LIMIT 1").fetchone() is None
+
+    def add(self, application: Dict[str, Any], file_path: str):
+        """Index (or re-index) one saved application"""
+        self.add_many([(application, file_path)])
+
+    def add_many(self, items: Iterable[tuple]):
+        """Index applications and fold them into the running stats in one transaction"""
+        items = list(items)
+        if not items:
+            return
+        rows = [index_row(application, file_path) for application, file_path in items]
+        
+        with self._lock, self._conn:
+            paths = [row["file_path"] for row in rows]
+            placeholders = ",".join("?" * len(paths))
+            replaced = {r[0] for r in self._conn.execute(
+                f"SELECT file_path FROM applications WHERE file_path IN ({placeholders})", paths
+            )}
+            
+            self._insert_rows(rows)
+            
+            for (application, file_path), row in zip(items, rows):
+                if file_path not in replaced:
+                    self._apply_contribution(row["loan_type"], application_contribution(application))
+            # Re-indexed files may have changed; recompute those loan types exactly
+            for loan_type in {row["loan_type"] for row in rows if row["file_path"] in replaced}:
+                self._recompute_stats(loan_type)
+    
+    def _insert_rows(self, rows: List[Dict[str, Any]]):
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO applications ({', '.join(COLUMNS)}) "
+            f"VALUES ({', '.join(':' + c for c in COLUMNS)})",
+            rows
+        )
+    
+    def _apply_contribution(self, loan_type: str, contribution: Dict[str, Any]):
+        self._conn.execute(
+            f"""
+            INSERT INTO loan_stats (loan_type, {", ".join(COUNTERS + EXTREMES)})
+            VALUES (?, {", ".join("?" * len(COUNTERS + EXTREMES))})
+            ON CONFLICT(loan_type) DO UPDATE SET
+                {", ".join(f"{c} = {c} + excluded.{c}" for c in COUNTERS)},
+                amount_min = MIN(COALESCE(amount_min, excluded.amount_min), COALESCE(excluded.amount_min, amount_min)),
+                amount_max = MAX(COALESCE(amount_max, excluded.amount_max), COALESCE(excluded.amount_max, amount_max)),
+                interest_min = MIN(COALESCE(interest_min, excluded.interest_min), COALESCE(excluded.interest_min, interest_min)),
+                interest_max = MAX(COALESCE(interest_max, excluded.interest_max), COALESCE(excluded.interest_max, interest_max))
+            """,
+            [loan_type] + [contribution[c] for c in COUNTERS + EXTREMES]
+        )
+    
+    def _recompute_stats(self, loan_type: Optional[str] = None):
+        where = "WHERE loan_type = ?" if loan_type else ""
+        params = [loan_type] if loan_type else []
+        self._conn.execute(f"DELETE FROM loan_stats {where}", params)
+        self._conn.execute(
+            f"""
+            INSERT INTO loan_stats (loan_type, {", ".join(COUNTERS + EXTREMES)})
+            SELECT loan_type,
+                   COUNT(*),
+                   COALESCE(SUM(status = 'completed'), 0),
+                   COALESCE(SUM(approval_status = 'APPROVED'), 0),
+                   COALESCE(SUM(approval_status = 'PARTIAL_APPROVAL'), 0),
+                   COALESCE(SUM(approved_amount), 0), COUNT(approved_amount),
+                   COALESCE(SUM(interest_rate), 0), COUNT(interest_rate),
+                   MIN(approved_amount), MAX(approved_amount),
+                   MIN(interest_rate), MAX(interest_rate)
+            FROM applications {where}
+            GROUP BY loan_type
+            """,
+            params
+        )
+    
+    def rebuild_stats(self):
+        """Recompute every loan type's running stats from the indexed applications"""
+        with self._lock, self._conn:
+            self._recompute_stats()
+
+    def rebuild(self, base_path: Path) -> int:
+        """Re-index every application file under base_path/<loan_type>/applications"""
+        return self._rebuild(base_path, only_if_empty=False)
+    
+    def rebuild_if_empty(self, base_path: Path) -> int:
+        """rebuild() unless the index already has applications; returns how many files were indexed
+        
+        Safe for several worker processes starting at once: only the first to get the
+        write lock finds the index empty, the others index nothing.
+        """
+        if not self.is_empty():
+            return 0
+        return self._rebuild(base_path, only_if_empty=True)
+    
+    def _rebuild(self, base_path: Path, only_if_empty: bool) -> int:
+        # Files are read before taking the write lock, so other processes' saves don't wait on the scan
+        items = []
+        for file_path in Path(base_path).glob("*/applications/*.json"):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    application = json.load(f)
+            except Exception as e:
+                logger.error("Error reading %s: %s", file_path, e)
+                continue
+            application.setdefault("loan_type", file_path.parent.parent.name)
+            items.append((application, str(file_path)))
+
+        rows = [index_row(application, file_path) for application, file_path in items]
+        
+        with self._lock:
+            # One IMMEDIATE transaction: other processes' saves wait for it, and the stats are
+            # computed from the table it leaves rather than by adding contributions
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if only_if_empty and self._conn.execute("SELECT 1 FROM applications LIMIT 1").fetchone():
+                    self._conn.rollback()
+                    return 0
+                self._conn.execute("DELETE FROM applications")
+                self._insert_rows(rows)
+                self._recompute_stats()
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return len(items)
+
+    def recent_paths(self, loan_type: str, limit: Optional[int] = 10, status: Optional[str] = None,
+                     approval_status: Optional[str] = None, oldest_first: bool = False) -> List[str]:
+        """File paths of matching applications ordered by timestamp (newest first by default)"""
+        sql = "SELECT file_path FROM applications WHERE loan_type = ?"
+        params: List[Any] = [loan_type]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        if approval_status:
+            sql += " AND approval_status = ?"
+            params.append(approval_status)
+        sql += " ORDER BY timestamp " + ("ASC" if oldest_first else "DESC")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    def iter_paths(self, loan_type: str, status: Optional[str] = None, since: Optional[str] = None,
+                   until: Optional[str] = None, batch_size: int = 1000) -> Iterator[str]:
+        """Yield matching file paths oldest first, fetching keyset-paginated batches
+
+        since/until are ISO timestamps (since inclusive, until exclusive). The lock is
+        only held per batch, so a long export doesn't block saves.
+        """
+        sql = "SELECT timestamp, file_path FROM applications WHERE loan_type = ? AND (timestamp, file_path) > (?, ?)"
+        filters = ""
+        params: List[Any] = []
+        if status:
+            filters += " AND status = ?"
+            params.append(status)
+        if since:
+            filters += " AND timestamp >= ?"
+            params.append(since)
+        if until:
+            filters += " AND timestamp < ?"
+            params.append(until)
+        sql += filters + " ORDER BY timestamp, file_path LIMIT ?"
+        
+        last = ("", "")
+        while True:
+            with self._lock:
+                batch = self._conn.execute(sql, [loan_type, *last, *params, batch_size]).fetchall()
+            for _, file_path in batch:
+                yield file_path
+            if len(batch) < batch_size:
+                return
+            last = batch[-1]
+    
+    def page(self, loan_type: str, limit: int, after: Optional[Tuple[str, str]] = None,
+             status: Optional[str] = None, approval_status: Optional[str] = None,
+             since: Optional[str] = None, until: Optional[str] = None,
+             cibil_min: Optional[float] = None, cibil_max: Optional[float] = None) -> List[Tuple[str, str]]:
+        """(timestamp, file_path) of one page of matching applications, newest first
+        
+        after is the last (timestamp, file_path) of the previous page; since/until are
+        ISO timestamps (since inclusive, until exclusive).
+        """
+        sql = "SELECT timestamp, file_path FROM applications WHERE loan_type = ?"
+        params: List[Any] = [loan_type]
+        if after:
+            sql += " AND (timestamp, file_path) < (?, ?)"
+            params.extend(after)
+        for clause, value in (("status = ?", status), ("approval_status = ?", approval_status),
+                              ("timestamp >= ?", since), ("timestamp < ?", until),
+                              ("cibil_score >= ?", cibil_min), ("cibil_score <= ?", cibil_max)):
+            if value is not None:
+                sql += " AND " + clause
+                params.append(value)
+        sql += " ORDER BY timestamp DESC, file_path DESC LIMIT ?"
+        params.append(int(limit))
+        
+        with self._lock:
+            return [tuple(row) for row in self._conn.execute(sql, params)]
+    
+    def stats(self, loan_type: str) -> Dict[str, Any]:
+        """Running stats for a loan type (a single primary-key lookup)"""
+        return self.all_stats([loan_type])[loan_type]
+    
+    def all_stats(self, loan_types: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Running stats for several loan types in one query"""
+        columns = COUNTERS + EXTREMES
+        placeholders = ",".join("?" * len(loan_types))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT loan_type, {', '.join(columns)} FROM loan_stats WHERE loan_type IN ({placeholders})",
+                loan_types
+            ).fetchall()
+        aggregates = {row[0]: dict(zip(columns, row[1:])) for row in rows}
+        return {loan_type: summarize(aggregates.get(loan_type)) for loan_type in loan_types}
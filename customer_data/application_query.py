@@ -0,0 +1,77 @@
+import json
+import base64
+from typing import Dict, Any, Optional, List, Tuple
+
+# Where each loan type keeps the applicant's CIBIL score in loan_data
+CIBIL_FIELDS = {
+    "education": "CIBIL_Score",
+    "home": "CIBIL_score",
+    "personal": "CIBIL_Score",
+    "gold": "CIBIL_Score",
+    "business": "CIBIL_Score",
+    "car": "CIBIL",
+}
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(timestamp: str, key: str) -> str:
+    """Opaque keyset cursor for the last application on a page"""
+    return base64.urlsafe_b64encode(json.dumps([timestamp, key]).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(timestamp, key) from encode_cursor(); raises ValueError for anything else"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(timestamp, str) or not isinstance(key, str):
+        raise ValueError("Invalid cursor")
+    return timestamp, key
+
+
+def cibil_score(loan_type: str, loan_data: Optional[Dict[str, Any]]) -> Optional[float]:
+    value = (loan_data or {}).get(CIBIL_FIELDS.get(loan_type, "CIBIL_Score"))
+    try:
+        return float(value) if value is not None and not isinstance(value, bool) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """Drop duplicate paths and paths already covered by a requested parent ("loan_data" covers "loan_data.Age")
+
+    MongoDB rejects a projection holding both, so both backends get the same list.
+    """
+    if not fields:
+        return fields
+    requested = set(fields)
+    kept: List[str] = []
+    for field in fields:
+        parts = field.split(".")
+        if any(".".join(parts[:i]) in requested for i in range(1, len(parts))) or field in kept:
+            continue
+        kept.append(field)
+    return kept
+
+
+def project(document: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Keep only the given dotted paths (e.g. "customer_info.name"), like a MongoDB projection"""
+    if not fields:
+        return document
+    projected: Dict[str, Any] = {}
+    for field in normalize_fields(fields):
+        value: Any = document
+        parts = field.split(".")
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return projected
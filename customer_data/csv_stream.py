@@ -0,0 +1,58 @@
+import csv
+import io
+import zlib
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+# Columns shared by every loan type's export, in output order
+BASE_COLUMNS = ["timestamp", "session_id", "customer_name", "customer_email",
+                "customer_phone", "status", "eligible_amount", "interest_rate",
+                "requested_amount", "approval_status"]
+
+
+def iter_csv_chunks(rows: Iterable[Dict[str, Any]], fieldnames: Optional[List[str]] = None,
+                    rows_per_chunk: int = 500) -> Iterator[bytes]:
+    """Encode rows as CSV, yielding UTF-8 chunks of rows_per_chunk rows
+
+    Column order comes from fieldnames, or from the first row's keys.
+    """
+    buffer = io.StringIO()
+    writer = None
+    pending = 0
+
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=fieldnames or list(row.keys()),
+                                    restval="", extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if writer is None:
+        csv.DictWriter(buffer, fieldnames=fieldnames or BASE_COLUMNS).writeheader()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip-compress a stream of byte chunks without buffering the whole payload"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def write_csv(path, rows: Iterable[Dict[str, Any]], fieldnames: Optional[List[str]] = None) -> int:
+    """Stream rows into a CSV file with a single open(); returns bytes written"""
+    written = 0
+    with open(path, "wb") as f:
+        for chunk in iter_csv_chunks(rows, fieldnames):
+            f.write(chunk)
+            written += len(chunk)
+    return written
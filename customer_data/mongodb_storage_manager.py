@@ -1,23 +1,48 @@
 import os
 import json
+import time
+import random
+import threading
 from datetime import datetime
-from typing import Dict, Any, Optional, List
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+from pymongo import MongoClient, ReplaceOne, ReturnDocument
+from bson import ObjectId
+from pymongo.errors import ConnectionFailure, OperationFailure, DuplicateKeyError
 import logging
 from dotenv import load_dotenv
+from .csv_stream import write_csv
+from .stats import COUNTERS, application_contribution, summarize
+from .application_query import CIBIL_FIELDS, encode_cursor, decode_cursor, normalize_fields
 
 # Load environment variables
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fail fast on an unreachable server; the background monitor keeps retrying
+CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "2000"))
+SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "30000"))
+# Seconds between pings while connected
+HEALTH_INTERVAL = float(os.getenv("MONGODB_HEALTH_INTERVAL", "15"))
+RECONNECT_MIN_BACKOFF = 1.0
+RECONNECT_MAX_BACKOFF = float(os.getenv("MONGODB_RECONNECT_MAX_BACKOFF", "60"))
+# Server error for transactions on a standalone mongod (IllegalOperation)
+NO_TRANSACTIONS_CODE = 20
+# Fields of a replaced application needed to take it back out of the stats and to keep it if it is newer
+PREVIOUS_PROJECTION = {"session_id": 1, "timestamp": 1, "status": 1, "prediction_result.result": 1}
+
+def _newer(stored: Optional[Dict[str, Any]], application: Dict[str, Any]) -> bool:
+    """Whether the stored version of a session is newer than the application about to replace it"""
+    stored_at = (stored or {}).get("timestamp")
+    return isinstance(stored_at, datetime) and stored_at > application["timestamp"]
+
 class MongoDBStorageManager:
     """Manages customer data storage using MongoDB Atlas"""
     
-    def __init__(self, mongodb_uri: str = None, database_name: str = "loan_applications"):
+    # Running per-loan-type aggregates, one document per loan type keyed by _id
+    STATS_COLLECTION = "loan_stats"
+    
+    def __init__(self, mongodb_uri: str = None, database_name: str = "loan_applications", connect: bool = True):
         self.mongodb_uri = mongodb_uri or os.getenv("MONGODB_URI")
         self.database_name = database_name or os.getenv("MONGODB_DATABASE", "loan_applications")
         
@@ -26,64 +51,122 @@ class MongoDBStorageManager:
         
         self.client = None
         self.db = None
-        self._connect()
+        
+        # Connection state, reported by connection_state() and /health
+        self.state = "disconnected"
+        self.last_error: Optional[str] = None
+        self.attempts = 0
+        self.connected_since: Optional[float] = None
+        self.next_attempt_at: Optional[float] = None
+        self._indexes_created = False
+        # Cleared on the first save if the deployment is a standalone server
+        self._transactions = True
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        
+        # connect=False leaves the first attempt to start_monitor(), so construction never blocks
+        if connect:
+            self._connect()
     
-    def _connect(self):
-        """Establish connection to MongoDB"""
+    def _connect(self) -> bool:
+        """One fast-failing connection attempt (ping); returns whether MongoDB is reachable"""
+        self.attempts += 1
         try:
-            # Try different connection approaches for Windows compatibility
-            connection_configs = [
-                # Standard connection with SSL
-                {
-                    "serverSelectionTimeoutMS": 10000,
-                    "connectTimeoutMS": 20000,
-                    "socketTimeoutMS": 30000,
-                    "retryWrites": True,
-                    "w": 'majority'
-                },
-                # Connection without explicit SSL settings
-                {
-                    "serverSelectionTimeoutMS": 15000,
-                    "connectTimeoutMS": 30000,
-                    "socketTimeoutMS": 45000,
-                },
-                # Minimal connection
-                {
-                    "serverSelectionTimeoutMS": 20000,
-                }
-            ]
+            if self.client is None:
+                # The client reconnects its own sockets; keep it across failed pings
+                self.client = MongoClient(
+                    self.mongodb_uri,
+                    serverSelectionTimeoutMS=CONNECT_TIMEOUT_MS,
+                    connectTimeoutMS=CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=SOCKET_TIMEOUT_MS,
+                    retryWrites=True,
+                    w='majority'
+                )
+            
+            # Test the connection
+            self.client.admin.command('ping')
+            self.db = self.client[self.database_name]
             
-            for i, config in enumerate(connection_configs):
-                try:
-                    logger.info(f"Attempting MongoDB connection (method {i+1})...")
-                    self.client = MongoClient(self.mongodb_uri, **config)
-                    
-                    # Test the connection
-                    self.client.admin.command('ping')
-                    self.db = self.client[self.database_name]
-                    
-                    logger.info(f"Successfully connected to MongoDB database: {self.database_name}")
-                    
-                    # Create indexes for better performance
-                    self._create_indexes()
-                    return
-                    
-                except Exception as e:
-                    logger.warning(f"Connection method {i+1} failed: {e}")
-                    if self.client:
-                        self.client.close()
-                        self.client = None
-                    continue
+            if not self._indexes_created:
+                # Create indexes for better performance
+                self._create_indexes()
+                self._indexes_created = True
             
-            # If all methods fail, raise error
-            raise ConnectionError("All MongoDB connection methods failed")
+            if self.state != "connected":
+                self.connected_since = time.time()
+                logger.info(f"Connected to MongoDB database: {self.database_name}")
+            self.state = "connected"
+            self.last_error = None
+            return True
             
         except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
-            # Don't raise error - allow fallback to local storage
-            logger.warning("MongoDB connection failed, will use fallback methods")
-            self.client = None
-            self.db = None
+            if self.state == "connected":
+                logger.error(f"Lost MongoDB connection: {e}")
+            else:
+                logger.warning(f"MongoDB connection attempt {self.attempts} failed: {e}")
+            self.state = "disconnected"
+            self.last_error = str(e)
+            self.connected_since = None
+            return False
+    
+    def mark_unavailable(self, error: Exception):
+        """Flag the connection as down after a failed operation and wake the monitor to reconnect"""
+        if self.state == "connected":
+            logger.error(f"MongoDB operation failed, marking connection down: {error}")
+        self.state = "disconnected"
+        self.last_error = str(error)
+        self.connected_since = None
+        self._wake.set()
+    
+    def _check_error(self, error: Exception):
+        if isinstance(error, ConnectionFailure):
+            self.mark_unavailable(error)
+    
+    # ---------- Background reconnect ----------
+    def start_monitor(self):
+        """Connect and keep the connection checked from a background thread (idempotent)"""
+        if self._monitor is not None and self._monitor.is_alive():
+            return
+        self._stop.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="mongodb-monitor", daemon=True)
+        self._monitor.start()
+    
+    def _monitor_loop(self):
+        backoff = RECONNECT_MIN_BACKOFF
+        while not self._stop.is_set():
+            if self._is_connected():
+                backoff = RECONNECT_MIN_BACKOFF
+                self.next_attempt_at = None
+                # Re-ping periodically, or straight away when an operation reports a failure
+                self._wake.wait(HEALTH_INTERVAL)
+                self._wake.clear()
+                if not self._stop.is_set() and self._connect():
+                    self._rebuild_missing_stats()
+                continue
+            
+            self.state = "connecting"
+            if self._connect():
+                self._rebuild_missing_stats()
+                continue
+            # Exponential backoff with jitter so several workers don't reconnect in lockstep
+            delay = random.uniform(backoff / 2, backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_BACKOFF)
+            self.next_attempt_at = time.time() + delay
+            self._stop.wait(delay)
+    
+    def connection_state(self) -> Dict[str, Any]:
+        """Connection state without touching the network (cheap enough for /health)"""
+        now = time.time()
+        return {
+            "state": self.state,
+            "database": self.database_name,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "connected_for_seconds": round(now - self.connected_since, 1) if self.connected_since else None,
+            "next_attempt_in_seconds": round(max(self.next_attempt_at - now, 0), 1)
+                                       if self.next_attempt_at and self.state != "connected" else None,
+        }
     
     def _create_indexes(self):
         """Create indexes for better query performance"""
@@ -98,56 +181,149 @@ class MongoDBStorageManager:
             collection.create_index("status")
             collection.create_index("customer_info.email")
             collection.create_index("customer_info.phone")
+            
+            # Keyset pagination for the admin API: newest first on (timestamp, _id), with the
+            # equality filters ahead of the sort keys and the CIBIL range after them
+            collection.create_index([("timestamp", -1), ("_id", -1), (f"loan_data.{CIBIL_FIELDS[loan_type]}", 1)])
+            collection.create_index([("status", 1), ("timestamp", -1), ("_id", -1)])
+            collection.create_index([("prediction_result.result.status", 1), ("timestamp", -1), ("_id", -1)])
     
     def _is_connected(self) -> bool:
         """Check if MongoDB is connected"""
-        return self.client is not None and self.db is not None
+        return self.state == "connected" and self.db is not None
+    
+    def build_application(self, loan_type: str, session_id: str,
+                          customer_info: Dict[str, Any],
+                          loan_data: Dict[str, Any],
+                          prediction_result: Optional[Dict[str, Any]] = None,
+                          created_at: Optional[float] = None) -> Dict[str, Any]:
+        """Application document as stored; created_at (epoch seconds) defaults to now"""
+        now = datetime.utcnow()
+        timestamp = datetime.utcfromtimestamp(created_at) if created_at else now
+        return {
+            "session_id": session_id,
+            "loan_type": loan_type,
+            "timestamp": timestamp,
+            "customer_info": customer_info,
+            "loan_data": loan_data,
+            "prediction_result": prediction_result,
+            "status": "completed" if prediction_result else "incomplete",
+            "created_at": timestamp,
+            "updated_at": now
+        }
     
     def save_customer_application(self, loan_type: str, session_id: str, 
                                 customer_info: Dict[str, Any], 
                                 loan_data: Dict[str, Any],
-                                prediction_result: Optional[Dict[str, Any]] = None) -> str:
+                                prediction_result: Optional[Dict[str, Any]] = None,
+                                created_at: Optional[float] = None) -> str:
         """Save complete customer application data to MongoDB"""
+        application = self.build_application(loan_type, session_id, customer_info, loan_data,
+                                             prediction_result, created_at)
+        return self.save_applications([application])[0]
+    
+    def save_applications(self, applications: List[Dict[str, Any]]) -> List[str]:
+        """Upsert a batch of applications by session_id with one bulk_write per loan type
+        and fold them into the running stats. Returns the session ids.
         
+        The replace and the stats update run in one transaction, so concurrent saves
+        of the same session can't both subtract the same previous version. Without
+        transactions (a standalone server) each application is replaced with
+        find_one_and_replace, which returns the exact version it replaced.
+        
+        An application never replaces a stored version with a later timestamp, so an
+        outbox replay from another worker can't overwrite a newer save.
+        """
+        session_ids = [application["session_id"] for application in applications]
         if not self._is_connected():
-            logger.warning("MongoDB not connected, skipping save")
-            return session_id
+            # Raise rather than drop the batch, so callers can retry or save it elsewhere
+            raise ConnectionError("MongoDB not connected")
+        
+        by_type: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for application in applications:
+            # A later save of the same session in one batch replaces the earlier one
+            by_type.setdefault(application["loan_type"], {})[application["session_id"]] = application
         
         try:
-            # Create application document
-            application = {
-                "session_id": session_id,
-                "loan_type": loan_type,
-                "timestamp": datetime.utcnow(),
-                "customer_info": customer_info,
-                "loan_data": loan_data,
-                "prediction_result": prediction_result,
-                "status": "completed" if prediction_result else "incomplete",
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            
-            # Get collection for this loan type
-            collection = self.db[f"{loan_type}_loans"]
-            
-            # Insert or update the document
-            result = collection.replace_one(
-                {"session_id": session_id},
-                application,
-                upsert=True
-            )
-            
-            if result.upserted_id:
-                logger.info(f"New application saved: {session_id} for {loan_type} loan")
-                return str(result.upserted_id)
-            else:
-                logger.info(f"Application updated: {session_id} for {loan_type} loan")
-                return session_id
+            for loan_type, latest in by_type.items():
+                if self._transactions:
+                    try:
+                        with self.client.start_session() as session:
+                            new, stale = session.with_transaction(lambda s: self._save_batch(loan_type, latest, s))
+                    except OperationFailure as e:
+                        if e.code != NO_TRANSACTIONS_CODE:
+                            raise
+                        logger.warning(f"MongoDB has no transactions ({e}); saving applications one at a time")
+                        self._transactions = False
+                        new, stale = self._save_each(loan_type, latest)
+                else:
+                    new, stale = self._save_each(loan_type, latest)
+                logger.info(f"Saved {len(latest) - stale} {loan_type} applications ({new} new, "
+                            f"{len(latest) - stale - new} updated, {stale} older than the stored version)")
+            return session_ids
                 
         except Exception as e:
-            logger.error(f"Error saving application to MongoDB: {e}")
+            self._check_error(e)
+            logger.error(f"Error saving applications to MongoDB: {e}")
             raise Exception(f"Failed to save application: {e}")
     
+    def _save_batch(self, loan_type: str, latest: Dict[str, Dict[str, Any]], session) -> Tuple[int, int]:
+        """Replace a loan type's applications and update its stats inside one transaction
+        
+        Returns how many were new and how many were skipped as older than the stored version.
+        """
+        collection = self.db[f"{loan_type}_loans"]
+        # Previous versions, so replaced applications can be taken back out of the stats
+        previous = {
+            doc["session_id"]: doc for doc in collection.find(
+                {"session_id": {"$in": list(latest)}}, projection=PREVIOUS_PROJECTION, session=session
+            )
+        }
+        # Read inside the transaction, so a newer version saved meanwhile is a write conflict and retried
+        current = {sid: application for sid, application in latest.items()
+                   if not _newer(previous.get(sid), application)}
+        if current:
+            collection.bulk_write(
+                [ReplaceOne({"session_id": sid}, application, upsert=True) for sid, application in current.items()],
+                ordered=False, session=session
+            )
+            # A failure here aborts the transaction, so the stats never miss a save
+            self._update_stats(loan_type, [(application, previous.get(sid)) for sid, application in current.items()],
+                               session=session)
+        return sum(1 for sid in current if sid not in previous), len(latest) - len(current)
+    
+    def _save_each(self, loan_type: str, latest: Dict[str, Dict[str, Any]]) -> Tuple[int, int]:
+        """Replace applications one at a time, taking each replaced version from the replace itself"""
+        collection = self.db[f"{loan_type}_loans"]
+        changes = []
+        stale = 0
+        for sid, application in latest.items():
+            try:
+                # Matches only a version that isn't newer; otherwise the upsert hits the unique session_id index
+                previous = collection.find_one_and_replace(
+                    {"session_id": sid, "$or": [{"timestamp": {"$lte": application["timestamp"]}},
+                                                {"timestamp": {"$exists": False}}]}, application,
+                    projection=PREVIOUS_PROJECTION, upsert=True, return_document=ReturnDocument.BEFORE
+                )
+            except DuplicateKeyError:
+                stale += 1
+                continue
+            changes.append((application, previous))
+        if not changes:
+            return 0, stale
+        try:
+            self._update_stats(loan_type, changes)
+        except Exception as e:
+            # The applications are saved but the stats missed them: drop the stats so the
+            # monitor rebuilds them from the collection instead of drifting
+            logger.error(f"Error updating running stats for {loan_type}, rebuilding in the background: {e}")
+            self._check_error(e)
+            try:
+                self.db[self.STATS_COLLECTION].delete_one({"_id": loan_type})
+            except Exception as e:
+                logger.error(f"Error invalidating running stats for {loan_type}: {e}")
+        return sum(1 for _, previous in changes if previous is None), stale
+    
     def get_customer_applications(self, loan_type: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent customer applications for a loan type from MongoDB"""
         
@@ -178,81 +354,235 @@ class MongoDBStorageManager:
             return applications
             
         except Exception as e:
+            self._check_error(e)
             logger.error(f"Error retrieving applications from MongoDB: {e}")
             return []
     
-    def get_application_stats(self, loan_type: str) -> Dict[str, Any]:
-        """Get statistics for a loan type from MongoDB"""
+    def page_applications(self, loan_type: str, limit: int = 10, cursor: Optional[str] = None,
+                          status: Optional[str] = None, approval_status: Optional[str] = None,
+                          start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          cibil_min: Optional[float] = None, cibil_max: Optional[float] = None,
+                          fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of applications, newest first, and the cursor for the next page (None on the last)
         
+        Pages are keyset-paginated on (timestamp, _id), so every page is an index range
+        scan of `limit` documents however deep the client has paged.
+        """
         if not self._is_connected():
-            logger.warning("MongoDB not connected, returning empty stats")
-            return {"total": 0, "completed": 0, "approved": 0, "partial": 0, "average_amount": 0, "average_interest": 0}
+            raise ConnectionError("MongoDB not connected")
         
-        try:
-            collection = self.db[f"{loan_type}_loans"]
-            
-            # Get total count
-            total = collection.count_documents({})
-            
-            # Get completed applications
-            completed = collection.count_documents({"status": "completed"})
-            
-            # Get approval statistics
-            approved = collection.count_documents({
-                "prediction_result.result.status": "APPROVED"
-            })
-            
-            partial = collection.count_documents({
-                "prediction_result.result.status": "PARTIAL_APPROVAL"
-            })
-            
-            # Calculate averages for completed applications
-            pipeline = [
-                {"$match": {"status": "completed", "prediction_result": {"$exists": True}}},
-                {"$group": {
-                    "_id": None,
-                    "avg_amount": {"$avg": {
-                        "$ifNull": [
-                            "$prediction_result.result.eligible_amount",
-                            "$prediction_result.result.approved_amount"
-                        ]
-                    }},
-                    "avg_interest": {"$avg": "$prediction_result.result.interest_rate"}
-                }}
+        query: Dict[str, Any] = {}
+        if status:
+            query["status"] = status
+        if approval_status:
+            query["prediction_result.result.status"] = approval_status
+        if start or end:
+            query["timestamp"] = {}
+            if start:
+                query["timestamp"]["$gte"] = start
+            if end:
+                query["timestamp"]["$lt"] = end
+        if cibil_min is not None or cibil_max is not None:
+            cibil = query[f"loan_data.{CIBIL_FIELDS[loan_type]}"] = {}
+            if cibil_min is not None:
+                cibil["$gte"] = cibil_min
+            if cibil_max is not None:
+                cibil["$lte"] = cibil_max
+        if cursor:
+            timestamp, key = decode_cursor(cursor)
+            try:
+                last_timestamp, last_id = datetime.fromisoformat(timestamp), ObjectId(key)
+            except Exception:
+                raise ValueError("Invalid cursor")
+            query["$or"] = [
+                {"timestamp": {"$lt": last_timestamp}},
+                {"timestamp": last_timestamp, "_id": {"$lt": last_id}},
             ]
-            
-            avg_result = list(collection.aggregate(pipeline))
-            
-            stats = {
-                "total": total,
-                "completed": completed,
-                "approved": approved,
-                "partial": partial,
-                "average_amount": avg_result[0]["avg_amount"] if avg_result else 0,
-                "average_interest": avg_result[0]["avg_interest"] if avg_result else 0
-            }
-            
-            logger.info(f"Retrieved stats for {loan_type} loans: {stats}")
-            return stats
-            
+        
+        # The cursor needs timestamp and _id even when the caller didn't ask for them
+        fields = normalize_fields(fields)
+        projection = {field: 1 for field in normalize_fields(fields + ["timestamp"])} if fields else None
+        
+        try:
+            docs = list(self.db[f"{loan_type}_loans"].find(query, projection=projection)
+                        .sort([("timestamp", -1), ("_id", -1)]).limit(limit))
         except Exception as e:
-            logger.error(f"Error getting stats from MongoDB: {e}")
-            return {"total": 0, "completed": 0, "approved": 0, "partial": 0, "average_amount": 0, "average_interest": 0}
+            self._check_error(e)
+            logger.error(f"Error paging applications from MongoDB: {e}")
+            raise
+        
+        next_cursor = None
+        if len(docs) == limit:
+            next_cursor = encode_cursor(docs[-1]["timestamp"].isoformat(), str(docs[-1]["_id"]))
+        for doc in docs:
+            # Datetimes are left to the response encoder; ObjectId isn't JSON serializable
+            doc["_id"] = str(doc["_id"])
+            if fields and "timestamp" not in fields:
+                del doc["timestamp"]
+        return docs, next_cursor
     
-    def get_all_stats(self) -> Dict[str, Dict[str, Any]]:
-        """Get statistics for all loan types"""
+    def _update_stats(self, loan_type: str, changes: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]],
+                      session=None):
+        """Fold saved (application, previous version) pairs into the running stats document for their loan type
+        
+        The document is only updated, never created: a missing one is built from the
+        collection by rebuild_stats(), which already includes these saves. Every update
+        bumps seq, so a rebuild can tell that a save landed while it was aggregating.
+        """
+        delta = {c: 0 for c in COUNTERS}
+        mins: Dict[str, float] = {}
+        maxes: Dict[str, float] = {}
+        for application, previous in changes:
+            added = application_contribution(application)
+            for c in COUNTERS:
+                delta[c] += added[c]
+            if previous is not None:
+                # Replacing an application: take the old version's counts back out
+                removed = application_contribution(previous)
+                for c in COUNTERS:
+                    delta[c] -= removed[c]
+            for c in ["amount_min", "interest_min"]:
+                if added[c] is not None:
+                    mins[c] = min(mins.get(c, added[c]), added[c])
+            for c in ["amount_max", "interest_max"]:
+                if added[c] is not None:
+                    maxes[c] = max(maxes.get(c, added[c]), added[c])
+        
+        update = {"$inc": {**delta, "seq": 1}, "$set": {"updated_at": datetime.utcnow()}}
+        if mins:
+            update["$min"] = mins
+        if maxes:
+            update["$max"] = maxes
+        
+        self.db[self.STATS_COLLECTION].update_one({"_id": loan_type}, update, session=session)
+    
+    def rebuild_stats(self, loan_type: Optional[str] = None, attempts: int = 5) -> Dict[str, Dict[str, Any]]:
+        """Recompute running stats from the application collections
+        
+        With transactions the aggregate and the write share one snapshot, and a save
+        committed meanwhile is a write conflict that with_transaction retries. Without
+        them the write only goes through if no stats update landed since the rebuild
+        started (seq unchanged); otherwise the rebuild is repeated.
+        """
+        if not self._is_connected():
+            raise ConnectionError("MongoDB not connected")
+        
+        loan_types = [loan_type] if loan_type else ["education", "home", "personal", "gold", "business", "car"]
+        rebuilt = {}
+        for lt in loan_types:
+            for _ in range(attempts):
+                aggregates = self._rebuild_in_transaction(lt) if self._transactions else self._rebuild_once(lt)
+                if aggregates is not None:
+                    break
+            else:
+                raise RuntimeError(f"Stats for {lt} loans kept changing during {attempts} rebuilds")
+            rebuilt[lt] = summarize(aggregates)
+            logger.info(f"Rebuilt stats for {lt} loans: {rebuilt[lt]}")
+        
+        return rebuilt
+    
+    def _rebuild_in_transaction(self, loan_type: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self.client.start_session() as session:
+                return session.with_transaction(lambda s: self._rebuild_once(loan_type, s))
+        except OperationFailure as e:
+            if e.code != NO_TRANSACTIONS_CODE:
+                raise
+            logger.warning(f"MongoDB has no transactions ({e}); rebuilding stats with a seq guard")
+            self._transactions = False
+            return self._rebuild_once(loan_type)
+    
+    def _rebuild_once(self, loan_type: str, session=None) -> Optional[Dict[str, Any]]:
+        """Aggregate one loan type and store it unless a save updated the stats meanwhile (then None)"""
+        stats = self.db[self.STATS_COLLECTION]
+        before = stats.find_one({"_id": loan_type}, projection={"seq": 1}, session=session)
+        aggregates = self._aggregate_stats(loan_type, session)
+        aggregates["updated_at"] = datetime.utcnow()
+        if before is None:
+            aggregates["seq"] = 0
+            try:
+                stats.insert_one({"_id": loan_type, **aggregates}, session=session)
+            except DuplicateKeyError:
+                return None  # another rebuild stored it first
+        else:
+            # A document from before seq existed matches seq: None
+            aggregates["seq"] = before.get("seq") or 0
+            if not stats.replace_one({"_id": loan_type, "seq": before.get("seq")}, aggregates,
+                                     session=session).matched_count:
+                return None
+        return aggregates
+    
+    def _aggregate_stats(self, loan_type: str, session=None) -> Dict[str, Any]:
+        """Running-stats counters computed from scratch over a loan type's applications"""
+        amount = {"$ifNull": [
+            "$prediction_result.result.eligible_amount",
+            "$prediction_result.result.approved_amount"
+        ]}
+        interest = "$prediction_result.result.interest_rate"
+        approval = "$prediction_result.result.status"
+        
+        def count_if(condition):
+            return {"$sum": {"$cond": [condition, 1, 0]}}
+        
+        pipeline = [{"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "completed": count_if({"$eq": ["$status", "completed"]}),
+            "approved": count_if({"$eq": [approval, "APPROVED"]}),
+            "partial": count_if({"$eq": [approval, "PARTIAL_APPROVAL"]}),
+            "amount_sum": {"$sum": amount},
+            "amount_count": count_if({"$isNumber": amount}),
+            "interest_sum": {"$sum": interest},
+            "interest_count": count_if({"$isNumber": interest}),
+            "amount_min": {"$min": amount},
+            "amount_max": {"$max": amount},
+            "interest_min": {"$min": interest},
+            "interest_max": {"$max": interest},
+        }}]
+        result = list(self.db[f"{loan_type}_loans"].aggregate(pipeline, session=session))
+        aggregates = result[0] if result else {c: 0 for c in COUNTERS}
+        aggregates.pop("_id", None)
+        return aggregates
+    
+    def _rebuild_missing_stats(self):
+        """Build the stats documents that don't exist yet (called from the monitor, never a request)"""
         loan_types = ["education", "home", "personal", "gold", "business", "car"]
-        all_stats = {}
+        try:
+            existing = {doc["_id"] for doc in self.db[self.STATS_COLLECTION].find(
+                {"_id": {"$in": loan_types}}, projection={"_id": 1})}
+            for lt in loan_types:
+                if lt not in existing:
+                    self.rebuild_stats(lt)
+        except Exception as e:
+            self._check_error(e)
+            logger.error(f"Error rebuilding missing stats, retrying on the next check: {e}")
+    
+    def get_application_stats(self, loan_type: str) -> Dict[str, Any]:
+        """Get statistics for a loan type from the running stats document"""
+        return self.get_all_stats([loan_type])[loan_type]
+    
+    def get_all_stats(self, loan_types: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Get statistics for all loan types in one round trip"""
+        loan_types = loan_types or ["education", "home", "personal", "gold", "business", "car"]
         
-        for loan_type in loan_types:
-            all_stats[loan_type] = self.get_application_stats(loan_type)
+        if not self._is_connected():
+            logger.warning("MongoDB not connected, returning empty stats")
+            return {lt: summarize(None) for lt in loan_types}
         
-        return all_stats
+        try:
+            docs = {doc["_id"]: doc for doc in self.db[self.STATS_COLLECTION].find({"_id": {"$in": loan_types}})}
+            # A loan type without a stats document yet (the monitor builds it in the background)
+            # is aggregated read-only, so this read never races the saves with a write
+            return {lt: summarize(docs[lt] if lt in docs else self._aggregate_stats(lt)) for lt in loan_types}
+            
+        except Exception as e:
+            self._check_error(e)
+            logger.error(f"Error getting stats from MongoDB: {e}")
+            return {lt: summarize(None) for lt in loan_types}
     
     def export_to_csv(self, loan_type: str) -> str:
         """Generate CSV export and return file path (for compatibility with local storage)"""
         from pathlib import Path
-        import csv
         
         # Create reports directory
         reports_dir = Path("customer_data") / loan_type / "reports"
@@ -260,109 +590,114 @@ class MongoDBStorageManager:
         
         csv_path = reports_dir / f"{loan_type}_applications.csv"
         
-        # Get data from MongoDB
-        csv_data = self.export_to_csv_data(loan_type)
-        
-        if not csv_data:
-            # Create empty CSV with headers
-            headers = ["timestamp", "session_id", "customer_name", "customer_email", 
-                      "customer_phone", "status", "eligible_amount", "interest_rate", 
-                      "requested_amount", "approval_status"]
-            
-            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-        else:
-            # Write data to CSV
-            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-                if csv_data:
-                    writer = csv.DictWriter(f, fieldnames=csv_data[0].keys())
-                    writer.writeheader()
-                    writer.writerows(csv_data)
+        # Stream completed applications from the cursor straight into the file
+        write_csv(csv_path, self.iter_export_rows(loan_type, status="completed"))
         
         return str(csv_path)
     
     def export_to_csv_data(self, loan_type: str) -> List[Dict[str, Any]]:
-        """Get all applications for CSV export"""
+        """Get all completed applications for CSV export"""
+        return list(self.iter_export_rows(loan_type, status="completed"))
+    
+    def iter_export_rows(self, loan_type: str, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None, status: Optional[str] = None,
+                         batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Yield CSV rows oldest first straight from a MongoDB cursor (start inclusive, end exclusive)"""
+        if not self._is_connected():
+            logger.warning("MongoDB not connected, nothing to export")
+            return
+        
+        query: Dict[str, Any] = {}
+        if status:
+            query["status"] = status
+        if start or end:
+            query["timestamp"] = {}
+            if start:
+                query["timestamp"]["$gte"] = start
+            if end:
+                query["timestamp"]["$lt"] = end
+        
+        collection = self.db[f"{loan_type}_loans"]
+        cursor = collection.find(query, projection={"_id": 0}).sort("timestamp", 1).batch_size(batch_size)
         
+        exported = 0
         try:
-            collection = self.db[f"{loan_type}_loans"]
-            
-            # Get all completed applications
-            cursor = collection.find({"status": "completed"}).sort("timestamp", 1)
-            
-            csv_data = []
             for doc in cursor:
-                # Prepare row data
-                row_data = {
-                    "timestamp": doc["timestamp"].isoformat() if isinstance(doc["timestamp"], datetime) else doc["timestamp"],
-                    "session_id": doc["session_id"],
-                    "customer_name": doc["customer_info"].get("name", ""),
-                    "customer_email": doc["customer_info"].get("email", ""),
-                    "customer_phone": doc["customer_info"].get("phone", ""),
-                    "status": doc["status"]
-                }
-                
-                # Add prediction results
-                if doc.get("prediction_result"):
-                    result = doc["prediction_result"]["result"]
-                    row_data.update({
-                        "eligible_amount": result.get("eligible_amount", result.get("approved_amount", 0)),
-                        "interest_rate": result.get("interest_rate", 0),
-                        "requested_amount": result.get("requested_amount", 0),
-                        "approval_status": result.get("status", "")
-                    })
-                
-                # Add loan-specific fields
-                loan_data = doc["loan_data"]
-                if loan_type == "education":
-                    row_data.update({
-                        "age": loan_data.get("Age", ""),
-                        "academic_performance": loan_data.get("Academic_Performance", ""),
-                        "intended_course": loan_data.get("Intended_Course", ""),
-                        "cibil_score": loan_data.get("CIBIL_Score", "")
-                    })
-                elif loan_type == "home":
-                    row_data.update({
-                        "age": loan_data.get("Age", ""),
-                        "income": loan_data.get("Income", ""),
-                        "property_value": loan_data.get("Property_value", ""),
-                        "cibil_score": loan_data.get("CIBIL_score", "")
-                    })
-                elif loan_type == "personal":
-                    row_data.update({
-                        "age": loan_data.get("Age", ""),
-                        "annual_income": loan_data.get("Annual_Income", ""),
-                        "employment_type": loan_data.get("Employment_Type", ""),
-                        "cibil_score": loan_data.get("CIBIL_Score", "")
-                    })
-                elif loan_type == "gold":
-                    row_data.update({
-                        "age": loan_data.get("Age", ""),
-                        "occupation": loan_data.get("Occupation", ""),
-                        "annual_income": loan_data.get("Annual_Income", ""),
-                        "cibil_score": loan_data.get("CIBIL_Score", ""),
-                        "gold_value": loan_data.get("Gold_Value", ""),
-                        "loan_tenure": loan_data.get("Loan_Tenure", "")
-                    })
-                elif loan_type == "business":
-                    row_data.update({
-                        "business_age_years": loan_data.get("Business_Age_Years", ""),
-                        "annual_revenue": loan_data.get("Annual_Revenue", ""),
-                        "net_profit": loan_data.get("Net_Profit", ""),
-                        "cibil_score": loan_data.get("CIBIL_Score", ""),
-                        "business_type": loan_data.get("Business_Type", ""),
-                        "has_collateral": loan_data.get("Has_Collateral", "")
-                    })
-                
-                csv_data.append(row_data)
-            
-            logger.info(f"Prepared {len(csv_data)} records for CSV export for {loan_type} loans")
-            return csv_data
-            
-        except Exception as e:
-            logger.error(f"Error preparing CSV data from MongoDB: {e}")
-            return []
+                yield self._csv_row(loan_type, doc)
+                exported += 1
+        finally:
+            cursor.close()
+            logger.info(f"Exported {exported} records to CSV for {loan_type} loans")
+    
+    def _csv_row(self, loan_type: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Flatten an application document into a CSV row (same columns for every row of a loan type)"""
+        # Prepare row data
+        row_data = {
+            "timestamp": doc["timestamp"].isoformat() if isinstance(doc["timestamp"], datetime) else doc["timestamp"],
+            "session_id": doc["session_id"],
+            "customer_name": doc["customer_info"].get("name", ""),
+            "customer_email": doc["customer_info"].get("email", ""),
+            "customer_phone": doc["customer_info"].get("phone", ""),
+            "status": doc["status"],
+            "eligible_amount": "",
+            "interest_rate": "",
+            "requested_amount": "",
+            "approval_status": ""
+        }
+        
+        # Add prediction results
+        if doc.get("prediction_result"):
+            result = doc["prediction_result"]["result"]
+            row_data.update({
+                "eligible_amount": result.get("eligible_amount", result.get("approved_amount", 0)),
+                "interest_rate": result.get("interest_rate", 0),
+                "requested_amount": result.get("requested_amount", 0),
+                "approval_status": result.get("status", "")
+            })
+        
+        # Add loan-specific fields
+        loan_data = doc["loan_data"]
+        if loan_type == "education":
+            row_data.update({
+                "age": loan_data.get("Age", ""),
+                "academic_performance": loan_data.get("Academic_Performance", ""),
+                "intended_course": loan_data.get("Intended_Course", ""),
+                "cibil_score": loan_data.get("CIBIL_Score", "")
+            })
+        elif loan_type == "home":
+            row_data.update({
+                "age": loan_data.get("Age", ""),
+                "income": loan_data.get("Income", ""),
+                "property_value": loan_data.get("Property_value", ""),
+                "cibil_score": loan_data.get("CIBIL_score", "")
+            })
+        elif loan_type == "personal":
+            row_data.update({
+                "age": loan_data.get("Age", ""),
+                "annual_income": loan_data.get("Annual_Income", ""),
+                "employment_type": loan_data.get("Employment_Type", ""),
+                "cibil_score": loan_data.get("CIBIL_Score", "")
+            })
+        elif loan_type == "gold":
+            row_data.update({
+                "age": loan_data.get("Age", ""),
+                "occupation": loan_data.get("Occupation", ""),
+                "annual_income": loan_data.get("Annual_Income", ""),
+                "cibil_score": loan_data.get("CIBIL_Score", ""),
+                "gold_value": loan_data.get("Gold_Value", ""),
+                "loan_tenure": loan_data.get("Loan_Tenure", "")
+            })
+        elif loan_type == "business":
+            row_data.update({
+                "business_age_years": loan_data.get("Business_Age_Years", ""),
+                "annual_revenue": loan_data.get("Annual_Revenue", ""),
+                "net_profit": loan_data.get("Net_Profit", ""),
+                "cibil_score": loan_data.get("CIBIL_Score", ""),
+                "business_type": loan_data.get("Business_Type", ""),
+                "has_collateral": loan_data.get("Has_Collateral", "")
+            })
+        
+        return row_data
     
     def get_connection_status(self) -> Dict[str, Any]:
         """Check MongoDB connection status"""
@@ -383,11 +718,16 @@ class MongoDBStorageManager:
         except Exception as e:
             return {
                 "connected": False,
-                "error": str(e)
+                "error": str(e),
+                **self.connection_state()
             }
     
     def close_connection(self):
-        """Close MongoDB connection"""
+        """Stop the reconnect monitor and close the MongoDB connection"""
+        self._stop.set()
+        self._wake.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout=5)
         if self.client:
             self.client.close()
             logger.info("MongoDB connection closed")
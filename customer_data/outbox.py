@@ -0,0 +1,286 @@
+import os
+import re
+import json
+import time
+import socket
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+from .file_lock import fcntl, try_lock
+
+logger = logging.getLogger(__name__)
+
+# Part of segment names, so processes in different containers sharing the directory never collide
+_HOST = re.sub(r"[^A-Za-z0-9]", "", socket.gethostname()) or "host"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ApplicationOutbox:
+    """Append-only NDJSON segment log holding applications while MongoDB is unreachable
+
+    Each process appends to its own "<ns>-<host>-<pid>.active" segment with one
+    fsync per append() call, so a batch from the write-behind queue costs a single
+    fsync. Full segments are sealed (renamed to .ndjson) and a background replayer
+    claims sealed segments one at a time and saves them in bulk once MongoDB is back.
+
+    A process holds an flock on its active segment, and on a segment it is
+    replaying, for as long as it uses it. The OS drops the lock when the process
+    dies, so a segment whose lock can be taken has been left behind; the others
+    seal and replay it. PIDs alone can't tell that when containers share the
+    directory, since they repeat across PID namespaces.
+    """
+
+    def __init__(self, directory: str = "customer_data/outbox", segment_records: int = 5000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_records = segment_records
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._active_path: Optional[Path] = None
+        self._active_records = 0
+        # Records in each sealed segment of this process, until some process has replayed it
+        self._sealed: Dict[str, int] = {}
+        # Records this process appended that haven't been replayed yet
+        self.pending = 0
+
+        self.counters = {"appended": 0, "fsyncs": 0, "segments_sealed": 0,
+                         "replayed": 0, "replay_batches": 0, "replay_failures": 0}
+        self.last_replay: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- Appending ----------
+    def append(self, jobs: List[Dict[str, Any]]):
+        """Durably append jobs (returns after the fsync)"""
+        with self._lock:
+            self._append_locked(jobs)
+
+    def append_if_pending(self, jobs: List[Dict[str, Any]]) -> bool:
+        """Append only while earlier records are still waiting, so replay keeps save order"""
+        with self._lock:
+            self._refresh_pending_locked()
+            if not self.pending:
+                return False
+            self._append_locked(jobs)
+            return True
+
+    def _append_locked(self, jobs: List[Dict[str, Any]]):
+        if not jobs:
+            return
+        if self._file is None:
+            # Opened on first use so a pre-forked master never holds a worker's segment
+            self._open_segment_locked()
+        self._file.write("".join(json.dumps(job, ensure_ascii=False, default=str) + "\n" for job in jobs))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self.counters["appended"] += len(jobs)
+        self.counters["fsyncs"] += 1
+        self._active_records += len(jobs)
+        self.pending += len(jobs)
+        if self._active_records >= self.segment_records:
+            self._seal_locked()
+
+    def _open_segment_locked(self, attempts: int = 3):
+        # Created under a name recovery never scans and locked before it gets its .active
+        # name, so recovery never finds a live segment unlocked
+        for _ in range(attempts):
+            name = f"{time.time_ns():020d}-{self._owner()}"
+            creating = self.directory / f"{name}.creating"
+            try:
+                fd = os.open(creating, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+            except FileExistsError:
+                continue
+            f = os.fdopen(fd, "a", encoding="utf-8")
+            if not try_lock(f.fileno()):
+                f.close()
+                continue
+            self._active_path = creating.with_suffix(".active")
+            os.replace(creating, self._active_path)
+            self._file = f
+            return
+        raise OSError(f"Could not create and lock a new outbox segment in {self.directory}")
+
+    @staticmethod
+    def _owner() -> str:
+        return f"{_HOST}-{os.getpid()}"
+
+    def _seal_locked(self):
+        if self._file is None:
+            return
+        # Renamed while still locked; closing releases the lock
+        os.replace(self._active_path, self._active_path.with_suffix(".ndjson"))
+        self._sealed[self._active_path.stem] = self._active_records
+        self._file.close()
+        self._file = None
+        self._active_path = None
+        self._active_records = 0
+        self.counters["segments_sealed"] += 1
+
+    def _refresh_pending_locked(self):
+        """Forget sealed segments of this process that any process has replayed since"""
+        for stem in list(self._sealed):
+            sealed = self.directory / f"{stem}.ndjson"
+            # Checked again after the claimed name, in case a failed replay just put it back
+            if not (sealed.exists() or next(self.directory.glob(f"{stem}.replaying-*"), None) is not None
+                    or sealed.exists()):
+                del self._sealed[stem]
+        self.pending = self._active_records + sum(self._sealed.values())
+
+    def _recover_orphans(self):
+        """Seal active segments, and release claimed ones, whose process has died"""
+        paths = [path for pattern in ("*.active", "*.replaying-*") for path in self.directory.glob(pattern)]
+        for path in paths:
+            if path == self._active_path:
+                continue
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue  # sealed, replayed or recovered meanwhile
+            with f:
+                if not self._owner_exited(path, f.fileno()):
+                    continue
+                try:
+                    os.replace(path, path.with_suffix(".ndjson"))
+                    logger.info("Recovered outbox segment %s from an exited process", path.name)
+                except FileNotFoundError:
+                    pass  # another process recovered it first
+
+    @staticmethod
+    def _owner_exited(path: Path, fd: int) -> bool:
+        if fcntl is not None:
+            return try_lock(fd)
+        # No flock (Windows): a single host, so the PID in the name identifies the owner
+        owner = path.suffix.rsplit("-", 1)[-1] if path.suffix.startswith(".replaying") else path.stem.rsplit("-", 1)[-1]
+        return owner.isdigit() and int(owner) != os.getpid() and not _pid_alive(int(owner))
+
+    # ---------- Replay ----------
+    @staticmethod
+    def _read(path: Path) -> List[Dict[str, Any]]:
+        jobs = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        jobs.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Only a write torn by a crash can leave a partial last line
+                        logger.error("Dropping corrupt outbox line in %s: %.200s", path.name, line)
+        return jobs
+
+    def drain(self, save: Callable[[List[Dict[str, Any]]], Any], batch_size: int = 500) -> int:
+        """Replay every sealed segment through save() in batches, oldest first
+
+        A segment is deleted only after all its batches are saved; if save() raises,
+        the segment is put back and replayed from the start next time, which is safe
+        because saves are upserts by session_id that never replace a newer version.
+        """
+        with self._lock:
+            self._seal_locked()
+        self._recover_orphans()
+
+        started = time.monotonic()
+        replayed = 0
+        try:
+            for segment in sorted(self.directory.glob("*.ndjson")):
+                claimed = segment.with_suffix(f".replaying-{self._owner()}")
+                try:
+                    f = open(segment, "rb")
+                except FileNotFoundError:
+                    continue  # claimed by another process
+                # The lock is held across the claim and the replay, so recovery leaves it alone
+                with f:
+                    if not try_lock(f.fileno()):
+                        continue
+                    try:
+                        os.replace(segment, claimed)
+                    except FileNotFoundError:
+                        continue  # replayed by another process before we got the lock
+                    jobs = self._read(claimed)
+                    try:
+                        for start in range(0, len(jobs), batch_size):
+                            save(jobs[start:start + batch_size])
+                            self.counters["replay_batches"] += 1
+                    except Exception:
+                        os.replace(claimed, segment)
+                        raise
+                    os.remove(claimed)
+                replayed += len(jobs)
+                self.counters["replayed"] += len(jobs)
+        finally:
+            with self._lock:
+                self._refresh_pending_locked()
+            if replayed:
+                elapsed = time.monotonic() - started
+                self.last_replay = {
+                    "records": replayed,
+                    "seconds": round(elapsed, 3),
+                    "records_per_second": round(replayed / elapsed, 1) if elapsed else None,
+                    "finished_at": time.time(),
+                }
+                logger.info("Replayed %d outbox records in %.2fs", replayed, elapsed)
+        return replayed
+
+    def has_segments(self) -> bool:
+        return bool(self._active_records) or any(
+            next(self.directory.glob(pattern), None) is not None
+            for pattern in ("*.ndjson", "*.active", "*.replaying-*")
+        )
+
+    def start_replayer(self, ready: Callable[[], bool], save: Callable[[List[Dict[str, Any]]], Any],
+                       batch_size: int = 500, interval: float = 1.0):
+        """Drain the outbox from a background thread whenever ready() says the target is up"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._replay_loop, args=(ready, save, batch_size, interval),
+                                        name="outbox-replayer", daemon=True)
+        self._thread.start()
+
+    def _replay_loop(self, ready, save, batch_size: int, interval: float):
+        while not self._stop.wait(interval):
+            if not ready() or not self.has_segments():
+                continue
+            try:
+                self.drain(save, batch_size)
+            except Exception as e:
+                self.counters["replay_failures"] += 1
+                logger.warning("Outbox replay stopped, will retry: %s", e)
+
+    def close(self):
+        """Stop the replayer and seal this process's segment for whoever replays next"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        with self._lock:
+            self._seal_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_pending_locked()
+        sizes = []
+        for pattern in ("*.ndjson", "*.active", "*.replaying-*"):
+            for path in self.directory.glob(pattern):
+                try:
+                    sizes.append(path.stat().st_size)
+                except FileNotFoundError:
+                    pass  # replayed or sealed while listing
+        return {
+            "pending": self.pending,
+            "segments_on_disk": len(sizes),
+            "bytes_on_disk": sum(sizes),
+            **self.counters,
+            "last_replay": self.last_replay or None,
+        }
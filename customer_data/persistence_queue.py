@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+
+class PersistenceQueue:
+    """Write-behind saving of completed applications.
+
+    Request handlers only enqueue(); a background thread drains the queue in
+    batches through the storage manager's save_applications(), retrying with
+    backoff. Jobs that can't be queued (queue full) or written (retries
+    exhausted, or still pending at shutdown) are appended to an NDJSON spill
+    file, which the writer replays whenever the queue is idle (including right
+    after start).
+
+    Every worker process may share one spill file. Appends and the claim that
+    renames it for replay hold a lock file; only the process holding the replay
+    lock replays, so a spill left by a dead worker is replayed exactly once.
+    """
+
+    def __init__(self, storage, max_size: int = 1000, batch_size: int = 100,
+                 flush_interval: float = 0.2, max_retries: int = 5,
+                 spill_path: str = "customer_data/pending_applications.ndjson"):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.spill_path = Path(spill_path)
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_size)
+        self._spill_lock = FileLock(self.spill_path.with_suffix(".lock"))
+        self._replay_lock = FileLock(self.spill_path.with_suffix(".replay.lock"))
+        self._stop = threading.Event()
+        self.counters = {"enqueued": 0, "written": 0, "batches": 0, "retries": 0,
+                         "spilled": 0, "replayed": 0}
+        self._replay_after = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, loan_type: str, session_id: str, customer_info: Dict[str, Any],
+                loan_data: Dict[str, Any], prediction_result: Optional[Dict[str, Any]] = None) -> bool:
+        """Queue an application for saving; returns False if it went to the spill file instead"""
+        job = {
+            "loan_type": loan_type,
+            "session_id": session_id,
+            "customer_info": customer_info,
+            "loan_data": loan_data,
+            "prediction_result": prediction_result,
+            "created_at": time.time(),
+        }
+        if self._stop.is_set():
+            self._spill([job])
+            return False
+        try:
+            self._queue.put_nowait(job)
+            self.counters["enqueued"] += 1
+            return True
+        except queue.Full:
+            logger.warning("Persistence queue full, spilling application %s to disk", session_id)
+            self._spill([job])
+            return False
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]], retries: Optional[int] = None) -> bool:
+        """Save a batch, retrying with exponential backoff; spills it if every attempt fails"""
+        retries = self.max_retries if retries is None else retries
+        applications = [self.storage.build_application(**job) for job in batch]
+        for attempt in range(retries + 1):
+            try:
+                self.storage.save_applications(applications)
+                self.counters["written"] += len(batch)
+                self.counters["batches"] += 1
+                return True
+            except Exception as e:
+                if attempt == retries:
+                    logger.error("Saving %d applications failed after %d attempts, spilling: %s",
+                                 len(batch), attempt + 1, e)
+                    break
+                self.counters["retries"] += 1
+                delay = min(0.5 * 2 ** attempt, 30)
+                logger.warning("Saving %d applications failed (%s), retrying in %.1fs", len(batch), e, delay)
+                if self._stop.wait(delay):
+                    break  # shutting down: don't hold up exit, keep the batch on disk
+        self._spill(batch)
+        return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._step()
+            except Exception:
+                # Keep the writer alive; whatever failed is retried on a later pass
+                logger.exception("Persistence writer error")
+                self._stop.wait(1.0)
+
+    def _step(self):
+        batch = self._next_batch()
+        if batch:
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        elif time.monotonic() >= self._replay_after and self._has_spill():
+            self.replay_spill()
+
+    # ---------- Spill file ----------
+    def _spill(self, jobs: List[Dict[str, Any]]):
+        with self._spill_lock:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for job in jobs:
+                    f.write(json.dumps(job, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.counters["spilled"] += len(jobs)
+
+    def _claimed_path(self) -> Path:
+        return self.spill_path.with_suffix(".replaying")
+
+    def _has_spill(self) -> bool:
+        return self.spill_path.exists() or self._claimed_path().exists()
+
+    def replay_spill(self) -> int:
+        """Save everything in the spill file; lines that fail again are spilled back
+
+        Returns 0 without waiting when another process is already replaying.
+        """
+        if not self._replay_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._replay_locked()
+        finally:
+            self._replay_lock.release()
+
+    def _replay_locked(self) -> int:
+        claimed = self._claimed_path()
+        with self._spill_lock:
+            # Claim the file so new spills during the replay go to a fresh one. A claimed
+            # file left by a crash mid-replay is replayed first; the spill file waits its turn.
+            if not claimed.exists():
+                if not self.spill_path.exists():
+                    return 0
+                os.replace(self.spill_path, claimed)
+
+        jobs = []
+        with open(claimed, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        jobs.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logger.error("Dropping corrupt spill line: %.200s", line)
+
+        replayed = 0
+        for start in range(0, len(jobs), self.batch_size):
+            batch = jobs[start:start + self.batch_size]
+            if self._write(batch, retries=0):
+                replayed += len(batch)
+        try:
+            os.remove(claimed)
+        except FileNotFoundError:
+            pass  # already gone: nothing left to replay
+        self.counters["replayed"] += replayed
+        if jobs:
+            logger.info("Replayed %d of %d spilled applications", replayed, len(jobs))
+        if replayed < len(jobs):
+            # Storage still failing: don't churn the spill file on every idle tick
+            self._replay_after = time.monotonic() + 30
+        return replayed
+
+    # ---------- Lifecycle ----------
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything queued so far has been written (or spilled)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return not self._queue.unfinished_tasks
+
+    def close(self, timeout: float = 10.0):
+        """Stop the writer and persist whatever is still queued"""
+        self._stop.set()
+        self._thread.join(timeout)
+        remaining = []
+        while True:
+            try:
+                remaining.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(remaining), self.batch_size):
+            self._write(remaining[start:start + self.batch_size], retries=0)
+        for _ in remaining:
+            self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "spill_file": str(self.spill_path) if self._has_spill() else None,
+            **self.counters,
+        }
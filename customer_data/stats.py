@@ -0,0 +1,61 @@
+from typing import Dict, Any, Optional
+
+# Running aggregates kept per loan type; averages and ratios are derived on read
+COUNTERS = ["total", "completed", "approved", "partial",
+            "amount_sum", "amount_count", "interest_sum", "interest_count"]
+EXTREMES = ["amount_min", "amount_max", "interest_min", "interest_max"]
+
+EMPTY_STATS = {"total": 0, "completed": 0, "approved": 0, "partial": 0}
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def application_contribution(application: Dict[str, Any]) -> Dict[str, Any]:
+    """What one saved application adds to its loan type's running aggregates"""
+    result = (application.get("prediction_result") or {}).get("result") or {}
+    amount = _number(result.get("eligible_amount", result.get("approved_amount")))
+    interest = _number(result.get("interest_rate"))
+    return {
+        "total": 1,
+        "completed": int(application.get("status") == "completed"),
+        "approved": int(result.get("status") == "APPROVED"),
+        "partial": int(result.get("status") == "PARTIAL_APPROVAL"),
+        "amount_sum": amount or 0.0,
+        "amount_count": int(amount is not None),
+        "interest_sum": interest or 0.0,
+        "interest_count": int(interest is not None),
+        "amount_min": amount,
+        "amount_max": amount,
+        "interest_min": interest,
+        "interest_max": interest,
+    }
+
+
+def summarize(aggregates: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Turn stored running aggregates into the stats returned by the admin API"""
+    if not aggregates or not aggregates.get("total"):
+        return dict(EMPTY_STATS)
+
+    amount_count = aggregates.get("amount_count") or 0
+    interest_count = aggregates.get("interest_count") or 0
+    completed = aggregates.get("completed") or 0
+    return {
+        "total": aggregates["total"],
+        "completed": completed,
+        "approved": aggregates.get("approved") or 0,
+        "partial": aggregates.get("partial") or 0,
+        "average_amount": aggregates.get("amount_sum", 0) / amount_count if amount_count else 0,
+        "average_interest": aggregates.get("interest_sum", 0) / interest_count if interest_count else 0,
+        "min_amount": aggregates.get("amount_min"),
+        "max_amount": aggregates.get("amount_max"),
+        "min_interest": aggregates.get("interest_min"),
+        "max_interest": aggregates.get("interest_max"),
+        "approval_ratio": (aggregates.get("approved") or 0) / completed if completed else 0,
+    }
@@ -1,9 +1,14 @@
-import os
 import json
 import csv
+import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Iterator, Tuple
 from pathlib import Path
+from .application_index import ApplicationIndex
+from .application_query import encode_cursor, decode_cursor, project
+from .csv_stream import write_csv
+
+logger = logging.getLogger(__name__)
 
 class CustomerDataManager:
     """Manages customer data storage by loan type"""
@@ -11,10 +16,16 @@ class CustomerDataManager:
     def __init__(self, base_path: str = "customer_data"):
         self.base_path = Path(base_path)
         self.ensure_directories()
+        
+        # Index of saved applications so admin queries don't scan and parse every file
+        self.index = ApplicationIndex(self.base_path / "applications_index.db")
+        indexed = self.index.rebuild_if_empty(self.base_path)
+        if indexed:
+            logger.info("Indexed %d existing customer applications", indexed)
     
     def ensure_directories(self):
         """Create necessary directories for each loan type"""
-        loan_types = ["education", "home", "personal", "gold", "business"]
+        loan_types = ["education", "home", "personal", "gold", "business", "car"]
         
         for loan_type in loan_types:
             loan_dir = self.base_path / loan_type
@@ -24,43 +35,86 @@ class CustomerDataManager:
             (loan_dir / "applications").mkdir(exist_ok=True)
             (loan_dir / "reports").mkdir(exist_ok=True)
     
-    def save_customer_application(self, loan_type: str, session_id: str, 
-                                customer_info: Dict[str, Any], 
-                                loan_data: Dict[str, Any],
-                                prediction_result: Optional[Dict[str, Any]] = None) -> str:
-        """Save complete customer application data"""
+    def build_application(self, loan_type: str, session_id: str,
+                          customer_info: Dict[str, Any],
+                          loan_data: Dict[str, Any],
+                          prediction_result: Optional[Dict[str, Any]] = None,
+                          created_at: Optional[float] = None) -> Dict[str, Any]:
+        """Application record as stored; created_at (epoch seconds) defaults to now
         
-        # Create application record
-        application = {
+        The timestamp is naive UTC, as in MongoDB, so date filters select the same
+        applications on either backend.
+        """
+        timestamp = datetime.utcfromtimestamp(created_at) if created_at else datetime.utcnow()
+        return {
             "session_id": session_id,
             "loan_type": loan_type,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp.isoformat(),
             "customer_info": customer_info,
             "loan_data": loan_data,
             "prediction_result": prediction_result,
             "status": "completed" if prediction_result else "incomplete"
         }
+    
+    def save_customer_application(self, loan_type: str, session_id: str, 
+                                customer_info: Dict[str, Any], 
+                                loan_data: Dict[str, Any],
+                                prediction_result: Optional[Dict[str, Any]] = None,
+                                created_at: Optional[float] = None) -> str:
+        """Save complete customer application data"""
+        application = self.build_application(loan_type, session_id, customer_info, loan_data,
+                                             prediction_result, created_at)
+        return self.save_applications([application])[0]
+    
+    def save_applications(self, applications: List[Dict[str, Any]]) -> List[str]:
+        """Write a batch of applications: one JSON file each, then a single index
+        transaction and one CSV append per loan type. Returns the file paths."""
+        paths = []
+        for application in applications:
+            # Filename from the application's own timestamp, customer name and session
+            timestamp = datetime.fromisoformat(application["timestamp"]).strftime("%Y%m%d_%H%M%S")
+            customer_name = application["customer_info"].get("name", "unknown").replace(" ", "_")
+            filename = f"{timestamp}_{customer_name}_{application['session_id'][:8]}.json"
+            file_path = self.base_path / application["loan_type"] / "applications" / filename
+            
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(application, f, indent=2, ensure_ascii=False)
+            paths.append(str(file_path))
         
-        # Generate filename with timestamp and customer name
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        customer_name = customer_info.get("name", "unknown").replace(" ", "_")
-        filename = f"{timestamp}_{customer_name}_{session_id[:8]}.json"
-        
-        # Save to loan type directory
-        file_path = self.base_path / loan_type / "applications" / filename
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(application, f, indent=2, ensure_ascii=False)
+        self.index.add_many(zip(applications, paths))
         
-        # Also update CSV summary
-        self.update_csv_summary(loan_type, application)
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for application in applications:
+            by_type.setdefault(application["loan_type"], []).append(application)
+        for loan_type, batch in by_type.items():
+            self.append_csv_rows(loan_type, batch)
         
-        return str(file_path)
+        return paths
     
     def update_csv_summary(self, loan_type: str, application: Dict[str, Any]):
         """Update CSV summary file for the loan type"""
+        self.append_csv_rows(loan_type, [application])
+    
+    def append_csv_rows(self, loan_type: str, applications: List[Dict[str, Any]]):
+        """Append applications to the loan type's CSV summary with a single open()"""
         csv_path = self.base_path / loan_type / "reports" / f"{loan_type}_applications.csv"
+        rows = [self.build_csv_row(loan_type, application) for application in applications]
+        if not rows:
+            return
         
+        # Write to CSV
+        file_exists = csv_path.exists()
+        
+        with open(csv_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+            
+            if not file_exists:
+                writer.writeheader()
+            
+            writer.writerows(rows)
+    
+    def build_csv_row(self, loan_type: str, application: Dict[str, Any]) -> Dict[str, Any]:
+        """Flatten an application into a CSV row (same columns for every row of a loan type)"""
         # Prepare row data
         row_data = {
             "timestamp": application["timestamp"],
@@ -68,14 +122,18 @@ class CustomerDataManager:
             "customer_name": application["customer_info"].get("name", ""),
             "customer_email": application["customer_info"].get("email", ""),
             "customer_phone": application["customer_info"].get("phone", ""),
-            "status": application["status"]
+            "status": application["status"],
+            "eligible_amount": "",
+            "interest_rate": "",
+            "requested_amount": "",
+            "approval_status": ""
         }
         
         # Add loan-specific fields
         if application["prediction_result"]:
             result = application["prediction_result"]["result"]
             row_data.update({
-                "eligible_amount": result.get("eligible_amount", 0),
+                "eligible_amount": result.get("eligible_amount", result.get("approved_amount", 0)),
                 "interest_rate": result.get("interest_rate", 0),
                 "requested_amount": result.get("requested_amount", 0),
                 "approval_status": result.get("status", "")
@@ -125,109 +183,87 @@ class CustomerDataManager:
                 "location_tier": loan_data.get("Location_Tier", "")
             })
         
-        # Write to CSV
-        file_exists = csv_path.exists()
-        
-        with open(csv_path, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=row_data.keys())
-            
-            if not file_exists:
-                writer.writeheader()
-            
-            writer.writerow(row_data)
+        return row_data
     
-    def get_customer_applications(self, loan_type: str, limit: int = 10) -> list:
-        """Get recent customer applications for a loan type"""
-        applications_dir = self.base_path / loan_type / "applications"
-        
-        if not applications_dir.exists():
-            return []
-        
-        # Get all JSON files, sorted by modification time (newest first)
-        json_files = sorted(
-            applications_dir.glob("*.json"),
-            key=lambda x: x.stat().st_mtime,
-            reverse=True
-        )
-        
+    def get_customer_applications(self, loan_type: str, limit: Optional[int] = 10,
+                                  status: Optional[str] = None,
+                                  approval_status: Optional[str] = None) -> list:
+        """Get recent customer applications for a loan type (limit=None for all)"""
         applications = []
-        for file_path in json_files[:limit]:
+        for file_path in self.index.recent_paths(loan_type, limit, status, approval_status):
             try:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     applications.append(json.load(f))
             except Exception as e:
-                print(f"Error reading {file_path}: {e}")
+                logger.error("Error reading %s: %s", file_path, e)
         
         return applications
     
-    def get_application_stats(self, loan_type: str) -> Dict[str, Any]:
-        """Get statistics for a loan type"""
-        applications = self.get_customer_applications(loan_type, limit=1000)
-        
-        if not applications:
-            return {"total": 0, "completed": 0, "approved": 0, "partial": 0}
-        
-        stats = {
-            "total": len(applications),
-            "completed": len([app for app in applications if app["status"] == "completed"]),
-            "approved": 0,
-            "partial": 0,
-            "average_amount": 0,
-            "average_interest": 0
-        }
-        
-        completed_apps = [app for app in applications if app["prediction_result"]]
+    def page_applications(self, loan_type: str, limit: int = 10, cursor: Optional[str] = None,
+                          status: Optional[str] = None, approval_status: Optional[str] = None,
+                          start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          cibil_min: Optional[float] = None, cibil_max: Optional[float] = None,
+                          fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of applications, newest first, and the cursor for the next page (None on the last)
         
-        if completed_apps:
-            stats["approved"] = len([app for app in completed_apps 
-                                   if app["prediction_result"]["result"].get("status") == "APPROVED"])
-            stats["partial"] = len([app for app in completed_apps 
-                                  if app["prediction_result"]["result"].get("status") == "PARTIAL_APPROVAL"])
-            
-            # Calculate averages
-            amounts = []
-            interests = []
-            
-            for app in completed_apps:
-                result = app["prediction_result"]["result"]
-                if "eligible_amount" in result:
-                    amounts.append(result["eligible_amount"])
-                elif "approved_amount" in result:
-                    amounts.append(result["approved_amount"])
-                
-                if "interest_rate" in result:
-                    interests.append(result["interest_rate"])
-            
-            if amounts:
-                stats["average_amount"] = sum(amounts) / len(amounts)
-            if interests:
-                stats["average_interest"] = sum(interests) / len(interests)
+        Filtering and paging run on the index; only the page's own files are read.
+        """
+        keys = self.index.page(
+            loan_type, limit, after=decode_cursor(cursor) if cursor else None,
+            status=status, approval_status=approval_status,
+            since=start.isoformat() if start else None, until=end.isoformat() if end else None,
+            cibil_min=cibil_min, cibil_max=cibil_max
+        )
+        applications = []
+        for _, file_path in keys:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    applications.append(project(json.load(f), fields))
+            except Exception as e:
+                logger.error("Error reading %s: %s", file_path, e)
         
-        return stats
+        next_cursor = encode_cursor(*keys[-1]) if len(keys) == limit else None
+        return applications, next_cursor
+    
+    def get_application_stats(self, loan_type: str) -> Dict[str, Any]:
+        """Get statistics for a loan type (maintained incrementally on save)"""
+        return self.index.stats(loan_type)
+    
+    def get_all_stats(self, loan_types: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Get statistics for all loan types in one lookup"""
+        loan_types = loan_types or ["education", "home", "personal", "gold", "business", "car"]
+        return self.index.all_stats(loan_types)
+    
+    def rebuild_index(self) -> int:
+        """Re-index all application files (e.g. after files were copied in by hand)"""
+        return self.index.rebuild(self.base_path)
+    
+    def rebuild_stats(self):
+        """Recompute running statistics from the indexed applications"""
+        self.index.rebuild_stats()
+    
+    def iter_export_rows(self, loan_type: str, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None, status: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield CSV rows oldest first, reading one application file at a time"""
+        paths = self.index.iter_paths(
+            loan_type, status=status,
+            since=start.isoformat() if start else None,
+            until=end.isoformat() if end else None
+        )
+        for file_path in paths:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    application = json.load(f)
+            except Exception as e:
+                logger.error("Error reading %s: %s", file_path, e)
+                continue
+            yield self.build_csv_row(loan_type, application)
     
     def export_to_csv(self, loan_type: str) -> Path:
         """Generate/regenerate CSV export for a loan type"""
-        applications = self.get_customer_applications(loan_type, limit=1000)
-        
         csv_path = self.base_path / loan_type / "reports" / f"{loan_type}_applications.csv"
         
-        if not applications:
-            # Create empty CSV with headers
-            headers = ["timestamp", "session_id", "customer_name", "customer_email", 
-                      "customer_phone", "status", "eligible_amount", "interest_rate", 
-                      "requested_amount", "approval_status"]
-            
-            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-            
-            return csv_path
-        
-        # Regenerate CSV from all applications
-        if csv_path.exists():
-            csv_path.unlink()  # Remove existing file
-        
-        for application in reversed(applications):  # Oldest first
-            self.update_csv_summary(loan_type, application)
+        # Rewrite the whole file in one pass; rows stream from the index so memory stays flat
+        write_csv(csv_path, self.iter_export_rows(loan_type))
         
-        return csv_path
\ No newline at end of file
+        return csv_path
@@ -0,0 +1,131 @@
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Callable
+from .storage_manager import CustomerDataManager
+from .mongodb_storage_manager import MongoDBStorageManager
+from .outbox import ApplicationOutbox
+
+logger = logging.getLogger(__name__)
+
+
+class FailoverStorage:
+    """Routes storage calls to MongoDB while it is connected and to local files otherwise
+
+    The backend is chosen per call, so the API keeps serving (and saving) while
+    MongoDB is unreachable and moves back to it as soon as the background monitor
+    reconnects. The local manager is only created the first time it is needed.
+    
+    With an outbox, saves made while MongoDB is down are held there instead of going
+    to local files, and replayed into MongoDB in bulk once it reconnects.
+    """
+
+    def __init__(self, mongodb: Optional[MongoDBStorageManager],
+                 local_factory: Callable[[], CustomerDataManager] = CustomerDataManager,
+                 outbox: Optional[ApplicationOutbox] = None, replay_batch_size: int = 500):
+        self.mongodb = mongodb
+        self.outbox = outbox if mongodb is not None else None
+        self.replay_batch_size = replay_batch_size
+        self._local_factory = local_factory
+        self._local: Optional[CustomerDataManager] = None
+        self._local_lock = threading.Lock()
+        self._last_backend: Optional[str] = None
+
+    @property
+    def local(self) -> CustomerDataManager:
+        if self._local is None:
+            with self._local_lock:
+                if self._local is None:
+                    self._local = self._local_factory()
+        return self._local
+
+    @property
+    def backend_name(self) -> str:
+        return "mongodb" if self.mongodb is not None and self.mongodb._is_connected() else "local"
+
+    @property
+    def active(self):
+        """The storage manager serving calls right now"""
+        name = self.backend_name
+        if name != self._last_backend:
+            if self._last_backend is not None:
+                logger.warning("Storage backend switched from %s to %s", self._last_backend, name)
+            self._last_backend = name
+        return self.mongodb if name == "mongodb" else self.local
+
+    def __getattr__(self, name: str):
+        # Reads, stats and exports go to whichever backend is active
+        return getattr(self.active, name)
+
+    # ---------- Saving ----------
+    def build_application(self, **job) -> Dict[str, Any]:
+        """Keep the raw fields; the record is built by whichever backend ends up saving it"""
+        return dict(job)
+
+    def save_applications(self, jobs: List[Dict[str, Any]]) -> List[str]:
+        """Save build_application() jobs, falling back to the outbox (or local files) if MongoDB is down"""
+        if self.outbox is not None:
+            return self._save_with_outbox(jobs)
+        
+        backend = self.active
+        try:
+            return backend.save_applications([backend.build_application(**job) for job in jobs])
+        except Exception:
+            if backend is not self.mongodb or self.mongodb._is_connected():
+                raise
+            logger.warning("MongoDB went away while saving %d applications, writing them locally", len(jobs))
+            return self.local.save_applications([self.local.build_application(**job) for job in jobs])
+
+    def _save_to_mongodb(self, jobs: List[Dict[str, Any]]) -> List[str]:
+        return self.mongodb.save_applications([self.mongodb.build_application(**job) for job in jobs])
+
+    def _save_with_outbox(self, jobs: List[Dict[str, Any]]) -> List[str]:
+        session_ids = [job["session_id"] for job in jobs]
+        if self.mongodb._is_connected():
+            # While this process's earlier saves are still waiting to be replayed, queue behind
+            # them to keep save order. Other workers' replays can't overwrite a newer version:
+            # MongoDB saves never replace an application with a later timestamp
+            if self.outbox.append_if_pending(jobs):
+                return session_ids
+            try:
+                return self._save_to_mongodb(jobs)
+            except Exception:
+                if self.mongodb._is_connected():
+                    raise
+                logger.warning("MongoDB went away while saving %d applications, holding them in the outbox", len(jobs))
+        self.outbox.append(jobs)
+        return session_ids
+
+    def save_customer_application(self, loan_type: str, session_id: str,
+                                  customer_info: Dict[str, Any],
+                                  loan_data: Dict[str, Any],
+                                  prediction_result: Optional[Dict[str, Any]] = None,
+                                  created_at: Optional[float] = None) -> str:
+        job = self.build_application(loan_type=loan_type, session_id=session_id, customer_info=customer_info,
+                                     loan_data=loan_data, prediction_result=prediction_result,
+                                     created_at=created_at)
+        return self.save_applications([job])[0]
+
+    # ---------- Lifecycle ----------
+    def start(self):
+        """Start the MongoDB reconnect monitor and the outbox replayer (call once per worker)"""
+        if self.mongodb is None:
+            return
+        self.mongodb.start_monitor()
+        if self.outbox is not None:
+            self.outbox.start_replayer(self.mongodb._is_connected, self._save_to_mongodb, self.replay_batch_size)
+
+    def close(self):
+        if self.outbox is not None:
+            self.outbox.close()
+        if self.mongodb is not None:
+            self.mongodb.close_connection()
+
+    def status(self) -> Dict[str, Any]:
+        """Active backend, MongoDB connection state and outbox counters (no network calls)"""
+        status = {
+            "backend": self.backend_name,
+            "mongodb": self.mongodb.connection_state() if self.mongodb is not None else {"state": "not_configured"},
+        }
+        if self.outbox is not None:
+            status["outbox"] = self.outbox.stats()
+        return status
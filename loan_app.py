@@ -1,34 +1,74 @@
 import os
+import gc
+import logging
+import json
+import asyncio
 import time
 import uuid
-from typing import Dict, List, Optional, Any
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Tuple, Union
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 from loan_services.loan_factory import LoanServiceFactory
-from customer_data.storage_manager import CustomerDataManager
+from loan_services import amortization
 from customer_data.mongodb_storage_manager import MongoDBStorageManager
+from customer_data.storage_router import FailoverStorage
+from customer_data.outbox import ApplicationOutbox
+from customer_data.application_query import MAX_PAGE_SIZE
+from customer_data.csv_stream import iter_csv_chunks, gzip_chunks
+from customer_data.persistence_queue import PersistenceQueue
+from session_store import SessionStore, create_session_store
+from logging_config import configure_logging, logging_stats
 
 # Load environment variables
 load_dotenv()
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # ---------- Config ----------
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-# Initialize storage managers
+# Draft the next follow-up question concurrently with field extraction
+SPECULATIVE_FOLLOWUP = os.getenv("SPECULATIVE_FOLLOWUP", "true").lower() != "false"
+# Loan types whose models are preloaded at startup: "all", a comma-separated list, or empty for none
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "")
+# Block startup until the warm-up finishes instead of loading in the background
+MODEL_WARMUP_BLOCKING = os.getenv("MODEL_WARMUP_BLOCKING", "false").lower() == "true"
+# Load the MODEL_WARMUP models at import time, so a pre-forking server (gunicorn --preload)
+# loads them once in the master and every worker shares those pages copy-on-write
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "false").lower() == "true"
+# Most profiles /predict/batch/{loan_type} scores in one request (larger requests get 413)
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "10000"))
+# Largest cartesian product /quote/{loan_type}/grid will score in one request
+GRID_MAX_POINTS = int(os.getenv("GRID_MAX_POINTS", "5000"))
+# Loan types whose chats use the fixed-question dialog (no OpenAI calls): "all", a comma-separated
+# list, or empty for none. Without OPENAI_API_KEY every chat uses it.
+SLOT_FILLING_LOAN_TYPES = {t.strip().lower() for t in os.getenv("SLOT_FILLING_LOAN_TYPES", "").split(",") if t.strip()}
+DIALOG_MODES = ("llm", "slots")
+# Save completed applications from a background writer instead of on the response path
+PERSISTENCE_WRITE_BEHIND = os.getenv("PERSISTENCE_WRITE_BEHIND", "true").lower() != "false"
+
+# Initialize storage managers. Nothing here touches the network: MongoDB connects from a
+# background monitor after startup. Until it is reachable reads use local file storage and
+# saves wait in the outbox, which is replayed into MongoDB once it connects
 try:
-    # Try MongoDB first
-    mongodb_storage = MongoDBStorageManager()
-    storage_manager = mongodb_storage
-    print("✅ Using MongoDB for data storage")
-except Exception as e:
-    # Fallback to local storage
-    storage_manager = CustomerDataManager()
-    print(f"⚠️  MongoDB connection failed, using local storage: {e}")
-    print("📁 Using local file storage as fallback")
+    mongodb_storage: Optional[MongoDBStorageManager] = MongoDBStorageManager(connect=False)
+except ValueError as e:
+    mongodb_storage = None
+    logger.warning("MongoDB not configured, using local file storage: %s", e)
+storage_manager = FailoverStorage(
+    mongodb_storage,
+    outbox=ApplicationOutbox(
+        os.getenv("OUTBOX_DIR", "customer_data/outbox"),
+        segment_records=int(os.getenv("OUTBOX_SEGMENT_RECORDS", "5000")),
+    ) if mongodb_storage is not None else None,
+    replay_batch_size=int(os.getenv("OUTBOX_REPLAY_BATCH_SIZE", "500")),
+)
 
 # ---------- FastAPI app ----------
 app = FastAPI(title="Multi-Loan Chatbot API", version="2.0.0")
@@ -39,20 +79,102 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# ---------- In-memory session store ----------
-SESSIONS: Dict[str, Dict[str, Any]] = {}
+# ---------- Session store ----------
+def _session_system_prompt(state: Dict[str, Any]) -> str:
+    """System prompt for a session's loan type (left out of stored copies of the conversation)"""
+    return LoanServiceFactory.get_service(state["loan_type"], OPENAI_API_KEY).get_system_prompt()
+
+SESSIONS: SessionStore = create_session_store(system_prompt_for=_session_system_prompt)
+
+@app.on_event("shutdown")
+def close_session_store():
+    SESSIONS.close()
+
+# ---------- Write-behind persistence ----------
+PERSISTENCE: Optional[PersistenceQueue] = None
+
+@app.on_event("startup")
+def start_persistence_queue():
+    # Started here rather than at import so the writer thread runs in each worker, not a pre-fork master
+    global PERSISTENCE
+    if PERSISTENCE_WRITE_BEHIND:
+        PERSISTENCE = PersistenceQueue(
+            storage_manager,
+            max_size=int(os.getenv("PERSISTENCE_QUEUE_SIZE", "1000")),
+            batch_size=int(os.getenv("PERSISTENCE_BATCH_SIZE", "100")),
+            spill_path=os.getenv("PERSISTENCE_SPILL_PATH", "customer_data/pending_applications.ndjson"),
+        )
+
+@app.on_event("shutdown")
+def flush_persistence_queue():
+    if PERSISTENCE is not None:
+        PERSISTENCE.close()
+
+# ---------- Storage connection ----------
+@app.on_event("startup")
+def connect_storage():
+    # Per worker, like the persistence queue above: monitor and replayer threads don't survive a pre-fork
+    storage_manager.start()
+
+@app.on_event("shutdown")
+def close_storage():
+    # Registered after flush_persistence_queue, so queued applications are written first
+    storage_manager.close()
+
+# ---------- Model warm-up ----------
+def _warmup_loan_types() -> List[str]:
+    if MODEL_WARMUP.strip().lower() == "all":
+        return LoanServiceFactory.get_available_loan_types()
+    return [t.strip().lower() for t in MODEL_WARMUP.split(",") if t.strip()]
+
+if MODEL_PRELOAD:
+    LoanServiceFactory.warmup(_warmup_loan_types() or LoanServiceFactory.get_available_loan_types(), OPENAI_API_KEY)
+    # Move everything allocated so far out of the GC's tracked generations; otherwise the
+    # first collection in each worker touches every object header and un-shares the pages
+    gc.freeze()
+
+@app.on_event("startup")
+def warm_up_models():
+    """Preload the models listed in MODEL_WARMUP; everything else loads on first use"""
+    if MODEL_PRELOAD or not MODEL_WARMUP.strip():
+        return
+    loan_types = _warmup_loan_types()
+    
+    if MODEL_WARMUP_BLOCKING:
+        LoanServiceFactory.warmup(loan_types, OPENAI_API_KEY)
+    else:
+        LoanServiceFactory.warmup_in_background(loan_types, OPENAI_API_KEY)
+
+# ---------- Numeric fields per loan type ----------
+NUMERIC_FIELDS: Dict[str, List[str]] = {
+    "education": ["Age", "Academic_Score", "Coapplicant_Income", "Guarantor_Networth", 
+                  "CIBIL_Score", "Loan_Term", "Expected_Loan_Amount"],
+    "home": ["Age", "Income", "Guarantor_income", "Tenure", 
+             "CIBIL_score", "Down_payment", "Existing_total_EMI", 
+             "Loan_amount_requested", "Property_value"],
+    "personal": ["Age", "Employment_Duration_Years", "Annual_Income", 
+                 "CIBIL_Score", "Existing_EMIs", "Loan_Term_Years", "Expected_Loan_Amount"],
+    "business": ["Business_Age_Years", "Annual_Revenue", "Net_Profit", "CIBIL_Score",
+                 "Existing_Loan_Amount", "Loan_Tenure_Years", "Expected_Loan_Amount"],
+    "gold": ["Age", "Annual_Income", "CIBIL_Score", "Gold_Value", "Loan_Amount", "Loan_Tenure"],
+    "car": ["Age", "applicant_annual_salary", "Coapplicant_Annual_Income", "CIBIL",
+            "down_payment_percent", "Tenure", "loan_amount"],
+}
 
 # ---------- Schemas ----------
 class StartChatRequest(BaseModel):
     loan_type: str = Field(..., description="Type of loan: education, home, or personal")
+    dialog_mode: Optional[str] = Field(None, description="'llm' or 'slots' (fixed questions, no OpenAI calls); defaults per loan type")
 
 class StartChatResponse(BaseModel):
     session_id: str
     loan_type: str
     message: str
     required_fields: List[str]
+    dialog_mode: str = "llm"
 
 class MessageRequest(BaseModel):
     session_id: str = Field(..., description="Session identifier returned by /chat/start")
@@ -68,6 +190,25 @@ class LoanTypesResponse(BaseModel):
     available_types: List[str]
     descriptions: Dict[str, str]
 
+class AmortizationLoan(BaseModel):
+    principal: float = Field(..., gt=0)
+    annual_rate: float = Field(..., ge=0, description="Annual interest rate in percent")
+    tenure_months: int = Field(..., gt=0, le=600)
+
+class AmortizationRequest(BaseModel):
+    loans: List[AmortizationLoan] = Field(..., min_length=1, max_length=10000)
+    include_schedule: bool = Field(False, description="Add month-by-month schedules (at most 100 loans)")
+
+class GridAxisRange(BaseModel):
+    start: float
+    stop: float = Field(..., description="Inclusive upper bound")
+    step: float = Field(..., gt=0)
+
+class GridQuoteRequest(BaseModel):
+    profile: Dict[str, Any] = Field(..., description="Applicant profile with every prediction field")
+    axes: Dict[str, Union[List[Any], GridAxisRange]] = Field(
+        ..., description='Fields to vary, as explicit values or {"start", "stop", "step"}')
+
 # ---------- Helper Functions ----------
 def init_session(loan_type: str) -> str:
     """Initialize a new chat session"""
@@ -102,10 +243,133 @@ def _to_float(v):
     import re
     return float(re.sub(r"[^\d.]", "", s) or 0)
 
+def _dialog_mode(loan_type: str, requested: Optional[str] = None) -> str:
+    """"slots" for the fixed-question dialog, "llm" for the OpenAI-driven chat"""
+    if not OPENAI_API_KEY:
+        return "slots"
+    if requested:
+        return requested
+    return "slots" if "all" in SLOT_FILLING_LOAN_TYPES or loan_type in SLOT_FILLING_LOAN_TYPES else "llm"
+
+def _missing_fields(loan_type: str, required_fields: List[str], user_profile: Dict[str, Any]) -> List[str]:
+    """Required fields not yet collected, in the order the assistant asks for them"""
+    missing_fields = []
+    for f in required_fields:
+        if f not in user_profile:
+            # For education loans, if we have Academic_Score, we don't need Academic_Performance separately
+            if f == "Academic_Performance" and "Academic_Score" in user_profile and loan_type == "education":
+                continue
+            missing_fields.append(f)
+    return missing_fields
+
+def _record_fields(service, required_fields: List[str], user_profile: Dict[str, Any],
+                   extracted: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """Validate extracted fields into user_profile; returns (recorded fields, validation errors)"""
+    recorded_now = {}
+    validation_errors = []
+    for k, v in extracted.items():
+        if k in required_fields and v is not None:
+            # Validate the field if the service has validation method
+            if hasattr(service, 'validate_field'):
+                is_valid, error_msg = service.validate_field(k, v)
+                if not is_valid:
+                    validation_errors.append(error_msg)
+                    continue
+            
+            user_profile[k] = v
+            recorded_now[k] = v
+            # Handle academic score conversion for education loans: store both score and performance
+            if k == "Academic_Score" and hasattr(service, 'convert_academic_score_to_performance'):
+                user_profile["Academic_Performance"] = service.convert_academic_score_to_performance(float(v))
+    return recorded_now, validation_errors
+
+def _coerce_numeric_fields(loan_type: str, profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of profile with the loan type's numeric fields converted to float"""
+    typed = profile.copy()
+    for field in NUMERIC_FIELDS.get(loan_type, []):
+        if typed.get(field) is not None:
+            try:
+                typed[field] = _to_float(typed[field])
+            except ValueError:
+                pass  # Left as-is so validation reports it for this row
+    return typed
+
+def _axis_values(axis: Union[List[Any], GridAxisRange]) -> List[Any]:
+    """Explicit axis values, or the inclusive start..stop range by step"""
+    if isinstance(axis, list):
+        return axis
+    count = int((axis.stop - axis.start) / axis.step + 1e-9) + 1
+    return [round(axis.start + i * axis.step, 10) for i in range(max(count, 0))]
+
+class BatchTooLarge(Exception):
+    pass
+
+def _add_ndjson_row(rows: List[Any], line: bytes, max_rows: int):
+    text = line.decode("utf-8")
+    if not text.strip():
+        return
+    if len(rows) >= max_rows:
+        raise BatchTooLarge()
+    try:
+        rows.append(json.loads(text))
+    except json.JSONDecodeError:
+        rows.append(text)  # Reported as a per-row error by predict_batch
+
+async def _read_batch_rows(request: Request, max_rows: int) -> List[Any]:
+    """Read a batch request body: NDJSON (one profile per line) or a JSON list / {"rows": [...]}
+    
+    NDJSON is parsed line by line as the body streams in and reading stops at the
+    first row past max_rows; a JSON body has to arrive whole before it is parsed.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        rows: List[Any] = []
+        pending = b""
+        async for chunk in request.stream():
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                _add_ndjson_row(rows, line, max_rows)
+        _add_ndjson_row(rows, pending, max_rows)
+        return rows
+    
+    rows = _parse_batch_rows(await request.body())
+    if len(rows) > max_rows:
+        raise BatchTooLarge()
+    return rows
+
+def _parse_batch_rows(body: bytes) -> List[Any]:
+    """Parse a JSON batch body: a list of profiles or {"rows": [...]}"""
+    payload = json.loads(body or b"[]")
+    if isinstance(payload, dict):
+        payload = payload.get("rows", [])
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON list of profiles or an object with a 'rows' list")
+    return payload
+
 # ---------- Endpoints ----------
 @app.get("/health")
 def health():
-    return {"status": "ok", "version": "2.0.0"}
+    models = LoanServiceFactory.load_report()
+    return {
+        "status": "ok",
+        "version": "2.0.0",
+        "models_loaded": [loan_type for loan_type, report in models.items() if report.get("loaded")],
+        "storage": storage_manager.status()
+    }
+
+@app.get("/admin/models")
+def get_model_load_report():
+    """Per loan type model load status, load times in seconds and prediction cache counters (admin endpoint)"""
+    return LoanServiceFactory.load_report()
+
+@app.post("/admin/models/{loan_type}/reload")
+def reload_models(loan_type: str):
+    """Reload a loan type's models (e.g. after convert_models.py) and drop its cached predictions (admin endpoint)"""
+    loan_type = loan_type.lower()
+    if loan_type not in LoanServiceFactory.get_available_loan_types():
+        raise HTTPException(status_code=400, detail=f"Unsupported loan type: {loan_type}")
+    LoanServiceFactory.get_service(loan_type, OPENAI_API_KEY).reload_models()
+    return LoanServiceFactory.load_report([loan_type])[loan_type]
 
 @app.get("/loan-types", response_model=LoanTypesResponse)
 def get_loan_types():
@@ -125,7 +389,7 @@ def get_loan_types():
     )
 
 @app.post("/chat/start", response_model=StartChatResponse)
-def chat_start(request: StartChatRequest):
+async def chat_start(request: StartChatRequest):
     """Start a new chat session for a specific loan type"""
     loan_type = request.loan_type.lower()
     
@@ -134,65 +398,78 @@ def chat_start(request: StartChatRequest):
             status_code=400, 
             detail=f"Invalid loan type. Available types: {LoanServiceFactory.get_available_loan_types()}"
         )
+    if request.dialog_mode is not None and request.dialog_mode not in DIALOG_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid dialog_mode. Use one of: {', '.join(DIALOG_MODES)}")
+    dialog_mode = _dialog_mode(loan_type, request.dialog_mode)
     
     try:
-        service = LoanServiceFactory.get_service(loan_type, OPENAI_API_KEY)
-        session_id = init_session(loan_type)
+        # Model loading and disk I/O (session store included) stay off the event loop; LLM calls are awaited directly
+        service = await run_in_threadpool(LoanServiceFactory.get_service, loan_type, OPENAI_API_KEY)
+        session_id = await run_in_threadpool(init_session, loan_type)
         
-        conv = SESSIONS[session_id]["conversation"]
-        greeting = service.assistant_greeting(conv)
+        state = await run_in_threadpool(SESSIONS.__getitem__, session_id)
+        conv = state["conversation"]
+        if dialog_mode == "slots":
+            greeting = service.slot_dialog().start(state)
+        else:
+            greeting = await service.aassistant_greeting(conv)
         conv.append({"role": "assistant", "content": greeting})
+        await run_in_threadpool(SESSIONS.save, session_id, state)
         
         return StartChatResponse(
             session_id=session_id,
             loan_type=loan_type,
             message=greeting,
-            required_fields=service.get_required_fields()
+            required_fields=service.get_required_fields(),
+            dialog_mode=dialog_mode
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error starting chat: {str(e)}")
 
 @app.post("/chat/message", response_model=MessageResponse)
-def chat_message(req: MessageRequest):
+async def chat_message(req: MessageRequest):
     """Send a message in an existing chat session"""
-    if req.session_id not in SESSIONS:
+    state = await run_in_threadpool(SESSIONS.get, req.session_id)
+    if state is None:
         raise HTTPException(status_code=404, detail="Invalid session_id.")
 
-    state = SESSIONS[req.session_id]
     loan_type = state["loan_type"]
     conversation = state["conversation"]
     user_profile = state["user_profile"]
     
+    speculative_followup = None
+    speculation_used = False
     try:
-        service = LoanServiceFactory.get_service(loan_type, OPENAI_API_KEY)
+        service = await run_in_threadpool(LoanServiceFactory.get_service, loan_type, OPENAI_API_KEY)
         required_fields = service.get_required_fields()
+        # Sessions started in slot-filling mode carry the dialog's state
+        dialog = service.slot_dialog() if "dialog" in state else None
         
         # Append user message
         conversation.append({"role": "user", "content": req.message})
 
-        # Extract fields from user response
-        extracted = service.extract_info_from_response(req.message, conversation)
-        recorded_now = {}
-        validation_errors = []
-        
-        for k, v in extracted.items():
-            if k in required_fields and v is not None:
-                # Validate the field if the service has validation method
-                if hasattr(service, 'validate_field'):
-                    is_valid, error_msg = service.validate_field(k, v)
-                    if not is_valid:
-                        validation_errors.append(error_msg)
-                        continue
-                
-                # Handle academic score conversion for education loans
-                if k == "Academic_Score" and hasattr(service, 'convert_academic_score_to_performance'):
-                    # Store both score and performance
-                    user_profile[k] = v
-                    user_profile["Academic_Performance"] = service.convert_academic_score_to_performance(float(v))
-                    recorded_now[k] = v
-                else:
-                    user_profile[k] = v
-                    recorded_now[k] = v
+        if dialog is not None:
+            # Only the fields the last question asked for
+            extracted = dialog.parse(state, req.message)
+        else:
+            routed = service.route_regex(req.message, conversation)
+            regex_extracted, confident = routed
+            if SPECULATIVE_FOLLOWUP and not confident and service.async_client is not None:
+                # OpenAI extraction is about to run: draft the next question meanwhile from the
+                # profile the regex fields would give (the current one when they found nothing),
+                # used only if extraction lands on the same profile
+                guessed_profile = dict(user_profile)
+                _, guess_errors = _record_fields(service, required_fields, guessed_profile, regex_extracted)
+                guessed_missing = _missing_fields(loan_type, required_fields, guessed_profile)
+                if not guess_errors and guessed_missing:
+                    speculative_followup = asyncio.create_task(
+                        service.aassistant_followup(list(conversation), guessed_profile, guessed_missing)
+                    )
+                service.record_llm_turn(speculative_followup is not None)
+
+            # Extract fields from user response
+            extracted = await service.aextract_info_from_response(req.message, conversation, routed=routed)
+        recorded_now, validation_errors = _record_fields(service, required_fields, user_profile, extracted)
         
         # Check business logic validation for business loans
         if loan_type == "business" and hasattr(service, 'validate_business_logic'):
@@ -211,21 +488,13 @@ def chat_message(req: MessageRequest):
             )
 
         # Check completeness - for education loans, Academic_Performance is derived from Academic_Score
-        missing_fields = []
-        for f in required_fields:
-            if f not in user_profile:
-                # For education loans, if we have Academic_Score, we don't need Academic_Performance separately
-                if f == "Academic_Performance" and "Academic_Score" in user_profile and loan_type == "education":
-                    continue
-                missing_fields.append(f)
+        missing_fields = _missing_fields(loan_type, required_fields, user_profile)
 
-        print(f"DEBUG - Required fields: {required_fields}")
-        print(f"DEBUG - User profile keys: {list(user_profile.keys())}")
-        print(f"DEBUG - Missing fields: {missing_fields}")
+        logger.debug("Session %s: collected %s, missing %s", req.session_id, user_profile.keys(), missing_fields)
 
         # If complete -> run prediction and present result
         if not missing_fields:
-            print("All fields collected, processing prediction...")
+            logger.info("Session %s: all %s loan fields collected, running prediction", req.session_id, loan_type)
             # Don't add INFORMATION_COMPLETE to conversation - process prediction instead
 
             try:
@@ -233,25 +502,7 @@ def chat_message(req: MessageRequest):
                 typed = user_profile.copy()
                 
                 # Get numeric fields based on loan type
-                numeric_fields = []
-                if loan_type == "education":
-                    numeric_fields = ["Age", "Academic_Score", "Coapplicant_Income", "Guarantor_Networth", 
-                                    "CIBIL_Score", "Loan_Term", "Expected_Loan_Amount"]
-                elif loan_type == "home":
-                    numeric_fields = ["Age", "Income", "Guarantor_income", "Tenure", 
-                                    "CIBIL_score", "Down_payment", "Existing_total_EMI", 
-                                    "Loan_amount_requested", "Property_value"]
-                elif loan_type == "personal":
-                    numeric_fields = ["Age", "Employment_Duration_Years", "Annual_Income", 
-                                    "CIBIL_Score", "Existing_EMIs", "Loan_Term_Years", "Expected_Loan_Amount"]
-                elif loan_type == "business":
-                    numeric_fields = ["Business_Age_Years", "Annual_Revenue", "Net_Profit", "CIBIL_Score",
-                                    "Existing_Loan_Amount", "Loan_Tenure_Years", "Expected_Loan_Amount"]
-                elif loan_type == "gold":
-                    numeric_fields = ["Age", "Annual_Income", "CIBIL_Score", "Gold_Value", "Loan_Amount", "Loan_Tenure"]
-                elif loan_type == "car":
-                    numeric_fields = ["Age", "applicant_annual_salary", "Coapplicant_Annual_Income", "CIBIL",
-                                    "down_payment_percent", "Tenure", "loan_amount"]
+                numeric_fields = NUMERIC_FIELDS.get(loan_type, [])
                 
                 for field in numeric_fields:
                     if field in typed:
@@ -261,10 +512,10 @@ def chat_message(req: MessageRequest):
                 prediction_input = {k: v for k, v in typed.items() 
                                   if not k.startswith("Customer_")}
                 
-                print(f"DEBUG - Prediction input for {loan_type}: {prediction_input}")
+                logger.debug("Prediction input for %s: %s", loan_type, prediction_input)
                 
                 # Make prediction
-                predicted_loan, predicted_interest = service.predict_loan(prediction_input)
+                predicted_loan, predicted_interest = await run_in_threadpool(service.predict_loan, prediction_input)
 
                 # Get requested amount for summary based on loan type
                 if loan_type == "education":
@@ -299,7 +550,8 @@ def chat_message(req: MessageRequest):
                         "approved_amount": int(approved_amount),
                         "interest_rate": float(predicted_interest),
                         "requested_amount": summary_requested_amount,
-                        "status": approval_status
+                        "status": approval_status,
+                        **service.repayment_summary(typed, approved_amount, predicted_interest)
                     }
                 }
 
@@ -316,19 +568,33 @@ def chat_message(req: MessageRequest):
                 
                 # Save customer application data
                 try:
-                    file_path = storage_manager.save_customer_application(
-                        loan_type=loan_type,
-                        session_id=req.session_id,
-                        customer_info=customer_info,
-                        loan_data=loan_data_for_prediction,
-                        prediction_result=summary
-                    )
-                    print(f"Customer application saved: {file_path}")
+                    if PERSISTENCE is not None:
+                        # Usually just a queue put, but a full queue spills to disk with an fsync
+                        await run_in_threadpool(
+                            PERSISTENCE.enqueue,
+                            loan_type=loan_type,
+                            session_id=req.session_id,
+                            customer_info=customer_info,
+                            loan_data=loan_data_for_prediction,
+                            prediction_result=summary
+                        )
+                    else:
+                        file_path = await run_in_threadpool(
+                            storage_manager.save_customer_application,
+                            loan_type=loan_type,
+                            session_id=req.session_id,
+                            customer_info=customer_info,
+                            loan_data=loan_data_for_prediction,
+                            prediction_result=summary
+                        )
+                        logger.info("Customer application saved: %s", file_path)
                 except Exception as e:
-                    print(f"WARNING: Failed to save customer data: {e}")
+                    logger.warning("Failed to save customer data: %s", e)
 
                 # Reset for new prediction but keep conversation
-                SESSIONS[req.session_id]["user_profile"] = {}
+                state["user_profile"] = {}
+                if dialog is not None:
+                    dialog.start(state)
 
                 # Generate marketing-friendly response message
                 customer_name = customer_info.get("name", "")
@@ -393,7 +659,14 @@ def chat_message(req: MessageRequest):
 
         # Otherwise, ask for missing information
         if missing_fields:
-            followup = service.assistant_followup(conversation, user_profile, missing_fields)
+            if dialog is not None:
+                followup = dialog.next_question(state, missing_fields, recorded_now)
+            elif speculative_followup is not None and user_profile == guessed_profile:
+                followup = await speculative_followup
+                speculation_used = True
+            else:
+                # No draft, or extraction disagreed with the regex guess; generate for the actual state
+                followup = await service.aassistant_followup(conversation, user_profile, missing_fields)
             conversation.append({"role": "assistant", "content": followup})
 
             return MessageResponse(
@@ -403,7 +676,7 @@ def chat_message(req: MessageRequest):
             )
         else:
             # This should not happen as we handle complete cases above
-            print("WARNING: No missing fields but prediction not processed")
+            logger.warning("No missing fields but prediction not processed")
             return MessageResponse(
                 message="I have all the information. Let me process your loan application...",
                 recorded={},
@@ -412,14 +685,113 @@ def chat_message(req: MessageRequest):
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
+    finally:
+        if speculative_followup is not None:
+            if not speculative_followup.done():
+                speculative_followup.cancel()
+            service.record_speculation(speculation_used)
+        await run_in_threadpool(SESSIONS.save, req.session_id, state)
+
+@app.post("/predict/batch/{loan_type}")
+async def predict_batch(loan_type: str, request: Request):
+    """Score many applicant profiles in one vectorized model call (JSON list or NDJSON body)"""
+    loan_type = loan_type.lower()
+    if loan_type not in LoanServiceFactory.get_available_loan_types():
+        raise HTTPException(status_code=400, detail="Invalid loan type")
+    
+    try:
+        rows = await _read_batch_rows(request, BATCH_MAX_ROWS)
+    except BatchTooLarge:
+        raise HTTPException(status_code=413, detail=f"Batch has more than {BATCH_MAX_ROWS} rows")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch payload: {str(e)}")
+    
+    try:
+        service = await run_in_threadpool(LoanServiceFactory.get_service, loan_type, OPENAI_API_KEY)
+        typed_rows = [_coerce_numeric_fields(loan_type, row) if isinstance(row, dict) else row for row in rows]
+        results = await run_in_threadpool(service.predict_batch, typed_rows)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
+    
+    succeeded = sum(1 for r in results if r["status"] == "ok")
+    return {
+        "loan_type": loan_type,
+        "count": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+@app.post("/quote/{loan_type}/grid")
+async def quote_grid(loan_type: str, req: GridQuoteRequest):
+    """What-if quotes: score one profile across the cartesian product of the given axes in one model call"""
+    loan_type = loan_type.lower()
+    if loan_type not in LoanServiceFactory.get_available_loan_types():
+        raise HTTPException(status_code=400, detail="Invalid loan type")
+    if not req.axes:
+        raise HTTPException(status_code=400, detail="At least one axis is required")
+    
+    # The first request for a loan type loads its models, which must not block the event loop
+    service = await run_in_threadpool(LoanServiceFactory.get_service, loan_type, OPENAI_API_KEY)
+    prediction_fields = service.get_prediction_fields()
+    numeric_fields = NUMERIC_FIELDS.get(loan_type, [])
+    axes: Dict[str, List[Any]] = {}
+    points = 1
+    for name, axis in req.axes.items():
+        if name not in prediction_fields:
+            raise HTTPException(status_code=400, detail=f"{name} is not a {loan_type} loan prediction field")
+        values = _axis_values(axis)
+        if not values:
+            raise HTTPException(status_code=400, detail=f"Axis {name} has no values")
+        if name in numeric_fields:
+            try:
+                values = [_to_float(v) for v in values]
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Axis {name} has non-numeric values")
+        axes[name] = values
+        points *= len(values)
+    if points > GRID_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Grid has {points} points; the limit is {GRID_MAX_POINTS}")
+    
+    try:
+        grid = await run_in_threadpool(service.predict_grid, _coerce_numeric_fields(loan_type, req.profile), axes)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Grid prediction error: {str(e)}")
+    return {"loan_type": loan_type, "points": points, **grid}
+
+@app.post("/amortization")
+def amortize(req: AmortizationRequest):
+    """EMI, total interest and optionally full repayment schedules for many loans in one vectorized pass"""
+    if req.include_schedule and len(req.loans) > 100:
+        raise HTTPException(status_code=400, detail="Schedules are limited to 100 loans per request")
+    
+    principal = [loan.principal for loan in req.loans]
+    rates = [loan.annual_rate for loan in req.loans]
+    months = [loan.tenure_months for loan in req.loans]
+    totals = amortization.summarize(principal, rates, months)
+    
+    results = []
+    for i, loan in enumerate(req.loans):
+        result = {
+            "principal": loan.principal,
+            "annual_rate": loan.annual_rate,
+            "tenure_months": loan.tenure_months,
+            "emi": round(float(totals["emi"][i]), 2),
+            "total_payment": round(float(totals["total_payment"][i]), 2),
+            "total_interest": round(float(totals["total_interest"][i]), 2),
+        }
+        if req.include_schedule:
+            result["schedule"] = amortization.schedule_table(loan.principal, loan.annual_rate, loan.tenure_months)
+        results.append(result)
+    return {"count": len(results), "results": results}
 
 @app.get("/session/{session_id}")
 def get_session_info(session_id: str):
     """Get information about a chat session"""
-    if session_id not in SESSIONS:
+    state = SESSIONS.get(session_id)
+    if state is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    state = SESSIONS[session_id]
     service = LoanServiceFactory.get_service(state["loan_type"], OPENAI_API_KEY)
     
     return {
@@ -431,6 +803,33 @@ def get_session_info(session_id: str):
         "created_at": state["created_at"]
     }
 
+@app.get("/admin/sessions")
+def get_session_stats():
+    """Session store size, limits and eviction counters"""
+    return SESSIONS.stats()
+
+@app.get("/admin/persistence")
+def get_persistence_stats():
+    """Write-behind queue depth, batches written, retries and spilled applications (admin endpoint)"""
+    if PERSISTENCE is None:
+        return {"write_behind": False}
+    return {"write_behind": True, **PERSISTENCE.stats()}
+
+@app.get("/admin/extraction")
+def get_extraction_stats():
+    """Turns extracted by the regex rules alone vs with OpenAI, per loan type (admin endpoint)"""
+    return LoanServiceFactory.extraction_report()
+
+@app.get("/admin/prompts")
+def get_prompt_stats():
+    """Follow-up prompt sizes and prompt / cached tokens OpenAI reported, per loan type (admin endpoint)"""
+    return LoanServiceFactory.prompt_report()
+
+@app.get("/admin/logging")
+def get_logging_stats():
+    """Log level, queue depth and records dropped or sampled away (admin endpoint)"""
+    return logging_stats()
+
 @app.get("/admin/stats/{loan_type}")
 def get_loan_stats(loan_type: str):
     """Get statistics for a specific loan type (admin endpoint)"""
@@ -451,25 +850,42 @@ def get_loan_stats(loan_type: str):
 def get_all_loan_stats():
     """Get statistics for all loan types (admin endpoint)"""
     try:
-        all_stats = {}
-        for loan_type in LoanServiceFactory.get_available_loan_types():
-            all_stats[loan_type] = storage_manager.get_application_stats(loan_type)
-        
-        return all_stats
+        return storage_manager.get_all_stats(LoanServiceFactory.get_available_loan_types())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting stats: {str(e)}")
 
 @app.get("/admin/applications/{loan_type}")
-def get_recent_applications(loan_type: str, limit: int = 10):
-    """Get recent applications for a loan type (admin endpoint)"""
+def get_recent_applications(loan_type: str, response: Response, limit: int = 10, cursor: Optional[str] = None,
+                            status: Optional[str] = None, approval_status: Optional[str] = None,
+                            start_date: Optional[str] = None, end_date: Optional[str] = None,
+                            cibil_min: Optional[float] = None, cibil_max: Optional[float] = None,
+                            fields: Optional[str] = None):
+    """Page through a loan type's applications, newest first (admin endpoint)
+    
+    The body is the page's list of applications; the X-Next-Cursor header holds the
+    cursor for the next page and is absent on the last one. fields is a comma-separated
+    list of (dotted) fields to return.
+    """
     if loan_type not in LoanServiceFactory.get_available_loan_types():
         raise HTTPException(status_code=400, detail="Invalid loan type")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
     
     try:
-        applications = storage_manager.get_customer_applications(loan_type, limit)
-        return applications
+        applications, next_cursor = storage_manager.page_applications(
+            loan_type, limit=limit, cursor=cursor, status=status, approval_status=approval_status,
+            start=_parse_export_date(start_date), end=_parse_export_date(end_date, end_of_range=True),
+            cibil_min=cibil_min, cibil_max=cibil_max,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting applications: {str(e)}")
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return applications
 
 @app.get("/admin/exports")
 def get_export_info():
@@ -509,28 +925,44 @@ def get_export_info():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting export info: {str(e)}")
 
+def _parse_export_date(value: Optional[str], end_of_range: bool = False) -> Optional[datetime]:
+    """Parse an ISO date/datetime query parameter as naive UTC, the form both storage backends keep
+    timestamps in; a bare end date covers that whole day"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}. Use YYYY-MM-DD or ISO 8601.")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end_of_range and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
 @app.get("/admin/export/{loan_type}")
-def download_csv_export(loan_type: str):
-    """Download CSV export for a loan type (admin endpoint)"""
+def download_csv_export(loan_type: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        status: Optional[str] = None, gzip: bool = False):
+    """Stream a CSV export for a loan type, optionally filtered by date range and status (admin endpoint)"""
     if loan_type not in LoanServiceFactory.get_available_loan_types():
         raise HTTPException(status_code=400, detail="Invalid loan type")
     
-    try:
-        from fastapi.responses import FileResponse
-        from pathlib import Path
-        
-        csv_path = Path("customer_data") / loan_type / "reports" / f"{loan_type}_applications.csv"
-        
-        if not csv_path.exists():
-            raise HTTPException(status_code=404, detail="CSV file not found")
-        
-        return FileResponse(
-            path=str(csv_path),
-            filename=f"{loan_type}_applications.csv",
-            media_type='text/csv'
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error downloading CSV: {str(e)}")
+    start = _parse_export_date(start_date)
+    end = _parse_export_date(end_date, end_of_range=True)
+    
+    # Rows are pulled lazily from the storage cursor; Starlette iterates sync generators in
+    # the threadpool, so a large export neither buffers in memory nor blocks the event loop
+    rows = storage_manager.iter_export_rows(loan_type, start=start, end=end, status=status)
+    chunks = iter_csv_chunks(rows)
+    filename = f"{loan_type}_applications.csv"
+    media_type = "text/csv"
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 @app.post("/admin/generate-report/{loan_type}")
 def generate_csv_report(loan_type: str):
@@ -0,0 +1,75 @@
+"""
+Vectorized EMI and amortization maths for reducing-balance loans.
+
+Every function takes array-likes (or scalars) of principal, annual rate in percent
+and tenure in months, broadcasts them together and computes all loans at once.
+"""
+
+from typing import Dict, Any, List
+import numpy as np
+
+
+def _inputs(principal, annual_rate, months):
+    principal, annual_rate, months = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64),
+        np.asarray(annual_rate, dtype=np.float64),
+        np.asarray(months, dtype=np.float64),
+    )
+    return principal, annual_rate / 1200.0, months
+
+
+def emi(principal, annual_rate, months) -> np.ndarray:
+    """Equated monthly instalment: P*r*(1+r)^n / ((1+r)^n - 1), or P/n at zero interest"""
+    principal, r, n = _inputs(principal, annual_rate, months)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.power(1.0 + r, n)
+        payment = np.where(r > 0, principal * r * growth / (growth - 1.0), principal / n)
+    return np.where(n > 0, payment, np.nan)
+
+
+def summarize(principal, annual_rate, months) -> Dict[str, np.ndarray]:
+    """EMI, total amount paid and total interest for every loan"""
+    principal, _, n = _inputs(principal, annual_rate, months)
+    payment = emi(principal, annual_rate, months)
+    total_payment = payment * n
+    return {"emi": payment, "total_payment": total_payment, "total_interest": total_payment - principal}
+
+
+def schedule(principal, annual_rate, months) -> Dict[str, np.ndarray]:
+    """Month-by-month schedules as (loans x max_months) arrays.
+
+    Uses the closed-form balance after k payments, P(1+r)^k - EMI((1+r)^k - 1)/r,
+    so every month of every loan is computed without a Python loop. Months past a
+    loan's tenure are zero.
+    """
+    principal, r, n = _inputs(principal, annual_rate, months)
+    principal, r, n = principal.reshape(-1, 1), r.reshape(-1, 1), n.reshape(-1, 1)
+    payment = emi(principal, r * 1200.0, n)
+
+    k = np.arange(0, int(np.nanmax(n, initial=0)) + 1, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.power(1.0 + r, k)
+        balance = np.where(r > 0, principal * growth - payment * (growth - 1.0) / r, principal - payment * k)
+    balance = np.clip(balance, 0.0, None)
+
+    interest = balance[:, :-1] * r
+    principal_paid = balance[:, :-1] - balance[:, 1:]
+    active = k[1:] <= n
+    return {
+        "month": np.broadcast_to(k[1:].astype(np.int64), active.shape),
+        "payment": np.where(active, principal_paid + interest, 0.0),
+        "interest": np.where(active, interest, 0.0),
+        "principal": np.where(active, principal_paid, 0.0),
+        "balance": np.where(active, balance[:, 1:], 0.0),
+    }
+
+
+def schedule_table(principal: float, annual_rate: float, months: int) -> Dict[str, List[Any]]:
+    """One loan's schedule as columns of rounded values (for JSON responses)"""
+    rows = schedule(principal, annual_rate, months)
+    n = int(months)
+    return {
+        "month": rows["month"][0, :n].tolist(),
+        **{column: np.round(rows[column][0, :n], 2).tolist()
+           for column in ("payment", "principal", "interest", "balance")},
+    }
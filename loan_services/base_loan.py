@@ -1,22 +1,142 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Tuple, Callable
 import os
+import re
+import logging
+import json
+import time
+import hashlib
+import itertools
+from datetime import datetime
+import threading
 import joblib
+import numpy as np
 import pandas as pd
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+from .compiled_scorer import CompiledScorer, MANIFEST_FILE, read_manifest, library_versions
+from .prediction_cache import PredictionCache, DEFAULT_CACHE_SIZE
+from . import amortization
+from .extraction import engine_for, KEYWORD_MATCH
+from .slot_filling import SlotFillingDialog
+from .prompt_window import ConversationWindow, UsageCounter
+
+# Native artifacts live in <model_path>/native; set USE_NATIVE_ARTIFACTS=false to force the pickles
+NATIVE_ARTIFACT_DIR = "native"
+USE_NATIVE_ARTIFACTS = os.getenv("USE_NATIVE_ARTIFACTS", "true").lower() != "false"
+# Regex extraction at or above this confidence is used without asking OpenAI (above 1 = always ask)
+EXTRACTION_CONFIDENCE = float(os.getenv("EXTRACTION_CONFIDENCE", str(KEYWORD_MATCH)))
+# Send a per loan type prompt_cache_key so requests sharing a prompt prefix reach the same OpenAI cache
+OPENAI_PROMPT_CACHE_KEY = os.getenv("OPENAI_PROMPT_CACHE_KEY", "true").lower() != "false"
+
+logger = logging.getLogger(__name__)
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _nest(flat: List[Any], shape: List[int]) -> Any:
+    """Reshape a row-major flat list into nested lists"""
+    if len(shape) <= 1:
+        return flat
+    step = len(flat) // shape[0] if shape[0] else 0
+    return [_nest(flat[i * step:(i + 1) * step], shape[1:]) for i in range(shape[0])]
 
 class BaseLoanService(ABC):
     """Base class for all loan services"""
     
-    def __init__(self, model_path: str, openai_api_key: Optional[str] = None):
+    # Input field holding the requested repayment period in years (used for EMI)
+    tenure_field: Optional[str] = None
+    # Rule table in extraction.PROFILES used when OpenAI extraction is unavailable
+    extraction_profile: str = "default"
+    
+    def __init__(self, model_path: str, openai_api_key: Optional[str] = None, lazy: bool = False):
         self.model_path = model_path
-        self.models = {}
+        self._models: Dict[str, Any] = {}
+        self._scorer: Optional[CompiledScorer] = None
+        self._models_loaded = False
+        self._models_loading = False
+        self._pickles_loaded = False
+        self.prefer_native = USE_NATIVE_ARTIFACTS
+        # Raw model outputs keyed on (model generation, encoded feature vector)
+        self.prediction_cache: Optional[PredictionCache] = PredictionCache() if DEFAULT_CACHE_SIZE > 0 else None
+        self._model_generation = 0
+        self._load_lock = threading.RLock()
+        self.load_report: Dict[str, Any] = {"loaded": False}
         self.client = None
+        self.async_client = None
+        self.extraction_confidence = EXTRACTION_CONFIDENCE
+        self.extraction_counters = {"turns": 0, "regex_only": 0, "llm_calls": 0, "llm_failures": 0, "llm_seconds": 0.0}
+        self._slot_dialog: Optional[SlotFillingDialog] = None
+        # Bounds follow-up prompts and counts their size
+        self.prompt_window = ConversationWindow()
+        # Prompt / cached tokens OpenAI reported for extraction and greeting requests
+        self.extraction_usage = UsageCounter()
+        self.greeting_usage = UsageCounter()
+        # Chat turns whose extraction went to OpenAI, follow-up questions drafted meanwhile,
+        # and how many of those drafts were usable
+        self.speculation_counters = {"llm_turns": 0, "started": 0, "used": 0, "discarded": 0}
         
         if openai_api_key:
             self.client = OpenAI(api_key=openai_api_key)
+            self.async_client = AsyncOpenAI(api_key=openai_api_key)
         
-        self.load_models()
+        if not lazy:
+            self.ensure_models_loaded()
+    
+    # ---------- Lazy model access ----------
+    @property
+    def models(self) -> Dict[str, Any]:
+        """Loaded model artifacts; the first access loads them if construction was lazy.
+        When the scorer came from native artifacts the pickles are only read here, on demand."""
+        if not self._models_loaded:
+            self.ensure_models_loaded()
+        if not self._pickles_loaded:
+            with self._load_lock:
+                if not self._pickles_loaded:
+                    self._load_pickles()
+        return self._models
+    
+    @property
+    def scorer(self) -> Optional[CompiledScorer]:
+        if not self._models_loaded:
+            self.ensure_models_loaded()
+        return self._scorer
+    
+    @scorer.setter
+    def scorer(self, scorer: Optional[CompiledScorer]):
+        self._scorer = scorer
+    
+    @property
+    def models_loaded(self) -> bool:
+        return self._models_loaded
+    
+    def reload_models(self):
+        """Load the models again (e.g. after convert_models.py) and drop cached predictions"""
+        with self._load_lock:
+            self._models_loading = True
+            try:
+                self.load_models()
+                self._models_loaded = True
+            finally:
+                self._models_loading = False
+    
+    def ensure_models_loaded(self):
+        """Load models once; concurrent callers wait for the thread doing the load"""
+        if self._models_loaded:
+            return
+        with self._load_lock:
+            # Re-entrant access from load_models/compile_scorer on the loading thread
+            if self._models_loaded or self._models_loading:
+                return
+            self._models_loading = True
+            try:
+                self.load_models()
+                self._models_loaded = True
+            finally:
+                self._models_loading = False
     
     @abstractmethod
     def get_required_fields(self) -> List[str]:
@@ -33,146 +153,509 @@ class BaseLoanService(ABC):
         """Predict loan amount and interest rate"""
         pass
     
+    @abstractmethod
+    def build_feature_record(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the raw (pre-encoding) model feature record for one applicant"""
+        pass
+    
+    @abstractmethod
+    def score_features(self, input_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Run encoders/scaler/models once over a frame of feature records"""
+        pass
+    
+    @abstractmethod
+    def finalize_prediction(self, user_input: Dict[str, Any], loan_amount: float, interest_rate: float) -> tuple:
+        """Apply business bounds and rounding to one raw model output"""
+        pass
+    
+    def tenure_months(self, user_input: Dict[str, Any]) -> Optional[float]:
+        """Requested tenure in months, or None if the input doesn't have a usable one"""
+        try:
+            years = float(user_input[self.tenure_field])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return years * 12 if years > 0 else None
+    
+    def repayment_summary(self, user_input: Dict[str, Any], amount: float, annual_rate: float) -> Dict[str, Any]:
+        """EMI and total interest for an amount at the requested tenure (empty without a tenure)"""
+        months = self.tenure_months(user_input)
+        if not months:
+            return {}
+        totals = amortization.summarize(amount, annual_rate, months)
+        return {
+            "tenure_months": int(months),
+            "emi": round(float(totals["emi"]), 2),
+            "total_interest": round(float(totals["total_interest"]), 2),
+        }
+    
+    def get_prediction_fields(self) -> List[str]:
+        """Return the required fields that feed the model (contact fields excluded)"""
+        return [f for f in self.get_required_fields() if not f.startswith("Customer_")]
+    
+    def validate_prediction_input(self, user_input: Dict[str, Any]) -> List[str]:
+        """Validate one applicant profile, returning a list of error messages"""
+        errors = []
+        for field in self.get_prediction_fields():
+            if user_input.get(field) is None:
+                errors.append(f"Missing required field: {field}")
+                continue
+            if hasattr(self, 'validate_field'):
+                is_valid, error_msg = self.validate_field(field, user_input[field])
+                if not is_valid:
+                    errors.append(error_msg)
+        
+        if not errors:
+            # Cross-field checks only make sense once every field is individually valid
+            for check in ("validate_complete_data", "validate_business_logic"):
+                if hasattr(self, check):
+                    is_valid, error_msg = getattr(self, check)(user_input)
+                    if not is_valid:
+                        errors.append(error_msg)
+        return errors
+    
+    def predict_batch(self, rows: Iterable[Dict[str, Any]], chunk_size: int = 10000) -> List[Dict[str, Any]]:
+        """Score many applications, running the model once per chunk of valid rows.
+        
+        Returns one result per input row (in order) with either the prediction
+        or the validation errors for that row.
+        """
+        results: List[Optional[Dict[str, Any]]] = []
+        pending: List[Tuple[int, Dict[str, Any], Dict[str, Any]]] = []
+        
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                results.append({"index": index, "status": "error", "errors": ["Row must be a JSON object"]})
+                continue
+            
+            errors = self.validate_prediction_input(row)
+            if not errors:
+                try:
+                    pending.append((index, row, self.build_feature_record(row)))
+                    results.append(None)
+                    continue
+                except (KeyError, ValueError, TypeError, ZeroDivisionError) as e:
+                    errors = [f"Invalid input: {e}"]
+            results.append({"index": index, "status": "error", "errors": errors})
+        
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            records = [record for _, _, record in chunk]
+            if self.scorer is not None:
+                loan_amounts, interest_rates = self.scorer.score_many(records)
+            else:
+                loan_amounts, interest_rates = self.score_features(pd.DataFrame(records))
+            finalized = [self.finalize_prediction(row, loan_amount, interest_rate)
+                         for (_, row, _), loan_amount, interest_rate in zip(chunk, loan_amounts, interest_rates)]
+            # One vectorized EMI pass per chunk at the predicted amount, rate and requested tenure
+            months = [self.tenure_months(row) for _, row, _ in chunk]
+            emis = amortization.emi([amount for amount, _ in finalized], [rate for _, rate in finalized],
+                                    [m or 0 for m in months])
+            for (index, _, _), (predicted_loan, predicted_rate), tenure, payment in zip(chunk, finalized, months, emis):
+                results[index] = {
+                    "index": index,
+                    "status": "ok",
+                    "predicted_loan_amount": predicted_loan,
+                    "interest_rate": predicted_rate,
+                    "emi": round(float(payment), 2) if tenure else None,
+                }
+        
+        return results
+    
+    def predict_grid(self, profile: Dict[str, Any], axes: Dict[str, List[Any]]) -> Dict[str, Any]:
+        """Score every combination of axis values applied to one profile in a single model call.
+        
+        Returns matrices shaped like the axes (first axis outermost) with None where a
+        combination fails validation; those errors are listed once per distinct message.
+        """
+        names = list(axes)
+        shape = [len(axes[name]) for name in names]
+        rows = [{**profile, **dict(zip(names, combo))} for combo in itertools.product(*(axes[n] for n in names))]
+        results = self.predict_batch(rows, chunk_size=max(len(rows), 1))
+        
+        amounts: List[Optional[float]] = []
+        rates: List[Optional[float]] = []
+        emis: List[Optional[float]] = []
+        errors: Dict[str, int] = {}
+        for result in results:
+            if result["status"] == "ok":
+                amounts.append(result["predicted_loan_amount"])
+                rates.append(result["interest_rate"])
+                emis.append(result["emi"])
+            else:
+                amounts.append(None)
+                rates.append(None)
+                emis.append(None)
+                for error in result["errors"]:
+                    errors[error] = errors.get(error, 0) + 1
+        
+        return {
+            "axes": {name: list(axes[name]) for name in names},
+            "shape": shape,
+            "eligible_amount": _nest(amounts, shape),
+            "interest_rate": _nest(rates, shape),
+            "emi": _nest(emis, shape),
+            "invalid_points": sum(1 for a in amounts if a is None),
+            "errors": [{"error": error, "points": count} for error, count in errors.items()],
+        }
+    
+    def native_artifact_dir(self) -> str:
+        """Directory holding the native (UBJ + .npy) artifacts for this loan type"""
+        return os.path.join(self.model_path, NATIVE_ARTIFACT_DIR)
+    
     def load_models(self):
-        """Load ML models from the specified path"""
+        """Load ML models from the specified path, preferring native artifacts over pickles.
+        On a reload the previous scorer keeps serving until the new one is in place."""
+        started = time.perf_counter()
+        scorer: Optional[CompiledScorer] = None
+        
+        native_dir = self.native_artifact_dir()
+        if self.prefer_native and os.path.exists(os.path.join(native_dir, MANIFEST_FILE)):
+            try:
+                manifest = read_manifest(native_dir)
+                stale = self.stale_native_sources(manifest)
+                if stale:
+                    raise ValueError(f"{', '.join(stale)} changed since conversion (re-run convert_models.py)")
+                scorer = CompiledScorer.load(native_dir, manifest=manifest)
+                logger.info("Loaded native artifacts for %s from %s in %.3fs",
+                            self.__class__.__name__, native_dir, time.perf_counter() - started)
+                # Pickles from an earlier load may be outdated; re-read them if the fallback needs them
+                self._pickles_loaded = False
+                self._install_scorer(scorer)
+                self.load_report = {
+                    "loaded": True,
+                    "source": "native",
+                    "format_version": manifest["format_version"],
+                    "models": {},
+                    "compile_seconds": 0.0,
+                    "total_seconds": time.perf_counter() - started,
+                    "compiled_scorer": True,
+                }
+                return
+            except Exception as e:
+                logger.warning("Native artifacts unusable for %s, loading pickles: %s", self.__class__.__name__, e)
+        
+        model_seconds = self._load_pickles()
+        t0 = time.perf_counter()
+        try:
+            scorer = self.compile_scorer()
+            if scorer:
+                logger.info("Compiled fast-path scorer for %s (%d features)", self.__class__.__name__, scorer.n_features)
+        except Exception as e:
+            logger.warning("Fast-path scorer unavailable for %s, using pandas pipeline: %s", self.__class__.__name__, e)
+        
+        self._install_scorer(scorer)
+        self.load_report = {
+            "loaded": True,
+            "source": "pickle",
+            "models": model_seconds,
+            "compile_seconds": time.perf_counter() - t0,
+            "total_seconds": time.perf_counter() - started,
+            "compiled_scorer": scorer is not None,
+        }
+    
+    def _install_scorer(self, scorer: Optional[CompiledScorer]):
+        # Swap the scorer before bumping the generation: a prediction that read the new
+        # generation always scores with the new models, anything older is never looked up again
+        self._scorer = scorer
+        self._model_generation += 1
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()
+    
+    def _load_pickles(self) -> Dict[str, Optional[float]]:
+        """joblib-load every model file, returning the seconds spent per file"""
+        model_seconds: Dict[str, Optional[float]] = {}
         try:
             model_files = self.get_model_files()
             for key, filename in model_files.items():
                 full_path = os.path.join(self.model_path, filename)
                 if os.path.exists(full_path):
-                    self.models[key] = joblib.load(full_path)
-                    print(f"Loaded {key} model from {full_path}")
+                    t0 = time.perf_counter()
+                    self._models[key] = joblib.load(full_path)
+                    model_seconds[key] = time.perf_counter() - t0
+                    logger.info("Loaded %s model from %s in %.3fs", key, full_path, model_seconds[key])
                 else:
-                    print(f"Warning: Model file {full_path} not found")
-                    self.models[key] = None
+                    logger.warning("Model file %s not found", full_path)
+                    self._models[key] = None
+                    model_seconds[key] = None
         except Exception as e:
-            print(f"Error loading models: {e}")
+            logger.error("Error loading models: %s", e)
+        self._pickles_loaded = True
+        return model_seconds
+    
+    def source_checksums(self) -> Dict[str, Dict[str, Any]]:
+        """sha256 of each model pickle present, keyed like get_model_files()"""
+        checksums = {}
+        for key, filename in self.get_model_files().items():
+            full_path = os.path.join(self.model_path, filename)
+            if os.path.exists(full_path):
+                checksums[key] = {"file": filename, "sha256": file_sha256(full_path)}
+        return checksums
+    
+    def stale_native_sources(self, manifest: Dict[str, Any]) -> List[str]:
+        """Model keys whose pickle differs from the one the native artifacts were converted from.
+        Missing pickles don't count, so a deployment may ship only the native artifacts."""
+        recorded = manifest.get("sources") or {}
+        return [key for key, entry in self.source_checksums().items()
+                if (recorded.get(key) or {}).get("sha256") != entry["sha256"]]
+    
+    def save_native_artifacts(self, directory: Optional[str] = None,
+                              metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Write the compiled scorer as native artifacts that later loads use instead of the pickles"""
+        if self.scorer is None:
+            raise ValueError(f"{self.__class__.__name__} has no compiled scorer to export")
+        metadata = {
+            "loan_service": self.__class__.__name__,
+            "created_at": datetime.now().isoformat(),
+            "sources": self.source_checksums(),
+            "libraries": library_versions(),
+            **(metadata or {}),
+        }
+        return self.scorer.save(directory or self.native_artifact_dir(), metadata)
+    
+    def compile_scorer(self) -> Optional[CompiledScorer]:
+        """Precompute the feature layout, category codes and scaler vectors for the
+        DataFrame-free fast path. Returns None when the loaded models don't support it."""
+        return None
+    
+    def predict_compiled(self, user_input: Dict[str, Any]) -> tuple:
+        """Score one applicant through the compiled NumPy fast path, memoizing raw outputs"""
+        record = self.build_feature_record(user_input)
+        # Read the generation before the scorer: a reload in between then only costs a miss
+        generation = self._model_generation
+        scorer = self.scorer
+        if self.prediction_cache is None:
+            loan_amount, interest_rate = scorer.score(record)
+            return self.finalize_prediction(user_input, loan_amount, interest_rate)
+        
+        vector = scorer.encode(record)
+        vector += 0.0  # -0.0 -> 0.0 so equal inputs share a key
+        key = (generation, vector.tobytes())
+        cached = self.prediction_cache.get(key)
+        if cached is None:
+            cached = scorer.score_encoded(vector)
+            self.prediction_cache.put(key, cached)
+        return self.finalize_prediction(user_input, *cached)
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self.prediction_cache.stats() if self.prediction_cache is not None else None
     
     @abstractmethod
     def get_model_files(self) -> Dict[str, str]:
         """Return dictionary of model files needed"""
         pass
     
+    # ---------- OpenAI request builders (shared by the sync and async paths) ----------
+    # Each request starts with text that is fixed per loan type and ends with what
+    # changes per turn, so OpenAI's prompt cache can reuse the fixed prefix.
+    def _cache_routing(self, purpose: str) -> Dict[str, Any]:
+        if not OPENAI_PROMPT_CACHE_KEY:
+            return {}
+        return {"extra_body": {"prompt_cache_key": f"{self.extraction_profile}-{purpose}"}}
+    
+    def _extraction_request(self, user_text: str, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Chat completion arguments for field extraction"""
+        return {
+            "model": "gpt-4o-mini",
+            "messages": [{"role": "user", "content": self.get_extraction_prompt(user_text, conversation)}],
+            "temperature": 0,
+            "max_tokens": 500,
+            "timeout": 8,  # 8 second timeout
+            **self._cache_routing("extraction"),
+        }
+    
+    def _parse_extraction(self, extracted_text: str) -> Optional[Dict[str, Any]]:
+        """Pull the JSON object out of an extraction response"""
+        m = re.search(r"\{.*\}", extracted_text.strip(), re.DOTALL)
+        if m:
+            return json.loads(m.group())
+        return None
+    
+    def _greeting_request(self, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Chat completion arguments for the opening greeting"""
+        # Create a proper greeting prompt
+        greeting_messages = conversation.copy()
+        greeting_messages.append({
+            "role": "user", 
+            "content": "Hello, I'm interested in this loan. Please greet me and ask for the first piece of information you need."
+        })
+        return {
+            "model": "gpt-4o-mini",
+            "messages": greeting_messages,
+            "temperature": 0.7,
+            "max_tokens": 200,
+            "timeout": 8,
+            **self._cache_routing("greeting"),
+        }
+    
+    def _followup_request(self, conversation: List[Dict[str, str]], user_profile: Dict[str, Any], missing_fields: List[str]) -> Dict[str, Any]:
+        """Chat completion arguments for the next follow-up question"""
+        messages = self.prompt_window.build(
+            conversation, user_profile, missing_fields,
+            "Continue the conversation naturally to collect the missing information. "
+            "Ask for the next missing field in a friendly way."
+        )
+        return {
+            "model": "gpt-4o-mini",
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 200,
+            "timeout": 8,
+            **self._cache_routing("followup"),
+        }
+    
+    def route_regex(self, user_text: str, conversation: List[Dict[str, str]]) -> Tuple[Dict[str, Any], bool]:
+        """Regex extraction and whether it is confident enough to skip OpenAI (counted as one turn)"""
+        extracted, confidence = engine_for(self.extraction_profile).route(user_text, conversation, self.extraction_confidence)
+        confident = confidence >= self.extraction_confidence
+        self.extraction_counters["turns"] += 1
+        if confident:
+            self.extraction_counters["regex_only"] += 1
+        logger.debug("Extraction confidence %.2f (%s): %s", confidence, "regex" if confident else "llm", list(extracted))
+        return extracted, confident
+    
+    def _record_llm_extraction(self, started: float, extracted: Optional[Dict[str, Any]]):
+        self.extraction_counters["llm_calls"] += 1
+        self.extraction_counters["llm_seconds"] += time.perf_counter() - started
+        if extracted is None:
+            self.extraction_counters["llm_failures"] += 1
+    
+    def route_extraction(self, user_text: str, conversation: List[Dict[str, str]],
+                         llm_extract: Optional[Callable[[], Optional[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """Regex extraction, calling llm_extract() only when the rules aren't confident
+        
+        llm_extract returns the fields OpenAI found, or None when the call failed or
+        the reply held no JSON; the regex result is used then. Both the turn and the
+        OpenAI call are counted in extraction_stats().
+        """
+        extracted, confident = self.route_regex(user_text, conversation)
+        if confident or llm_extract is None:
+            return extracted
+        
+        started = time.perf_counter()
+        llm_extracted = llm_extract()
+        self._record_llm_extraction(started, llm_extracted)
+        
+        # Fall back to whatever the pattern matching found
+        return llm_extracted if llm_extracted is not None else extracted
+    
     def extract_info_from_response(self, user_text: str, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
-        """Extract information from user response using OpenAI or fallback logic"""
-        # Try OpenAI with very short timeout first
-        if self.client:
-            extraction_prompt = self.get_extraction_prompt(user_text, conversation)
-            
+        """Extract information from the user response, asking OpenAI only when the regex rules aren't confident"""
+        def ask_openai() -> Optional[Dict[str, Any]]:
             try:
-                resp = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": extraction_prompt}],
-                    temperature=0,
-                    max_tokens=500,
-                    timeout=8  # 8 second timeout
-                )
-                extracted_text = resp.choices[0].message.content.strip()
-                import re, json
-                m = re.search(r"\{.*\}", extracted_text, re.DOTALL)
-                if m:
-                    return json.loads(m.group())
+                resp = self.client.chat.completions.create(**self._extraction_request(user_text, conversation))
+                self.extraction_usage.record(resp)
+                return self._parse_extraction(resp.choices[0].message.content)
             except Exception as e:
-                print(f"OpenAI extraction failed (using fallback): {e}")
+                logger.warning("OpenAI extraction failed (using fallback): %s", e)
+                return None
+        
+        return self.route_extraction(user_text, conversation, ask_openai if self.client else None)
+    
+    async def aextract_info_from_response(self, user_text: str, conversation: List[Dict[str, str]],
+                                          routed: Optional[Tuple[Dict[str, Any], bool]] = None) -> Dict[str, Any]:
+        """Async variant of extract_info_from_response using AsyncOpenAI
+        
+        routed is this turn's route_regex() result when the caller already has it.
+        """
+        extracted, confident = routed if routed is not None else self.route_regex(user_text, conversation)
+        if confident or not self.async_client:
+            return extracted
+        
+        started = time.perf_counter()
+        llm_extracted = None
+        try:
+            resp = await self.async_client.chat.completions.create(**self._extraction_request(user_text, conversation))
+            self.extraction_usage.record(resp)
+            llm_extracted = self._parse_extraction(resp.choices[0].message.content)
+        except Exception as e:
+            logger.warning("OpenAI extraction failed (using fallback): %s", e)
+        self._record_llm_extraction(started, llm_extracted)
         
-        # Fallback to simple pattern matching for basic fields
-        return self._fallback_extraction(user_text, conversation)
+        return llm_extracted if llm_extracted is not None else extracted
+    
+    def extraction_stats(self) -> Dict[str, Any]:
+        """Turns extracted, how many skipped OpenAI and the OpenAI calls' failures and mean latency"""
+        counters = dict(self.extraction_counters)
+        turns, calls = counters["turns"], counters["llm_calls"]
+        return {
+            **counters,
+            "llm_seconds": round(counters["llm_seconds"], 3),
+            "confidence_threshold": self.extraction_confidence,
+            "llm_avoided_rate": round(1 - calls / turns, 4) if turns else None,
+            "llm_mean_seconds": round(counters["llm_seconds"] / calls, 3) if calls else None,
+        }
     
     def _fallback_extraction(self, user_text: str, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
-        """Fallback extraction using simple pattern matching"""
-        extracted = {}
-        text_lower = user_text.lower().strip()
-        
-        # Extract name patterns
-        import re
-        name_patterns = [
-            r"my name is\s+([a-zA-Z\s]+)",
-            r"i am\s+([a-zA-Z\s]+)",
-            r"call me\s+([a-zA-Z\s]+)",
-            r"i'm\s+([a-zA-Z\s]+)",
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                name = match.group(1).strip().title()
-                if len(name) > 1 and not any(word in name.lower() for word in ['years', 'old', 'work', 'job', 'salary']):
-                    extracted['Customer_Name'] = name
-                    break
-        
-        # If no pattern matched but it looks like just a name (when asked for name)
-        if not extracted.get('Customer_Name'):
-            # Check if previous message was asking for name
-            if len(conversation) > 0:
-                last_assistant_msg = ""
-                for msg in reversed(conversation):
-                    if msg.get('role') == 'assistant':
-                        last_assistant_msg = msg.get('content', '').lower()
-                        break
-                
-                if 'name' in last_assistant_msg and len(text_lower.split()) <= 3:
-                    # Simple name check - only letters and spaces, reasonable length
-                    if re.match(r'^[a-zA-Z\s]+$', user_text.strip()) and 2 <= len(user_text.strip()) <= 50:
-                        extracted['Customer_Name'] = user_text.strip().title()
-        
-        # Extract phone numbers
-        phone_pattern = r'(\+?91[-\s]?)?([6-9]\d{9})'
-        phone_match = re.search(phone_pattern, user_text)
-        if phone_match:
-            extracted['Customer_Phone'] = phone_match.group(2)
-        
-        # Extract email
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        email_match = re.search(email_pattern, user_text)
-        if email_match:
-            extracted['Customer_Email'] = email_match.group(0)
-        
-        # Extract age
-        age_patterns = [
-            r'i am\s+(\d{1,2})\s+years?\s+old',
-            r'my age is\s+(\d{1,2})',
-            r'age\s*:?\s*(\d{1,2})',
-            r'(\d{1,2})\s+years?\s+old'
-        ]
-        
-        for pattern in age_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                age = int(match.group(1))
-                if 18 <= age <= 80:  # Reasonable age range
-                    extracted['Age'] = age
-                    break
-        
-        return extracted
+        """Fallback extraction using this loan type's compiled regex rules"""
+        return engine_for(self.extraction_profile).extract(user_text, conversation)
     
     @abstractmethod
-    def get_extraction_prompt(self, user_text: str, conversation: List[Dict[str, str]]) -> str:
-        """Get extraction prompt for this loan type"""
+    def get_extraction_instructions(self) -> str:
+        """Fixed extraction instructions for this loan type (fields, formats, output); no per-turn content"""
         pass
     
+    def get_extraction_prompt(self, user_text: str, conversation: List[Dict[str, str]]) -> str:
+        """Extraction prompt: the loan type's fixed instructions first, then this turn's conversation and message"""
+        recent = conversation[-3:] if len(conversation) > 3 else conversation
+        return (
+            f"{self.get_extraction_instructions()}\n\n"
+            f"Conversation so far: {recent}\n\n"
+            f'User\'s latest response: "{user_text}"'
+        )
+    
+    def prompt_stats(self) -> Dict[str, Any]:
+        """Follow-up prompt sizes, and prompt / cached token counts per kind of OpenAI request"""
+        return {
+            "followup": self.prompt_window.stats(),
+            "extraction": self.extraction_usage.stats(),
+            "greeting": self.greeting_usage.stats(),
+            "speculative_followup": self.speculation_stats(),
+        }
+    
+    def record_llm_turn(self, speculated: bool):
+        """Count a chat turn sent to OpenAI for extraction, and whether a follow-up was drafted meanwhile"""
+        self.speculation_counters["llm_turns"] += 1
+        if speculated:
+            self.speculation_counters["started"] += 1
+    
+    def record_speculation(self, used: bool):
+        """Count whether a drafted follow-up was sent"""
+        self.speculation_counters["used" if used else "discarded"] += 1
+    
+    def speculation_stats(self) -> Dict[str, Any]:
+        counters = dict(self.speculation_counters)
+        decided = counters["used"] + counters["discarded"]
+        return {
+            **counters,
+            "hit_rate": round(counters["used"] / decided, 4) if decided else None,
+            # Share of all OpenAI-routed turns whose follow-up was ready without a second wait
+            "llm_turn_hit_rate": round(counters["used"] / counters["llm_turns"], 4) if counters["llm_turns"] else None,
+        }
+    
     def assistant_greeting(self, conversation: List[Dict[str, str]]) -> str:
         """Generate greeting message"""
         if not self.client:
             return self.get_fallback_greeting()
         
         try:
-            # Create a proper greeting prompt
-            greeting_messages = conversation.copy()
-            greeting_messages.append({
-                "role": "user", 
-                "content": "Hello, I'm interested in this loan. Please greet me and ask for the first piece of information you need."
-            })
-            
-            resp = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=greeting_messages,
-                temperature=0.7,
-                max_tokens=200,
-                timeout=8
-            )
+            resp = self.client.chat.completions.create(**self._greeting_request(conversation))
+            self.greeting_usage.record(resp)
             return resp.choices[0].message.content
         except Exception as e:
-            print(f"OpenAI greeting failed: {e}")
+            logger.warning("OpenAI greeting failed: %s", e)
+            return self.get_fallback_greeting()
+    
+    async def aassistant_greeting(self, conversation: List[Dict[str, str]]) -> str:
+        """Async variant of assistant_greeting using AsyncOpenAI"""
+        if not self.async_client:
+            return self.get_fallback_greeting()
+        
+        try:
+            resp = await self.async_client.chat.completions.create(**self._greeting_request(conversation))
+            self.greeting_usage.record(resp)
+            return resp.choices[0].message.content
+        except Exception as e:
+            logger.warning("OpenAI greeting failed: %s", e)
             return self.get_fallback_greeting()
     
     @abstractmethod
@@ -185,31 +668,35 @@ class BaseLoanService(ABC):
         if not self.client:
             return self.get_fallback_followup(missing_fields)
         
-        context_info = f"""
-        Current user profile: {user_profile}
-        Missing fields: {missing_fields}
-        
-        Continue the conversation naturally to collect the missing information.
-        Ask for the next missing field in a friendly way.
-        """
-        conversation_copy = conversation.copy()
-        conversation_copy.append({"role": "system", "content": context_info})
+        try:
+            resp = self.client.chat.completions.create(**self._followup_request(conversation, user_profile, missing_fields))
+            self.prompt_window.record_usage(resp)
+            return resp.choices[0].message.content
+        except Exception as e:
+            logger.warning("OpenAI followup failed: %s", e)
+            return self.get_fallback_followup(missing_fields)
+    
+    async def aassistant_followup(self, conversation: List[Dict[str, str]], user_profile: Dict[str, Any], missing_fields: List[str]) -> str:
+        """Async variant of assistant_followup using AsyncOpenAI"""
+        if not self.async_client:
+            return self.get_fallback_followup(missing_fields)
         
         try:
-            resp = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=conversation_copy,
-                temperature=0.7,
-                max_tokens=200,
-                timeout=8
-            )
+            resp = await self.async_client.chat.completions.create(**self._followup_request(conversation, user_profile, missing_fields))
+            self.prompt_window.record_usage(resp)
             return resp.choices[0].message.content
         except Exception as e:
-            print(f"OpenAI followup failed: {e}")
+            logger.warning("OpenAI followup failed: %s", e)
             return self.get_fallback_followup(missing_fields)
     
     def get_fallback_followup(self, missing_fields: List[str]) -> str:
         """Fallback followup when OpenAI is not available"""
         if missing_fields:
-            return f"I'd like to know more about your {missing_fields[0].replace('_',' ').lower()}. Could you please provide that information?"
-        return "Thank you for providing all the information!"
\ No newline at end of file
+            return self.slot_dialog().question(missing_fields)
+        return "Thank you for providing all the information!"
+    
+    def slot_dialog(self) -> SlotFillingDialog:
+        """Fixed-question dialog over this loan type's required fields (no OpenAI calls)"""
+        if self._slot_dialog is None:
+            self._slot_dialog = SlotFillingDialog(self)
+        return self._slot_dialog
\ No newline at end of file
@@ -1,14 +1,18 @@
-from typing import Dict, List, Any, Tuple
+import logging
+from typing import Dict, List, Any, Tuple, Optional
 import pandas as pd
 import numpy as np
-import pickle
-import re
-import json
 from .base_loan import BaseLoanService
+from .compiled_scorer import CompiledScorer, label_codes
+
+logger = logging.getLogger(__name__)
 
 class BusinessLoanService(BaseLoanService):
     """Business Loan Service with ML Model Integration"""
     
+    tenure_field = "Loan_Tenure_Years"
+    extraction_profile = "business"
+    
     # ============ CORE CONFIGURATION METHODS ============
     def get_required_fields(self) -> List[str]:
         return [
@@ -76,14 +80,10 @@ Start by introducing yourself as a business loan specialist."""
         return "Hello! I'm a business loan specialist here to help you with your business loan application. Business loans can help expand your operations, purchase equipment, or manage cash flow. Let's start with your full name - what should I call you?"
     
     # ============ DATA EXTRACTION METHODS ============
-    def get_extraction_prompt(self, user_text: str, conversation: List[Dict[str, str]]) -> str:
-        return f"""
+    def get_extraction_instructions(self) -> str:
+        return """
 Based on the conversation history and the user's latest response, extract any business loan-related information.
 
-Conversation so far: {conversation[-3:] if len(conversation) > 3 else conversation}
-
-User's latest response: "{user_text}"
-
 Extract information for these fields (only if clearly mentioned):
 
 Customer Information:
@@ -111,245 +111,10 @@ Important conversion rules:
 - For Has_Collateral/Has_Guarantor, map "yes", "have", "available" to "Yes" and "no", "don't have" to "No"
 - Extract only information that is clearly stated
 
-Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {{}}.
-Example: {{"Customer_Name": "John Doe", "Business_Age_Years": 5, "Annual_Revenue": 2000000, "Net_Profit": 500000, "Business_Type": "Manufacturing", "Has_Collateral": "Yes"}}
+Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {}.
+Example: {"Customer_Name": "John Doe", "Business_Age_Years": 5, "Annual_Revenue": 2000000, "Net_Profit": 500000, "Business_Type": "Manufacturing", "Has_Collateral": "Yes"}
 """.strip()
     
-    def extract_info_from_response(self, user_text: str, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
-        """Extract information from user response with business-specific fallback logic"""
-        # Try OpenAI first
-        if self.client:
-            extraction_prompt = self.get_extraction_prompt(user_text, conversation)
-            
-            try:
-                resp = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": extraction_prompt}],
-                    temperature=0
-                )
-                extracted_text = resp.choices[0].message.content.strip()
-                m = re.search(r"\{.*\}", extracted_text, re.DOTALL)
-                if m:
-                    return json.loads(m.group())
-            except Exception as e:
-                print(f"OpenAI extraction failed: {e}")
-        
-        # Fallback to business-specific pattern matching
-        return self._business_fallback_extraction(user_text, conversation)
-    
-    def _business_fallback_extraction(self, user_text: str, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
-        """Business-specific fallback extraction with lakh/crore conversion"""
-        extracted = {}
-        text_lower = user_text.lower().strip()
-        
-        # Extract name patterns
-        name_patterns = [
-            r"my name is\s+([a-zA-Z\s]+)",
-            r"i am\s+([a-zA-Z\s]+)",
-            r"call me\s+([a-zA-Z\s]+)",
-            r"i'm\s+([a-zA-Z\s]+)",
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                name = match.group(1).strip().title()
-                if len(name) > 1 and not any(word in name.lower() for word in ['years', 'old', 'work', 'job', 'salary']):
-                    extracted['Customer_Name'] = name
-                    break
-        
-        # If no pattern matched but it looks like just a name (when asked for name)
-        if not extracted.get('Customer_Name'):
-            # Check if previous message was asking for name
-            if len(conversation) > 0:
-                last_assistant_msg = ""
-                for msg in reversed(conversation):
-                    if msg.get('role') == 'assistant':
-                        last_assistant_msg = msg.get('content', '').lower()
-                        break
-                
-                if 'name' in last_assistant_msg and len(text_lower.split()) <= 3:
-                    # Simple name check - only letters and spaces, reasonable length
-                    if re.match(r'^[a-zA-Z\s]+$', user_text.strip()) and 2 <= len(user_text.strip()) <= 50:
-                        extracted['Customer_Name'] = user_text.strip().title()
-        
-        # Extract phone numbers
-        phone_pattern = r'(\+?91[-\s]?)?([6-9]\d{9})'
-        phone_match = re.search(phone_pattern, user_text)
-        if phone_match:
-            extracted['Customer_Phone'] = phone_match.group(2)
-        
-        # Extract email
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        email_match = re.search(email_pattern, user_text)
-        if email_match:
-            extracted['Customer_Email'] = email_match.group(0)
-        
-        # Extract business age
-        business_age_patterns = [
-            r'business.*?(\d+)\s+years?',
-            r'operating.*?(\d+)\s+years?',
-            r'(\d+)\s+years?.*?business',
-            r'(\d+)\s+years?.*?operating'
-        ]
-        
-        for pattern in business_age_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                age = int(match.group(1))
-                if 1 <= age <= 50:
-                    extracted['Business_Age_Years'] = age
-                    break
-        
-        # Extract revenue/profit with lakh/crore conversion
-        def convert_amount(amount_str):
-            """Convert lakh/crore amounts to numbers"""
-            amount_str = amount_str.lower().strip()
-            
-            # Extract number and unit - handle commas in numbers
-            number_match = re.search(r'([\d,]+(?:\.[\d,]+)?)', amount_str)
-            if not number_match:
-                return None
-            
-            # Remove commas and convert to float
-            number_str = number_match.group(1).replace(',', '')
-            try:
-                number = float(number_str)
-            except ValueError:
-                return None
-            
-            if 'crore' in amount_str:
-                return int(number * 10000000)  # 1 crore = 1,00,00,000
-            elif 'lakh' in amount_str:
-                return int(number * 100000)    # 1 lakh = 1,00,000
-            else:
-                return int(number)
-        
-        # Check what the last assistant message was asking for
-        last_assistant_msg = ""
-        if len(conversation) > 0:
-            for msg in reversed(conversation):
-                if msg.get('role') == 'assistant':
-                    last_assistant_msg = msg.get('content', '').lower()
-                    break
-        
-        # Extract revenue patterns - handle comma-separated numbers
-        revenue_patterns = [
-            r'revenue.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'turnover.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?).*?revenue',
-            r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?).*?turnover'
-        ]
-        
-        for pattern in revenue_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                amount = convert_amount(match.group(1))
-                if amount and amount >= 100000:  # Minimum reasonable revenue
-                    extracted['Annual_Revenue'] = amount
-                    break
-        
-        # If asking about revenue and user just gives amount
-        if 'revenue' in last_assistant_msg and not extracted.get('Annual_Revenue'):
-            amount_match = re.search(r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)', text_lower)
-            if amount_match:
-                amount = convert_amount(amount_match.group(1))
-                if amount and amount >= 100000:
-                    extracted['Annual_Revenue'] = amount
-        
-        # Extract profit patterns - handle comma-separated numbers
-        profit_patterns = [
-            r'profit.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?).*?profit'
-        ]
-        
-        for pattern in profit_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                amount = convert_amount(match.group(1))
-                if amount and amount >= 10000:  # Minimum reasonable profit
-                    extracted['Net_Profit'] = amount
-                    break
-        
-        # If asking about profit and user just gives amount
-        if 'profit' in last_assistant_msg and not extracted.get('Net_Profit'):
-            amount_match = re.search(r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)', text_lower)
-            if amount_match:
-                amount = convert_amount(amount_match.group(1))
-                if amount and amount >= 10000:
-                    extracted['Net_Profit'] = amount
-        
-        # Extract CIBIL score
-        cibil_patterns = [
-            r'cibil.*?(\d{3})',
-            r'credit.*?score.*?(\d{3})',
-            r'(\d{3}).*?cibil',
-            r'(\d{3}).*?credit.*?score'
-        ]
-        
-        for pattern in cibil_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                score = int(match.group(1))
-                if 300 <= score <= 900:
-                    extracted['CIBIL_Score'] = score
-                    break
-        
-        # Extract business type
-        business_type_map = {
-            'retail': 'Retail',
-            'trading': 'Trading', 
-            'service': 'Services',
-            'services': 'Services',
-            'manufacturing': 'Manufacturing',
-            'manufacture': 'Manufacturing'
-        }
-        
-        for key, value in business_type_map.items():
-            if key in text_lower:
-                extracted['Business_Type'] = value
-                break
-        
-        # Extract Yes/No fields
-        if any(word in text_lower for word in ['yes', 'have', 'available', 'got']):
-            if 'collateral' in last_assistant_msg:
-                extracted['Has_Collateral'] = 'Yes'
-            elif 'guarantor' in last_assistant_msg:
-                extracted['Has_Guarantor'] = 'Yes'
-        elif any(word in text_lower for word in ['no', "don't", "dont", "not", "none"]):
-            if 'collateral' in last_assistant_msg:
-                extracted['Has_Collateral'] = 'No'
-            elif 'guarantor' in last_assistant_msg:
-                extracted['Has_Guarantor'] = 'No'
-        
-        # Extract expected loan amount
-        loan_amount_patterns = [
-            r'need.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'want.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'require.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'loan.*?amount.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?).*?loan'
-        ]
-        
-        for pattern in loan_amount_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                amount = convert_amount(match.group(1))
-                if amount and amount >= 100000:  # Minimum 1 lakh
-                    extracted['Expected_Loan_Amount'] = amount
-                    break
-        
-        # If asking about loan amount and user just gives amount
-        if any(word in last_assistant_msg for word in ['loan amount', 'how much', 'amount need', 'amount require']):
-            if not extracted.get('Expected_Loan_Amount'):
-                amount_match = re.search(r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)', text_lower)
-                if amount_match:
-                    amount = convert_amount(amount_match.group(1))
-                    if amount and amount >= 100000:
-                        extracted['Expected_Loan_Amount'] = amount
-        
-        return extracted
-
     # ============ VALIDATION METHODS ============
     def validate_field(self, field_name: str, value: Any) -> Tuple[bool, str]:
         """Validate individual field values with strict eligibility criteria"""
@@ -451,142 +216,143 @@ Example: {{"Customer_Name": "John Doe", "Business_Age_Years": 5, "Annual_Revenue
         return True, ""
     
     # ============ ML MODEL METHODS ============
+    def build_feature_record(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the business loan feature record with mapped categoricals"""
+        # Map categorical values to model format
+        industry_risk_map = {
+            "Healthcare": 1, "FMCG": 1, "IT Services": 2, "Education": 2,
+            "Automobile": 3, "Telecom": 3, "Real Estate": 4, "Hospitality": 4,
+            "Crypto": 5, "Airlines": 5
+        }
+        
+        location_tier_map = {
+            "Metro": 1, "Tier-1 City": 2, "Tier-2 City": 3, "Rural": 4
+        }
+        
+        # Convert Yes/No to 1/0
+        has_collateral = 1 if user_input['Has_Collateral'] == 'Yes' else 0
+        has_guarantor = 1 if user_input['Has_Guarantor'] == 'Yes' else 0
+        
+        # Calculate derived features
+        annual_revenue = float(user_input['Annual_Revenue'])
+        net_profit = float(user_input['Net_Profit'])
+        existing_loan = float(user_input.get('Existing_Loan_Amount') or 0)
+        
+        business_age = float(user_input['Business_Age_Years'])
+        cibil_score = float(user_input['CIBIL_Score'])
+        industry_risk = industry_risk_map[user_input['Industry_Risk_Rating']]
+        location_tier = location_tier_map[user_input['Location_Tier']]
+        
+        return {
+            'Business_Age_Years': business_age,
+            'Annual_Revenue': annual_revenue,
+            'Net_Profit': net_profit,
+            'CIBIL_Score': cibil_score,
+            'Business_Type': user_input['Business_Type'],  # Will be encoded later
+            'Existing_Loan_Amount': existing_loan,
+            'Loan_Tenure_Years': float(user_input['Loan_Tenure_Years']),
+            'Has_Collateral': has_collateral,
+            'Has_Guarantor': has_guarantor,
+            'Industry_Risk_Rating': industry_risk,
+            'Location_Tier': location_tier,
+            'Profit_Margin': (net_profit / annual_revenue) * 100,
+            'Debt_to_Revenue_Ratio': (existing_loan / annual_revenue) * 100,
+            # Engineered features as per your model
+            'Revenue_to_Profit_Ratio': annual_revenue / (net_profit + 1),
+            'Age_Revenue_Interaction': business_age * np.log1p(annual_revenue),
+            'CIBIL_Revenue_Score': cibil_score * np.log1p(annual_revenue) / 1000000,
+            'Risk_Adjusted_Revenue': annual_revenue / (industry_risk + location_tier),
+            'Collateral_Guarantor_Score': has_collateral * 2 + has_guarantor,
+            'Business_Stability_Score': (business_age / 25) + ((cibil_score - 600) / 300),
+            'Debt_Service_Coverage': net_profit / (existing_loan * 0.12 + 1),
+            'Location_Risk_Combined': location_tier + industry_risk
+        }
+
     def prepare_model_input(self, user_input: Dict[str, Any]) -> pd.DataFrame:
         """Prepare input data for the business loan model"""
         try:
-            # Map categorical values to model format
-            industry_risk_map = {
-                "Healthcare": 1, "FMCG": 1, "IT Services": 2, "Education": 2,
-                "Automobile": 3, "Telecom": 3, "Real Estate": 4, "Hospitality": 4,
-                "Crypto": 5, "Airlines": 5
-            }
-            
-            location_tier_map = {
-                "Metro": 1, "Tier-1 City": 2, "Tier-2 City": 3, "Rural": 4
-            }
-            
-            # Convert Yes/No to 1/0
-            has_collateral = 1 if user_input['Has_Collateral'] == 'Yes' else 0
-            has_guarantor = 1 if user_input['Has_Guarantor'] == 'Yes' else 0
-            
-            # Calculate derived features
-            annual_revenue = float(user_input['Annual_Revenue'])
-            net_profit = float(user_input['Net_Profit'])
-            existing_loan = float(user_input.get('Existing_Loan_Amount', 0))
-            
-            profit_margin = (net_profit / annual_revenue) * 100
-            debt_to_revenue_ratio = (existing_loan / annual_revenue) * 100
-            
-            # Create input dataframe matching your model's expected features
-            input_data = {
-                'Business_Age_Years': float(user_input['Business_Age_Years']),
-                'Annual_Revenue': annual_revenue,
-                'Net_Profit': net_profit,
-                'CIBIL_Score': float(user_input['CIBIL_Score']),
-                'Business_Type': user_input['Business_Type'],  # Will be encoded later
-                'Existing_Loan_Amount': existing_loan,
-                'Loan_Tenure_Years': float(user_input['Loan_Tenure_Years']),
-                'Has_Collateral': has_collateral,
-                'Has_Guarantor': has_guarantor,
-                'Industry_Risk_Rating': industry_risk_map[user_input['Industry_Risk_Rating']],
-                'Location_Tier': location_tier_map[user_input['Location_Tier']],
-                'Profit_Margin': profit_margin,
-                'Debt_to_Revenue_Ratio': debt_to_revenue_ratio
-            }
-            
-            print(f"Business Loan Input data prepared: {input_data}")
+            input_data = self.build_feature_record(user_input)
+            logger.debug("Business loan input prepared: %s", input_data)
             
             input_df = pd.DataFrame([input_data])
             
-            print(f"Prepared input dataframe shape: {input_df.shape}")
-            print(f"Input columns: {list(input_df.columns)}")
+            logger.debug("Prepared input shape=%s columns=%s", input_df.shape, input_df.columns)
             
             return input_df
             
         except Exception as e:
-            print(f"Error in prepare_model_input: {e}")
+            logger.error("Error in prepare_model_input: %s", e)
             raise e
     
+    def score_features(self, input_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode Business_Type and run the multi-output business loan model"""
+        package = self.models.get("business_loan_model")
+        if not package:
+            raise Exception("Business loan ML model not available. Cannot process loan prediction.")
+        
+        df_input = input_df.copy()
+        
+        # Encode Business_Type using your label encoder
+        df_input["Business_Type_encoded"] = package["business_type_encoder"].transform(df_input["Business_Type"])
+        df_input = df_input.drop("Business_Type", axis=1)
+        
+        # prediction[:, 0] = Max_Loan_Amount_Offered, prediction[:, 1] = Interest_Rate
+        prediction = np.asarray(package["model"].predict(df_input[package["feature_columns"]]))
+        return prediction[:, 0], prediction[:, 1]
+    
+    def compile_scorer(self) -> Optional[CompiledScorer]:
+        """Compile the business loan package to a fixed layout with Business_Type codes"""
+        package = self.models.get("business_loan_model")
+        if not package:
+            return None
+        
+        features = list(package["feature_columns"])
+        business_type_codes = label_codes(package["business_type_encoder"])
+        columns = [
+            ("Business_Type", business_type_codes, None) if f == "Business_Type_encoded" else (f, None, None)
+            for f in features
+        ]
+        return CompiledScorer(
+            features, columns,
+            predictors={"model": package["model"]},
+            outputs={"loan_amount": ("model", 0, None), "interest_rate": ("model", 1, None)},
+        )
+    
+    def finalize_prediction(self, user_input: Dict[str, Any], loan_amount: float, interest_rate: float) -> tuple:
+        """Clamp raw business loan output to lending bounds"""
+        max_loan_amount = max(float(loan_amount), 100000)    # Min 1 lakh
+        max_loan_amount = min(max_loan_amount, 100000000)    # Max 10 crores
+        interest_rate = max(8.0, min(24.0, float(interest_rate)))  # Between 8% and 24%
+        return round(float(max_loan_amount), 0), round(float(interest_rate), 2)
+    
     def predict_loan(self, user_input: Dict[str, Any]) -> tuple:
         """Predict business loan amount and interest rate using ML model"""
+        if self.scorer is not None:
+            return self.predict_compiled(user_input)
+        
         try:
-            print(f"Business Loan Prediction - Input: {user_input}")
+            logger.debug("Business loan prediction input: %s", user_input)
             
             # Prepare input data
             input_df = self.prepare_model_input(user_input)
-            print(f"Prepared input shape: {input_df.shape}")
-            print(f"Input columns: {list(input_df.columns)}")
             
             # Try to use actual ML model if available
             if self.models.get("business_loan_model"):
                 try:
-                    print("Using ML model for prediction...")
-                    
-                    # Load the model package - matching your structure exactly
-                    package = self.models["business_loan_model"]
-                    model = package["model"]
-                    business_type_encoder = package["business_type_encoder"]
-                    feature_columns = package["feature_columns"]
-                    target_columns = package["target_columns"]
-                    
-                    print("Model components loaded successfully")
-                    print(f"Expected features: {feature_columns}")
-                    print(f"Target variables: {target_columns}")
-                    
-                    # Prepare data for prediction
-                    df_input = input_df.copy()
-                    
-                    # Encode Business_Type using your label encoder
-                    df_input["Business_Type_encoded"] = business_type_encoder.transform(df_input["Business_Type"])
-                    df_input = df_input.drop("Business_Type", axis=1)
-                    print(f"After encoding Business_Type: {df_input['Business_Type_encoded'].values}")
-                    
-                    # Add engineered features as per your model
-                    df_input['Revenue_to_Profit_Ratio'] = df_input['Annual_Revenue'] / (df_input['Net_Profit'] + 1)
-                    df_input['Age_Revenue_Interaction'] = df_input['Business_Age_Years'] * np.log1p(df_input['Annual_Revenue'])
-                    df_input['CIBIL_Revenue_Score'] = df_input['CIBIL_Score'] * np.log1p(df_input['Annual_Revenue']) / 1000000
-                    df_input['Risk_Adjusted_Revenue'] = df_input['Annual_Revenue'] / (df_input['Industry_Risk_Rating'] + df_input['Location_Tier'])
-                    df_input['Collateral_Guarantor_Score'] = df_input['Has_Collateral'] * 2 + df_input['Has_Guarantor']
-                    df_input['Business_Stability_Score'] = (df_input['Business_Age_Years'] / 25) + ((df_input['CIBIL_Score'] - 600) / 300)
-                    df_input['Debt_Service_Coverage'] = df_input['Net_Profit'] / (df_input['Existing_Loan_Amount'] * 0.12 + 1)
-                    df_input['Location_Risk_Combined'] = df_input['Location_Tier'] + df_input['Industry_Risk_Rating']
-                    
-                    # Select features in the correct order
-                    df_input = df_input[feature_columns]
-                    print(f"After feature selection: {list(df_input.columns)}")
-                    
-                    # Make predictions
-                    prediction = model.predict(df_input)[0]
-                    print(f"Raw predictions: {prediction}")
-                    
-                    # Handle predictions as per your structure
-                    # prediction[0] = Max_Loan_Amount_Offered
-                    # prediction[1] = Interest_Rate
-                    max_loan_amount = float(prediction[0])
-                    interest_rate = float(prediction[1])
-                    
-                    print(f"ML Prediction - Loan: Rs.{max_loan_amount:,.0f}, Rate: {interest_rate:.2f}%")
-                    
-                    # Ensure reasonable bounds for business loans
-                    max_loan_amount = max(max_loan_amount, 100000)    # Min 1 lakh
-                    max_loan_amount = min(max_loan_amount, 100000000) # Max 10 crores
-                    interest_rate = max(8.0, min(24.0, interest_rate)) # Between 8% and 24%
+                    loan_amounts, interest_rates = self.score_features(input_df)
+                    logger.debug("Model output - loan: %.0f, rate: %.2f", loan_amounts[0], interest_rates[0])
                     
-                    print(f"Final ML Prediction - Loan: Rs.{max_loan_amount:,.0f}, Rate: {interest_rate:.2f}%")
-                    return round(float(max_loan_amount), 0), round(float(interest_rate), 2)
+                    max_loan_amount, interest_rate = self.finalize_prediction(user_input, loan_amounts[0], interest_rates[0])
+                    logger.debug("Final prediction - loan: Rs.%.0f, rate: %.2f%%", max_loan_amount, interest_rate)
+                    return max_loan_amount, interest_rate
                     
                 except Exception as e:
-                    print(f"Model prediction error: {e}")
-                    import traceback
-                    traceback.print_exc()
                     raise Exception(f"ML model prediction failed: {str(e)}")
             else:
                 raise Exception("Business loan ML model not available. Cannot process loan prediction.")
             
         except Exception as e:
-            print(f"Prediction error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Business loan prediction failed")
             raise Exception(f"Business loan prediction failed: {str(e)}")
 
     # ============ HELPER METHODS ============
@@ -1,13 +1,18 @@
-from typing import Dict, List, Any, Tuple
+import logging
+from typing import Dict, List, Any, Tuple, Optional
 import pandas as pd
 import numpy as np
-import pickle
-import re
 from .base_loan import BaseLoanService
+from .compiled_scorer import CompiledScorer, standard_scaler_params
+
+logger = logging.getLogger(__name__)
 
 class CarLoanService(BaseLoanService):
     """Car Loan Service with ML Model Integration"""
     
+    tenure_field = "Tenure"
+    extraction_profile = "car"
+    
     def get_required_fields(self) -> List[str]:
         return [
             # Customer Contact Information
@@ -65,14 +70,10 @@ Start by introducing yourself as a car loan specialist."""
     def get_fallback_greeting(self) -> str:
         return "Hello! I'm a car loan specialist here to help you with your car loan application. Car loans can help you purchase your dream vehicle with flexible repayment options. Let's start with your full name - what should I call you?"
     
-    def get_extraction_prompt(self, user_text: str, conversation: List[Dict[str, str]]) -> str:
-        return f"""
+    def get_extraction_instructions(self) -> str:
+        return """
 Based on the conversation history and the user's latest response, extract any car loan-related information.
 
-Conversation so far: {conversation[-3:] if len(conversation) > 3 else conversation}
-
-User's latest response: "{user_text}"
-
 Extract information for these fields (only if clearly mentioned):
 
 Customer Information:
@@ -95,8 +96,8 @@ Important conversion rules:
 - For Car_Type, map variations like "sedan car", "SUV vehicle" to exact options
 - Extract only information that is clearly stated
 
-Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {{}}.
-Example: {{"Customer_Name": "John Doe", "Age": 30, "applicant_annual_salary": 800000, "Car_Type": "Sedan", "CIBIL": 750}}
+Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {}.
+Example: {"Customer_Name": "John Doe", "Age": 30, "applicant_annual_salary": 800000, "Car_Type": "Sedan", "CIBIL": 750}
 """.strip()
     
     def validate_field(self, field_name: str, value: Any) -> Tuple[bool, str]:
@@ -170,339 +171,108 @@ Example: {{"Customer_Name": "John Doe", "Age": 30, "applicant_annual_salary": 80
             field_display = field_name.replace('_', ' ').lower()
             return False, f"Please provide a valid {field_display} in the correct format."
 
-    def extract_info_from_response(self, user_text: str, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
-        """Extract information from user response with car loan-specific fallback logic"""
-        # Try OpenAI first
-        if self.client:
-            extraction_prompt = self.get_extraction_prompt(user_text, conversation)
-            
-            try:
-                resp = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": extraction_prompt}],
-                    temperature=0,
-                    timeout=8  # 8 second timeout for extraction
-                )
-                extracted_text = resp.choices[0].message.content.strip()
-                import json
-                m = re.search(r"\{.*\}", extracted_text, re.DOTALL)
-                if m:
-                    return json.loads(m.group())
-            except Exception as e:
-                print(f"OpenAI extraction failed: {e}")
-        
-        # Fallback extraction logic
-        extracted = {}
-        text_lower = user_text.lower()
-        
-        # Extract name
-        name_patterns = [
-            r'my name is ([a-zA-Z\s]+)',
-            r'i am ([a-zA-Z\s]+)',
-            r'i\'m ([a-zA-Z\s]+)',
-            r'call me ([a-zA-Z\s]+)'
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                name = match.group(1).strip().title()
-                if len(name) > 1 and not any(char.isdigit() for char in name):
-                    extracted['Customer_Name'] = name
-                    break
-        
-        # Extract email
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        email_match = re.search(email_pattern, user_text)
-        if email_match:
-            extracted['Customer_Email'] = email_match.group()
-        
-        # Extract phone
-        phone_patterns = [
-            r'(\+91[\s-]?)?([6-9]\d{9})',
-            r'(\d{10})',
-            r'(\d{3}[\s-]\d{3}[\s-]\d{4})'
-        ]
-        
-        for pattern in phone_patterns:
-            match = re.search(pattern, user_text)
-            if match:
-                phone = re.sub(r'[^\d]', '', match.group())
-                if phone.startswith('91') and len(phone) == 12:
-                    phone = phone[2:]
-                if len(phone) == 10 and phone[0] in '6789':
-                    extracted['Customer_Phone'] = phone
-                    break
-        
-        # Extract age
-        age_patterns = [
-            r'i am (\d+) years? old',
-            r'my age is (\d+)',
-            r'age.*?(\d+)',
-            r'(\d+)\s+years?\s+old'
-        ]
-        
-        for pattern in age_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                age = int(match.group(1))
-                if 18 <= age <= 80:
-                    extracted['Age'] = age
-                    break
-        
-        # Check what the last assistant message was asking for
-        last_assistant_msg = ""
-        if len(conversation) > 0:
-            for msg in reversed(conversation):
-                if msg.get('role') == 'assistant':
-                    last_assistant_msg = msg.get('content', '').lower()
-                    break
-        
-        # Extract salary/income with lakh/crore conversion
-        def convert_amount(amount_str):
-            """Convert lakh/crore amounts to numbers"""
-            amount_str = amount_str.lower().strip()
-            
-            # Extract number and unit - handle commas in numbers
-            number_match = re.search(r'([\d,]+(?:\.[\d,]+)?)', amount_str)
-            if not number_match:
-                return None
-            
-            # Remove commas and convert to float
-            number_str = number_match.group(1).replace(',', '')
-            try:
-                number = float(number_str)
-            except ValueError:
-                return None
-            
-            if 'crore' in amount_str:
-                return int(number * 10000000)  # 1 crore = 1,00,00,000
-            elif 'lakh' in amount_str:
-                return int(number * 100000)    # 1 lakh = 1,00,000
-            else:
-                return int(number)
-        
-        # Extract salary patterns
-        salary_patterns = [
-            r'salary.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'earn.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'income.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?).*?salary'
-        ]
-        
-        for pattern in salary_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                amount = convert_amount(match.group(1))
-                if amount and amount >= 300000:  # Minimum reasonable salary
-                    if 'co' in last_assistant_msg or 'coapplicant' in last_assistant_msg:
-                        extracted['Coapplicant_Annual_Income'] = amount
-                    else:
-                        extracted['applicant_annual_salary'] = amount
-                    break
-        
-        # If asking about salary and user just gives amount
-        if any(word in last_assistant_msg for word in ['salary', 'income', 'earn']):
-            amount_match = re.search(r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)', text_lower)
-            if amount_match:
-                amount = convert_amount(amount_match.group(1))
-                if amount and amount >= 100000:
-                    if 'co' in last_assistant_msg or 'coapplicant' in last_assistant_msg:
-                        extracted['Coapplicant_Annual_Income'] = amount
-                    else:
-                        extracted['applicant_annual_salary'] = amount
-        
-        # Extract CIBIL score
-        cibil_patterns = [
-            r'cibil.*?(\d{3})',
-            r'credit.*?score.*?(\d{3})',
-            r'(\d{3}).*?cibil',
-            r'(\d{3}).*?credit.*?score'
-        ]
-        
-        for pattern in cibil_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                score = int(match.group(1))
-                if 300 <= score <= 900:
-                    extracted['CIBIL'] = score
-                    break
-        
-        # Employment type is not collected from user but will use default in model
-        
-        # Extract car type
+    def build_feature_record(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the car loan feature record"""
+        # Map categorical values to model format
         car_type_map = {
-            'sedan': 'Sedan',
-            'suv': 'SUV',
-            'hatchback': 'Hatchback',
-            'coupe': 'Coupe'
+            "Sedan": 0,
+            "SUV": 1,
+            "Hatchback": 2,
+            "Coupe": 3
         }
         
-        for key, value in car_type_map.items():
-            if key in text_lower:
-                extracted['Car_Type'] = value
-                break
-        
-        # Extract down payment percentage
-        down_payment_patterns = [
-            r'down.*?payment.*?(\d+)%',
-            r'(\d+)%.*?down.*?payment',
-            r'down.*?(\d+)\s*percent'
-        ]
-        
-        for pattern in down_payment_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                percent = int(match.group(1))
-                if 10 <= percent <= 50:
-                    extracted['down_payment_percent'] = percent
-                    break
+        # Calculate Total_Annual_Income
+        applicant_salary = float(user_input['applicant_annual_salary'])
+        coapplicant_income = float(user_input.get('Coapplicant_Annual_Income') or 0)
         
-        # Extract tenure
-        tenure_patterns = [
-            r'(\d+)\s+years?.*?tenure',
-            r'tenure.*?(\d+)\s+years?',
-            r'(\d+)\s+years?.*?loan',
-            r'repay.*?(\d+)\s+years?'
-        ]
-        
-        for pattern in tenure_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                tenure = int(match.group(1))
-                if 1 <= tenure <= 7:
-                    extracted['Tenure'] = tenure
-                    break
-        
-        # Extract loan amount
-        loan_amount_patterns = [
-            r'need.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'want.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'loan.*?amount.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?).*?loan'
-        ]
+        # Use default employment type (Salaried = 0) since we don't ask user
+        default_employment_type = 0  # Salaried is most common
         
-        for pattern in loan_amount_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                amount = convert_amount(match.group(1))
-                if amount and amount >= 100000:  # Minimum 1 lakh
-                    extracted['loan_amount'] = amount
-                    break
-        
-        # If asking about loan amount and user just gives amount
-        if any(word in last_assistant_msg for word in ['loan amount', 'how much', 'amount need']):
-            amount_match = re.search(r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)', text_lower)
-            if amount_match:
-                amount = convert_amount(amount_match.group(1))
-                if amount and amount >= 100000:
-                    extracted['loan_amount'] = amount
-        
-        return extracted
+        return {
+            'applicant_annual_salary': applicant_salary,
+            'Coapplicant_Annual_Income': coapplicant_income,
+            'Total_Annual_Income': applicant_salary + coapplicant_income,
+            'CIBIL': float(user_input['CIBIL']),
+            'Employment_Type': default_employment_type,  # Default to Salaried
+            'Car_Type': car_type_map[user_input['Car_Type']],
+            'down_payment_percent': float(user_input['down_payment_percent']),
+            'Tenure': float(user_input['Tenure']),
+            'Age': float(user_input['Age'])
+        }
 
     def prepare_model_input(self, user_input: Dict[str, Any]) -> pd.DataFrame:
         """Prepare input data for the car loan model"""
         try:
-            # Map categorical values to model format
-            car_type_map = {
-                "Sedan": 0,
-                "SUV": 1,
-                "Hatchback": 2,
-                "Coupe": 3
-            }
-            
-            # Calculate Total_Annual_Income
-            applicant_salary = float(user_input['applicant_annual_salary'])
-            coapplicant_income = float(user_input.get('Coapplicant_Annual_Income', 0))
-            total_annual_income = applicant_salary + coapplicant_income
-            
-            # Use default employment type (Salaried = 0) since we don't ask user
-            default_employment_type = 0  # Salaried is most common
-            
-            # Create input dataframe matching your model's expected features
-            input_data = {
-                'applicant_annual_salary': applicant_salary,
-                'Coapplicant_Annual_Income': coapplicant_income,
-                'Total_Annual_Income': total_annual_income,
-                'CIBIL': float(user_input['CIBIL']),
-                'Employment_Type': default_employment_type,  # Default to Salaried
-                'Car_Type': car_type_map[user_input['Car_Type']],
-                'down_payment_percent': float(user_input['down_payment_percent']),
-                'Tenure': float(user_input['Tenure']),
-                'Age': float(user_input['Age'])
-            }
-            
-            print(f"Car Loan Input data prepared: {input_data}")
+            input_data = self.build_feature_record(user_input)
+            logger.debug("Car loan input prepared: %s", input_data)
             
             input_df = pd.DataFrame([input_data])
             
-            print(f"Prepared input dataframe shape: {input_df.shape}")
-            print(f"Input columns: {list(input_df.columns)}")
+            logger.debug("Prepared input shape=%s columns=%s", input_df.shape, input_df.columns)
             
             return input_df
             
         except Exception as e:
-            print(f"Error in prepare_model_input: {e}")
+            logger.error("Error in prepare_model_input: %s", e)
             raise e
     
+    def score_features(self, input_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Scale features in model order and run the amount and rate models"""
+        bundle = self.models.get("car_loan_model")
+        if not bundle:
+            raise Exception("Car loan ML model not available. Cannot process loan prediction.")
+        
+        df_scaled = bundle["scaler"].transform(input_df[bundle["features"]])
+        return bundle["model_max_amt"].predict(df_scaled), bundle["model_rate"].predict(df_scaled)
+    
+    def compile_scorer(self) -> Optional[CompiledScorer]:
+        """Compile the car loan bundle to a fixed layout with scaler vectors"""
+        bundle = self.models.get("car_loan_model")
+        if not bundle:
+            return None
+        
+        features = list(bundle["features"])
+        mean, scale = standard_scaler_params(bundle["scaler"])
+        return CompiledScorer(
+            features, [(f, None, None) for f in features],
+            predictors={"model_max_amt": bundle["model_max_amt"], "model_rate": bundle["model_rate"]},
+            outputs={"loan_amount": ("model_max_amt", None, None), "interest_rate": ("model_rate", None, None)},
+            mean=mean, scale=scale,
+        )
+    
+    def finalize_prediction(self, user_input: Dict[str, Any], loan_amount: float, interest_rate: float) -> tuple:
+        """Clamp raw car loan output to lending bounds"""
+        max_loan_amount = max(float(loan_amount), 100000)    # Min 1 lakh
+        max_loan_amount = min(max_loan_amount, 50000000)     # Max 5 crores
+        interest_rate = max(7.0, min(20.0, float(interest_rate)))  # Between 7% and 20%
+        return round(float(max_loan_amount), 0), round(float(interest_rate), 2)
+    
     def predict_loan(self, user_input: Dict[str, Any]) -> tuple:
         """Predict car loan amount and interest rate using ML model"""
+        if self.scorer is not None:
+            return self.predict_compiled(user_input)
+        
         try:
-            print(f"Car Loan Prediction - Input: {user_input}")
+            logger.debug("Car loan prediction input: %s", user_input)
             
             # Prepare input data
             input_df = self.prepare_model_input(user_input)
-            print(f"Prepared input shape: {input_df.shape}")
-            print(f"Input columns: {list(input_df.columns)}")
             
             # Try to use actual ML model if available
             if self.models.get("car_loan_model"):
                 try:
-                    print("Using ML model for prediction...")
-                    
-                    # Load the model bundle
-                    bundle = self.models["car_loan_model"]
-                    model_max_amt = bundle["model_max_amt"]
-                    model_rate = bundle["model_rate"]
-                    scaler = bundle["scaler"]
-                    label_encoders = bundle["label_encoders"]
-                    features = bundle["features"]
-                    
-                    print("Model components loaded successfully")
-                    print(f"Expected features: {features}")
-                    
-                    # Prepare data for prediction - ensure correct column order
-                    df_input = input_df[features]
-                    print(f"After feature selection: {list(df_input.columns)}")
-                    
-                    # Scale the features
-                    df_scaled = scaler.transform(df_input)
-                    print(f"Data scaled successfully")
-                    
-                    # Make predictions
-                    max_loan_amount = model_max_amt.predict(df_scaled)[0]
-                    interest_rate = model_rate.predict(df_scaled)[0]
-                    
-                    print(f"Raw predictions - Max Loan: {max_loan_amount}, Interest Rate: {interest_rate}")
-                    
-                    # Ensure reasonable bounds for car loans
-                    max_loan_amount = max(max_loan_amount, 100000)    # Min 1 lakh
-                    max_loan_amount = min(max_loan_amount, 50000000)  # Max 5 crores
-                    interest_rate = max(7.0, min(20.0, interest_rate)) # Between 7% and 20%
+                    loan_amounts, interest_rates = self.score_features(input_df)
+                    logger.debug("Model output - loan: %.0f, rate: %.2f", loan_amounts[0], interest_rates[0])
                     
-                    print(f"Final ML Prediction - Loan: Rs.{max_loan_amount:,.0f}, Rate: {interest_rate:.2f}%")
-                    return round(float(max_loan_amount), 0), round(float(interest_rate), 2)
+                    max_loan_amount, interest_rate = self.finalize_prediction(user_input, loan_amounts[0], interest_rates[0])
+                    logger.debug("Final prediction - loan: Rs.%.0f, rate: %.2f%%", max_loan_amount, interest_rate)
+                    return max_loan_amount, interest_rate
                     
                 except Exception as e:
-                    print(f"Model prediction error: {e}")
-                    import traceback
-                    traceback.print_exc()
                     raise Exception(f"ML model prediction failed: {str(e)}")
             else:
                 raise Exception("Car loan ML model not available. Cannot process loan prediction.")
             
         except Exception as e:
-            print(f"Prediction error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Car loan prediction failed")
             raise Exception(f"Car loan prediction failed: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,269 @@
+from typing import Dict, List, Any, Optional, Tuple, Sequence
+import os
+import json
+import threading
+import numpy as np
+
+# (source field in the feature record, category lookup or None for numeric, default for unknown categories)
+FeatureColumn = Tuple[str, Optional[Dict[Any, float]], Optional[float]]
+
+# output name -> (predictor key, output column or None for single-output models, transform name or None)
+OutputSpec = Dict[str, Tuple[str, Optional[int], Optional[str]]]
+
+OUTPUT_TRANSFORMS = {
+    "expm1": np.expm1,
+}
+
+
+def label_codes(encoder) -> Dict[Any, float]:
+    """Turn a fitted LabelEncoder into a category -> code lookup table"""
+    return {category: float(code) for code, category in enumerate(encoder.classes_)}
+
+
+def one_hot(level: Any) -> Dict[Any, float]:
+    """Lookup table for a single one-hot column (1.0 for level, default 0.0 otherwise)"""
+    return {level: 1.0}
+
+
+def standard_scaler_params(scaler) -> Tuple[np.ndarray, np.ndarray]:
+    """Extract mean/scale vectors from a fitted StandardScaler"""
+    if not (hasattr(scaler, "mean_") and hasattr(scaler, "scale_")):
+        raise ValueError(f"Unsupported scaler type: {type(scaler).__name__}")
+    n_features = int(scaler.n_features_in_)
+    mean, scale = scaler.mean_, scaler.scale_
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    return mean, scale
+
+
+# Version of the on-disk layout written by CompiledScorer.save
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def booster_spec(model) -> Optional[Tuple[Any, Tuple[int, int]]]:
+    """(Booster, iteration_range) for an XGBoost sklearn model or raw Booster, None otherwise"""
+    if hasattr(model, "get_booster"):
+        try:
+            iteration_range = (0, int(model.best_iteration) + 1)
+        except (AttributeError, TypeError):
+            iteration_range = (0, 0)
+        return model.get_booster(), iteration_range
+    if hasattr(model, "inplace_predict"):
+        return model, (0, 0)
+    return None
+
+
+def make_predictor(model, iteration_range: Optional[Sequence[int]] = None):
+    """Return a fast callable X -> predictions for a fitted model.
+
+    XGBoost models go straight to Booster.inplace_predict, skipping DMatrix
+    construction and feature-name validation; anything else uses predict().
+    """
+    spec = booster_spec(model)
+    if spec is not None:
+        booster, default_range = spec
+        iteration_range = tuple(iteration_range) if iteration_range is not None else default_range
+
+        def predict(X: np.ndarray) -> np.ndarray:
+            return booster.inplace_predict(X, iteration_range=iteration_range, validate_features=False)
+        return predict
+
+    return model.predict
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    """Parse the manifest written by CompiledScorer.save"""
+    with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def library_versions() -> Dict[str, Optional[str]]:
+    """Versions of the libraries that produced (or must read) the artifacts"""
+    from importlib.metadata import version, PackageNotFoundError
+    versions = {}
+    for package in ("numpy", "xgboost", "scikit-learn"):
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def _plain(value: Any) -> Any:
+    """NumPy scalars -> Python scalars so category values survive JSON"""
+    return value.item() if hasattr(value, "item") else value
+
+
+class CompiledScorer:
+    """DataFrame-free scorer over a fixed feature layout.
+
+    Built once at model load time from the fitted encoders/scaler/models, then
+    scores a feature record by filling a preallocated (per-thread) NumPy row.
+    """
+
+    def __init__(self, feature_names: Sequence[str], columns: Sequence[FeatureColumn],
+                 predictors: Dict[str, Any], outputs: OutputSpec,
+                 mean: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None,
+                 iteration_ranges: Optional[Dict[str, Sequence[int]]] = None):
+        if len(feature_names) != len(columns):
+            raise ValueError("feature_names and columns must have the same length")
+
+        iteration_ranges = iteration_ranges or {}
+        self.feature_names: List[str] = list(feature_names)
+        self.columns: List[FeatureColumn] = list(columns)
+        self.models = predictors
+        self.predictors = {key: make_predictor(model, iteration_ranges.get(key)) for key, model in predictors.items()}
+        self.iteration_ranges = iteration_ranges
+        self.outputs = outputs
+
+        n_features = len(self.columns)
+        self.mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+        self._needs_scaling = bool(np.any(self.mean != 0) or np.any(self.scale != 1))
+        self._local = threading.local()
+
+    @property
+    def n_features(self) -> int:
+        return len(self.columns)
+
+    def _row_buffer(self) -> np.ndarray:
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = self._local.row = np.empty((1, self.n_features), dtype=np.float64)
+        return row
+
+    def _encode_into(self, record: Dict[str, Any], out: np.ndarray):
+        for j, (source, lookup, default) in enumerate(self.columns):
+            value = record[source]
+            if lookup is None:
+                out[j] = value
+            else:
+                code = lookup.get(value, default)
+                if code is None:
+                    raise ValueError(f"Unknown {source} category: {value!r}")
+                out[j] = code
+
+    def encode(self, record: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Encode one feature record into an (unscaled) feature vector"""
+        if out is None:
+            out = np.empty(self.n_features, dtype=np.float64)
+        self._encode_into(record, out)
+        return out
+
+    def encode_many(self, records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Encode feature records into an (unscaled) feature matrix"""
+        X = np.empty((len(records), self.n_features), dtype=np.float64)
+        for i, record in enumerate(records):
+            self._encode_into(record, X[i])
+        return X
+
+    def score_matrix(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Scale an encoded matrix in place and run every model once"""
+        if self._needs_scaling:
+            np.subtract(X, self.mean, out=X)
+            np.divide(X, self.scale, out=X)
+
+        raw = {key: np.asarray(predict(X)) for key, predict in self.predictors.items()}
+        return self._output("loan_amount", raw), self._output("interest_rate", raw)
+
+    def _output(self, name: str, raw: Dict[str, np.ndarray]) -> np.ndarray:
+        key, column, transform = self.outputs[name]
+        values = raw[key]
+        if column is not None:
+            values = values.reshape(values.shape[0], -1)[:, column]
+        else:
+            values = values.reshape(-1)
+        if transform:
+            values = OUTPUT_TRANSFORMS[transform](values)
+        return values
+
+    def score(self, record: Dict[str, Any]) -> Tuple[float, float]:
+        """Score a single feature record, returning raw (loan_amount, interest_rate)"""
+        row = self._row_buffer()
+        self._encode_into(record, row[0])
+        loan_amounts, interest_rates = self.score_matrix(row)
+        return float(loan_amounts[0]), float(interest_rates[0])
+
+    def score_encoded(self, vector: np.ndarray) -> Tuple[float, float]:
+        """Score one vector from encode(), returning raw (loan_amount, interest_rate)"""
+        row = self._row_buffer()
+        row[0] = vector
+        loan_amounts, interest_rates = self.score_matrix(row)
+        return float(loan_amounts[0]), float(interest_rates[0])
+
+    def score_many(self, records: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Score many feature records with one call per model"""
+        return self.score_matrix(self.encode_many(records))
+
+    def save(self, directory: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Write native artifacts: one XGBoost UBJ file per booster, .npy scaler
+        vectors and a JSON manifest with the feature layout. Returns the manifest."""
+        os.makedirs(directory, exist_ok=True)
+
+        predictors = {}
+        for key, model in self.models.items():
+            spec = booster_spec(model)
+            if spec is None:
+                raise ValueError(f"Predictor {key!r} ({type(model).__name__}) has no native XGBoost format")
+            booster, iteration_range = spec
+            filename = f"{key}.ubj"
+            booster.save_model(os.path.join(directory, filename))
+            predictors[key] = {
+                "file": filename,
+                "iteration_range": list(self.iteration_ranges.get(key, iteration_range)),
+            }
+
+        np.save(os.path.join(directory, "mean.npy"), self.mean)
+        np.save(os.path.join(directory, "scale.npy"), self.scale)
+
+        manifest = {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            **(metadata or {}),
+            "feature_names": self.feature_names,
+            # Lookups are stored as [category, code] pairs so non-string categories keep their type
+            "columns": [
+                {"source": source,
+                 "lookup": None if lookup is None else [[_plain(k), float(v)] for k, v in lookup.items()],
+                 "default": default}
+                for source, lookup, default in self.columns
+            ],
+            "outputs": {name: list(spec) for name, spec in self.outputs.items()},
+            "predictors": predictors,
+            "mean": "mean.npy",
+            "scale": "scale.npy",
+        }
+        with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True,
+             manifest: Optional[Dict[str, Any]] = None) -> "CompiledScorer":
+        """Load a scorer written by save(); scaler vectors are memory-mapped read-only"""
+        import xgboost as xgb
+
+        if manifest is None:
+            manifest = read_manifest(directory)
+        if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact format version: {manifest.get('format_version')}")
+
+        predictors, iteration_ranges = {}, {}
+        for key, spec in manifest["predictors"].items():
+            booster = xgb.Booster()
+            booster.load_model(os.path.join(directory, spec["file"]))
+            predictors[key] = booster
+            iteration_ranges[key] = tuple(spec["iteration_range"])
+
+        mmap_mode = "r" if mmap else None
+        columns = [
+            (col["source"], None if col["lookup"] is None else {k: v for k, v in col["lookup"]}, col["default"])
+            for col in manifest["columns"]
+        ]
+        return cls(
+            manifest["feature_names"], columns, predictors,
+            outputs={name: tuple(spec) for name, spec in manifest["outputs"].items()},
+            mean=np.load(os.path.join(directory, manifest["mean"]), mmap_mode=mmap_mode),
+            scale=np.load(os.path.join(directory, manifest["scale"]), mmap_mode=mmap_mode),
+            iteration_ranges=iteration_ranges,
+        )
@@ -2,13 +2,18 @@
 
 
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple, Optional
+import numpy as np
 import pandas as pd
 from .base_loan import BaseLoanService
+from .compiled_scorer import CompiledScorer, label_codes, standard_scaler_params
 
 class EducationLoanService(BaseLoanService):
     """Education Loan Service"""
     
+    tenure_field = "Loan_Term"
+    extraction_profile = "education"
+    
     def get_required_fields(self) -> List[str]:
         return [
             "Customer_Name",
@@ -140,293 +145,10 @@ Start by introducing yourself and asking for their name first."""
         else:
             return "Poor"
 
-    def extract_info_from_response(self, user_text: str, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
-        """Enhanced extraction for education loans with better pattern matching"""
-        # Try OpenAI first
-        if self.client:
-            try:
-                extraction_prompt = self.get_extraction_prompt(user_text, conversation)
-                resp = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": extraction_prompt}],
-                    temperature=0,
-                    timeout=8
-                )
-                extracted_text = resp.choices[0].message.content.strip()
-                import json
-                import re
-                m = re.search(r"\{.*\}", extracted_text, re.DOTALL)
-                if m:
-                    return json.loads(m.group())
-            except Exception as e:
-                print(f"OpenAI extraction failed: {e}")
-        
-        # Enhanced fallback extraction
-        extracted = {}
-        text_lower = user_text.lower().strip()
-        
-        # Extract name - more flexible patterns
-        name_patterns = [
-            r'my name is ([a-zA-Z\s]+)',
-            r'i am ([a-zA-Z\s]+)',
-            r'i\'m ([a-zA-Z\s]+)',
-            r'call me ([a-zA-Z\s]+)',
-            r'name\s*:?\s*([a-zA-Z\s]+)',
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                name = match.group(1).strip().title()
-                if len(name) > 1 and not any(char.isdigit() for char in name):
-                    extracted['Customer_Name'] = name
-                    break
-        
-        # If no pattern matched but looks like just a name
-        if not extracted.get('Customer_Name'):
-            last_assistant_msg = ""
-            if len(conversation) > 0:
-                for msg in reversed(conversation):
-                    if msg.get('role') == 'assistant':
-                        last_assistant_msg = msg.get('content', '').lower()
-                        break
-            
-            if 'name' in last_assistant_msg and len(text_lower.split()) <= 3:
-                if re.match(r'^[a-zA-Z\s]+$', user_text.strip()) and 2 <= len(user_text.strip()) <= 50:
-                    extracted['Customer_Name'] = user_text.strip().title()
-        
-        # Extract email - improved pattern
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        email_match = re.search(email_pattern, user_text)
-        if email_match:
-            extracted['Customer_Email'] = email_match.group(0)
-        
-        # Extract phone - handle various formats
-        phone_patterns = [
-            r'(\+91[\s-]?)?([6-9]\d{9})',
-            r'(\d{10})',
-            r'(\d{3}[\s-]\d{3}[\s-]\d{4})'
-        ]
-        
-        for pattern in phone_patterns:
-            match = re.search(pattern, user_text)
-            if match:
-                phone = re.sub(r'[^\d]', '', match.group())
-                if phone.startswith('91') and len(phone) == 12:
-                    phone = phone[2:]
-                if len(phone) == 10 and phone[0] in '6789':
-                    extracted['Customer_Phone'] = phone
-                    break
-        
-        # Extract age - multiple patterns
-        age_patterns = [
-            r'i am (\d+) years? old',
-            r'my age is (\d+)',
-            r'age\s*:?\s*(\d+)',
-            r'(\d+)\s+years?\s+old',
-            r'^(\d+)$'  # Just a number when asked for age
-        ]
-        
-        for pattern in age_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                age = int(match.group(1))
-                if 18 <= age <= 35:
-                    extracted['Age'] = age
-                    break
-        
-        # Extract academic score
-        score_patterns = [
-            r'academic score.*?(\d+)',
-            r'score.*?(\d+)',
-            r'(\d+)%',
-            r'(\d+)\s*percent',
-            r'^(\d+)$'  # Just a number when asked for score
-        ]
-        
-        last_assistant_msg = ""
-        if len(conversation) > 0:
-            for msg in reversed(conversation):
-                if msg.get('role') == 'assistant':
-                    last_assistant_msg = msg.get('content', '').lower()
-                    break
-        
-        for pattern in score_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                score = int(match.group(1))
-                if 0 <= score <= 100:
-                    extracted['Academic_Score'] = score
-                    break
-        
-        # If asking about score and user just gives number
-        if 'score' in last_assistant_msg and re.match(r'^\d+$', user_text.strip()):
-            score = int(user_text.strip())
-            if 0 <= score <= 100:
-                extracted['Academic_Score'] = score
-        
-        # Extract intended course
-        course_map = {
-            'stem': 'STEM',
-            'mba': 'MBA', 
-            'medicine': 'Medicine',
-            'medical': 'Medicine',
-            'finance': 'Finance',
-            'law': 'Law',
-            'arts': 'Arts',
-            'other': 'Other'
-        }
-        
-        for key, value in course_map.items():
-            if key in text_lower:
-                extracted['Intended_Course'] = value
-                break
-        
-        # Extract university tier
-        tier_patterns = [
-            r'tier\s*(\d)',
-            r'tier(\d)',
-            r'(\d)\s*tier'
-        ]
-        
-        for pattern in tier_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                tier_num = match.group(1)
-                if tier_num in ['1', '2', '3']:
-                    extracted['University_Tier'] = f'Tier{tier_num}'
-                    break
-        
-        # Extract amounts with lakh/crore conversion
-        def convert_amount(amount_str):
-            amount_str = amount_str.lower().strip()
-            number_match = re.search(r'([\d,]+(?:\.[\d,]+)?)', amount_str)
-            if not number_match:
-                return None
-            
-            number_str = number_match.group(1).replace(',', '')
-            try:
-                number = float(number_str)
-            except ValueError:
-                return None
-            
-            if 'crore' in amount_str:
-                return int(number * 10000000)
-            elif 'lakh' in amount_str:
-                return int(number * 100000)
-            else:
-                return int(number)
-        
-        # Extract coapplicant income
-        income_patterns = [
-            r'coapplicant.*?income.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'co.*?applicant.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?).*?coapplicant'
-        ]
-        
-        for pattern in income_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                amount = convert_amount(match.group(1))
-                if amount and amount > 0:
-                    extracted['Coapplicant_Income'] = amount
-                    break
-        
-        # Extract guarantor networth
-        networth_patterns = [
-            r'guarantor.*?networth.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'guarantor.*?assets.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'networth.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'assets.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)'
-        ]
-        
-        for pattern in networth_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                amount = convert_amount(match.group(1))
-                if amount and amount > 0:
-                    extracted['Guarantor_Networth'] = amount
-                    break
-        
-        # Extract CIBIL score
-        cibil_patterns = [
-            r'cibil.*?(\d{3})',
-            r'credit.*?score.*?(\d{3})',
-            r'(\d{3}).*?cibil',
-            r'(\d{3}).*?credit.*?score'
-        ]
-        
-        for pattern in cibil_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                score = int(match.group(1))
-                if 300 <= score <= 900:
-                    extracted['CIBIL_Score'] = score
-                    break
-        
-        # Extract loan type
-        if 'secured' in text_lower:
-            extracted['Loan_Type'] = 'Secured'
-        elif 'unsecured' in text_lower:
-            extracted['Loan_Type'] = 'Unsecured'
-        
-        # Extract loan term
-        term_patterns = [
-            r'(\d+)\s+years?.*?term',
-            r'term.*?(\d+)\s+years?',
-            r'(\d+)\s+years?.*?loan',
-            r'loan.*?(\d+)\s+years?'
-        ]
-        
-        for pattern in term_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                term = int(match.group(1))
-                if 1 <= term <= 15:
-                    extracted['Loan_Term'] = term
-                    break
-        
-        # If asking about term and user just gives number
-        if 'term' in last_assistant_msg or 'years' in last_assistant_msg:
-            if re.match(r'^\d+$', user_text.strip()):
-                term = int(user_text.strip())
-                if 1 <= term <= 15:
-                    extracted['Loan_Term'] = term
-        
-        # Extract expected loan amount
-        loan_amount_patterns = [
-            r'need.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'want.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'loan.*?amount.*?([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)',
-            r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?).*?loan'
-        ]
-        
-        for pattern in loan_amount_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                amount = convert_amount(match.group(1))
-                if amount and amount > 0:
-                    extracted['Expected_Loan_Amount'] = amount
-                    break
-        
-        # If asking about loan amount and user just gives amount
-        if 'loan amount' in last_assistant_msg or 'how much' in last_assistant_msg:
-            amount_match = re.search(r'([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)', text_lower)
-            if amount_match:
-                amount = convert_amount(amount_match.group(1))
-                if amount and amount > 0:
-                    extracted['Expected_Loan_Amount'] = amount
-        
-        return extracted
-
-    def get_extraction_prompt(self, user_text: str, conversation: List[Dict[str, str]]) -> str:
-        return f"""
+    def get_extraction_instructions(self) -> str:
+        return """
 Based on the conversation history and the user's latest response, extract any education loan-related information.
 
-Conversation so far: {conversation[-3:] if len(conversation) > 3 else conversation}
-
-User's latest response: "{user_text}"
-
 Extract information for these fields (only if mentioned):
 - Customer_Name: full name as text
 - Customer_Email: email address as text
@@ -442,8 +164,8 @@ Extract information for these fields (only if mentioned):
 - Loan_Term: number (must be 1-15 years)
 - Expected_Loan_Amount: number in INR (must be positive, max 30000000)
 
-Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {{}}.
-Example: {{"Customer_Name": "John Doe", "Customer_Email": "john@example.com", "Age": 25, "Academic_Score": 85}}
+Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {}.
+Example: {"Customer_Name": "John Doe", "Customer_Email": "john@example.com", "Age": 25, "Academic_Score": 85}
 """.strip()
     
     def repayment_capacity(self, income: float, networth: float, cibil: float) -> float:
@@ -461,51 +183,104 @@ Example: {{"Customer_Name": "John Doe", "Customer_Email": "john@example.com", "A
         else:
             return "Poor"
     
-    def predict_loan(self, user_input: Dict[str, Any]) -> tuple:
-        """Predict education loan amount and interest rate"""
+    def build_feature_record(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the education loan feature record with derived performance and capacity"""
+        academic_performance = user_input.get("Academic_Performance")
+        if academic_performance is None:
+            # Convert Academic_Score to Academic_Performance if needed
+            academic_performance = self.convert_academic_score_to_performance(float(user_input["Academic_Score"]))
+        
+        coapplicant_income = float(user_input["Coapplicant_Income"])
+        guarantor_networth = float(user_input["Guarantor_Networth"])
+        cibil_score = float(user_input["CIBIL_Score"])
+        
+        return {
+            "Age": float(user_input["Age"]),
+            "Academic_Performance": academic_performance,
+            "Intended_Course": user_input["Intended_Course"],
+            "University_Tier": user_input["University_Tier"],
+            "Coapplicant_Income": coapplicant_income,
+            "Guarantor_Networth": guarantor_networth,
+            "CIBIL_Score": cibil_score,
+            "Loan_Type": user_input["Loan_Type"],
+            "Repayment_Capacity": self.repayment_capacity(coapplicant_income, guarantor_networth, cibil_score),
+            "Loan_Term": float(user_input["Loan_Term"]),
+        }
+    
+    def score_features(self, input_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode categoricals, scale numeric features and run both XGBoost models"""
         if not all([self.models.get("xgb_loan"), self.models.get("xgb_interest"), 
                    self.models.get("encoders"), self.models.get("scaler")]):
             raise ValueError("Required models not loaded")
         
-        # Create a copy to avoid modifying original
-        processed_input = user_input.copy()
-        
-        # Convert Academic_Score to Academic_Performance if needed
-        if "Academic_Score" in processed_input and "Academic_Performance" not in processed_input:
-            processed_input["Academic_Performance"] = self.convert_academic_score_to_performance(
-                float(processed_input["Academic_Score"])
-            )
-        
-        # Add computed feature
-        processed_input["Repayment_Capacity"] = self.repayment_capacity(
-            processed_input["Coapplicant_Income"],
-            processed_input["Guarantor_Networth"],
-            processed_input["CIBIL_Score"]
-        )
+        # Prepare features for prediction
+        features = [
+            "Age", "Academic_Performance", "Intended_Course", "University_Tier",
+            "Coapplicant_Income", "Guarantor_Networth", "CIBIL_Score",
+            "Loan_Type", "Repayment_Capacity", "Loan_Term"
+        ]
+        X = input_df[features].copy()
         
         # Encode categorical variables
         encoders = self.models["encoders"]
         for col in ["Academic_Performance", "Intended_Course", "University_Tier", "Loan_Type"]:
             if col not in encoders:
                 raise ValueError(f"Encoder for {col} not found.")
-            processed_input[col] = encoders[col].transform([processed_input[col]])[0]
+            X[col] = encoders[col].transform(X[col])
+        
+        # Scale numeric features
+        numeric_cols = ["Age", "Coapplicant_Income", "Guarantor_Networth", 
+                       "CIBIL_Score", "Repayment_Capacity", "Loan_Term"]
+        X[numeric_cols] = self.models["scaler"].transform(X[numeric_cols])
+        
+        return self.models["xgb_loan"].predict(X), self.models["xgb_interest"].predict(X)
+    
+    def compile_scorer(self) -> Optional[CompiledScorer]:
+        """Compile the education models to a fixed layout with label-encoder codes and scaler vectors"""
+        if not all([self.models.get("xgb_loan"), self.models.get("xgb_interest"), 
+                   self.models.get("encoders"), self.models.get("scaler")]):
+            return None
         
-        # Prepare features for prediction
         features = [
             "Age", "Academic_Performance", "Intended_Course", "University_Tier",
             "Coapplicant_Income", "Guarantor_Networth", "CIBIL_Score",
             "Loan_Type", "Repayment_Capacity", "Loan_Term"
         ]
-        
-        X = pd.DataFrame([{k: processed_input[k] for k in features}])
-        
-        # Scale numeric features
         numeric_cols = ["Age", "Coapplicant_Income", "Guarantor_Networth", 
                        "CIBIL_Score", "Repayment_Capacity", "Loan_Term"]
-        X[numeric_cols] = self.models["scaler"].transform(X[numeric_cols])
+        encoders = self.models["encoders"]
+        scaler = self.models["scaler"]
+        
+        columns = [(f, label_codes(encoders[f]), None) if f in encoders else (f, None, None) for f in features]
+        
+        # The scaler only covers the numeric subset; categorical codes pass through unscaled
+        scaler_mean, scaler_scale = standard_scaler_params(scaler)
+        scaler_cols = list(getattr(scaler, "feature_names_in_", numeric_cols))
+        mean, scale = np.zeros(len(features)), np.ones(len(features))
+        for col, col_mean, col_scale in zip(scaler_cols, scaler_mean, scaler_scale):
+            mean[features.index(col)] = col_mean
+            scale[features.index(col)] = col_scale
+        
+        return CompiledScorer(
+            features, columns,
+            predictors={"xgb_loan": self.models["xgb_loan"], "xgb_interest": self.models["xgb_interest"]},
+            outputs={"loan_amount": ("xgb_loan", None, None), "interest_rate": ("xgb_interest", None, None)},
+            mean=mean, scale=scale,
+        )
+    
+    def finalize_prediction(self, user_input: Dict[str, Any], loan_amount: float, interest_rate: float) -> tuple:
+        """Round raw education loan model output"""
+        return round(float(loan_amount)), round(float(interest_rate), 2)
+    
+    def predict_loan(self, user_input: Dict[str, Any]) -> tuple:
+        """Predict education loan amount and interest rate"""
+        if self.scorer is not None:
+            return self.predict_compiled(user_input)
         
-        # Make predictions
-        loan_amt = self.models["xgb_loan"].predict(X)[0]
-        interest = self.models["xgb_interest"].predict(X)[0]
+        if not all([self.models.get("xgb_loan"), self.models.get("xgb_interest"), 
+                   self.models.get("encoders"), self.models.get("scaler")]):
+            raise ValueError("Required models not loaded")
         
-        return round(float(loan_amt)), round(float(interest), 2)
\ No newline at end of file
+        X = pd.DataFrame([self.build_feature_record(user_input)])
+        loan_amounts, interest_rates = self.score_features(X)
+        return self.finalize_prediction(user_input, loan_amounts[0], interest_rates[0])
\ No newline at end of file
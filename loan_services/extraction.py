@@ -0,0 +1,465 @@
+"""
+Table-driven regex extraction used when the OpenAI extractor is unavailable.
+
+Each loan type's fields are described once as rules (PatternRule, ChoiceRule,
+YesNoRule) in the PROFILES table. engine_for() compiles a loan type's rules the
+first time it is asked for and caches the engine. Extracting a message builds
+one Turn per message: the stripped/lower-cased text, whether it has digits and
+the last assistant question, all computed once. Every rule then reads from that
+Turn, and rules whose keywords don't occur in the message skip their patterns
+entirely.
+
+Every value found carries a confidence (BARE_ANSWER ... LOOSE_MATCH) that depends
+on whether the assistant had just asked for that field. route() combines them
+into one score for the turn, so callers can skip the OpenAI extractor when the
+rules have clearly captured a short answer to the question that was asked.
+A confident turn only records the fields that were asked for, plus keyword
+matches for other fields that don't overlap any other match.
+"""
+
+import re
+from typing import Dict, Any, List, Optional, Callable, Iterable, Tuple, Union
+
+# A number with optional Indian units, e.g. "12,50,000", "15 lakh", "1.2 crore"
+AMOUNT = r"([\d,]+(?:\.[\d,]+)?\s*(?:lakh|crore|lakhs|crores)?)"
+_NUMBER = re.compile(r"([\d,]+(?:\.[\d,]+)?)")
+_THOUSANDS = re.compile(r"\d\s*k\b")
+BARE_INT = r"^(\d+)$"
+# The whole reply is one amount, e.g. "8 lakh", "rs 25k", "12,50,000 rupees"
+BARE_AMOUNT = r"^(?:rs\.?|inr|₹)?\s*([\d,]+(?:\.[\d,]+)?\s*(?:lakhs?|crores?|thousand|k)?)\s*(?:rupees|rs|inr)?$"
+BARE_PERCENT = r"^(\d+)\s*(?:%|percent)?$"
+
+# Confidence of one extracted value
+BARE_ANSWER = 1.0    # the reply is just the value of the field that was asked for ("750")
+ASKED_MATCH = 0.9    # keyword pattern or choice for the field that was asked for
+KEYWORD_MATCH = 0.8  # keyword pattern for some other field ("... and my cibil is 712")
+LOOSE_MATCH = 0.6    # a choice word seen while the question was about something else
+# Turn-level adjustments in route()
+AMBIGUOUS_ANSWER = 0.3   # one bare answer fitted more than one asked field
+SHORT_ANSWER_WORDS = 8   # longer replies count as free-form
+LONG_ANSWER_FACTOR = 0.6
+
+
+def parse_amount(text: str) -> Optional[int]:
+    """Convert "15 lakh" / "1.2 crore" / "12,50,000" / "25k" to rupees"""
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    try:
+        number = float(match.group(1).replace(",", ""))
+    except ValueError:
+        return None
+    if "crore" in text:
+        return int(number * 10000000)  # 1 crore = 1,00,00,000
+    if "lakh" in text:
+        return int(number * 100000)    # 1 lakh = 1,00,000
+    if "thousand" in text or _THOUSANDS.search(text):
+        return int(number * 1000)
+    return int(number)
+
+
+def normalize_phone(text: str) -> str:
+    phone = re.sub(r"[^\d]", "", text)
+    if phone.startswith("91") and len(phone) == 12:
+        phone = phone[2:]
+    return phone
+
+
+def last_assistant_message(conversation: List[Dict[str, str]]) -> str:
+    """Lower-cased content of the most recent assistant turn ("" if there is none)"""
+    for msg in reversed(conversation):
+        if msg.get("role") == "assistant":
+            return (msg.get("content") or "").lower()
+    return ""
+
+
+class Turn:
+    """Everything the rules need from one user message, computed once"""
+    __slots__ = ("text", "lower", "question", "has_digits")
+
+    def __init__(self, user_text: str, conversation: List[Dict[str, str]], question: Optional[str] = None):
+        self.text = user_text.strip()
+        self.lower = self.text.lower()
+        self.question = last_assistant_message(conversation) if question is None else question
+        self.has_digits = any(c.isdigit() for c in self.text)
+
+
+Range = Tuple[Optional[float], Optional[float]]
+# (field, value, confidence, (start, end) of the value in the message) found by a rule
+Match = Tuple[str, Any, float, Tuple[int, int]]
+
+
+def _check(valid: Union[None, Range, Callable[[Any], bool]], value: Any) -> bool:
+    if value is None:
+        return False
+    if valid is None:
+        return True
+    if callable(valid):
+        return valid(value)
+    low, high = valid
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def _question_words(words: Iterable[str]):
+    """Pattern matching any of words at a word start ("age" but not "percentage"), None if empty"""
+    words = tuple(words)
+    return re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + ")") if words else None
+
+
+class PatternRule:
+    """Regex rule for one field: the first pattern whose match converts to a valid value wins
+
+    keywords gate the patterns (at least one must occur in the message). When the
+    last assistant message mentions one of `asked`, a bare answer matching `bare`
+    is accepted too, e.g. "750" right after "What is your CIBIL score?", with
+    bare_confidence. `bare` should be anchored so that a number somewhere in a
+    longer reply isn't taken as the answer. If the question mentions one of
+    `alt_when`, the value is stored as `alt_field`.
+    """
+
+    def __init__(self, field: str, patterns: Iterable[str], convert: Callable[[str], Any] = int,
+                 valid: Union[None, Range, Callable[[Any], bool]] = None, keywords: Iterable[str] = (),
+                 asked: Iterable[str] = (), bare: Optional[str] = BARE_INT,
+                 asked_valid: Union[None, Range, Callable[[Any], bool]] = None,
+                 raw: bool = False, numeric: bool = True, group: int = 1,
+                 alt_field: Optional[str] = None, alt_when: Iterable[str] = (),
+                 bare_confidence: float = BARE_ANSWER):
+        self.field = field
+        self.patterns = [re.compile(p) for p in patterns]
+        self.convert = convert
+        self.valid = valid
+        self.keywords = tuple(keywords)
+        self.asked = _question_words(asked)
+        self.bare = re.compile(bare) if bare else None
+        self.asked_valid = asked_valid if asked_valid is not None else valid
+        self.raw = raw
+        self.numeric = numeric
+        self.group = group
+        self.alt_field = alt_field
+        self.alt_when = _question_words(alt_when)
+        self.bare_confidence = bare_confidence
+
+    def _value(self, match, valid) -> Any:
+        try:
+            value = self.convert(match.group(self.group))
+        except (TypeError, ValueError):
+            return None
+        return value if _check(valid, value) else None
+
+    def apply(self, turn: Turn) -> Optional[Match]:
+        if self.numeric and not turn.has_digits:
+            return None
+        field = self.alt_field if self.alt_when is not None and self.alt_when.search(turn.question) else self.field
+        text = turn.text if self.raw else turn.lower
+        asked = self.asked_for(turn.question)
+
+        if not self.keywords or any(k in turn.lower for k in self.keywords):
+            for pattern in self.patterns:
+                match = pattern.search(text)
+                if match:
+                    value = self._value(match, self.valid)
+                    if value is not None:
+                        return field, value, ASKED_MATCH if asked else KEYWORD_MATCH, match.span(self.group)
+
+        if self.bare is not None and asked:
+            match = self.bare.search(text)
+            if match:
+                value = self._value(match, self.asked_valid)
+                if value is not None:
+                    return field, value, self.bare_confidence, match.span(1)
+        return None
+
+    def asked_for(self, question: str) -> bool:
+        return self.asked is not None and self.asked.search(question) is not None
+
+
+class ChoiceRule:
+    """Categorical field: the first keyword (at a word start) found in the message picks the value"""
+
+    def __init__(self, field: str, choices: Dict[str, str], asked: Iterable[str] = ()):
+        self.field = field
+        self.choices = choices
+        self.asked = _question_words(asked)
+        # Longest first so "services" wins over "service" at the same position
+        keys = sorted(choices, key=len, reverse=True)
+        self.pattern = re.compile(r"\b(" + "|".join(re.escape(k) for k in keys) + ")")
+
+    def apply(self, turn: Turn) -> Optional[Match]:
+        match = self.pattern.search(turn.lower)
+        if match:
+            confidence = ASKED_MATCH if self.asked_for(turn.question) else LOOSE_MATCH
+            return self.field, self.choices[match.group(1)], confidence, match.span(1)
+        return None
+
+    def asked_for(self, question: str) -> bool:
+        return self.asked is not None and self.asked.search(question) is not None
+
+
+_NO = re.compile(r"\b(no|nope|don't|dont|do not|not|none)\b")
+_YES = re.compile(r"\b(yes|yeah|yep|have|available|got|sure)\b")
+_UNSURE = re.compile(r"\b(maybe|perhaps|might|not sure|not really|depends)\b")
+
+
+class YesNoRule:
+    """Yes/No field answered right after the assistant asked about it"""
+
+    def __init__(self, field: str, asked: Iterable[str]):
+        self.field = field
+        self.asked = _question_words(asked)
+
+    def apply(self, turn: Turn) -> Optional[Match]:
+        if not self.asked_for(turn.question):
+            return None
+        # A hedged answer is still recorded, but not trusted enough to skip the LLM
+        confidence = LOOSE_MATCH if _UNSURE.search(turn.lower) else ASKED_MATCH
+        # Negations first: "I don't have collateral" is a No
+        match = _NO.search(turn.lower)
+        if match:
+            return self.field, "No", confidence, match.span()
+        match = _YES.search(turn.lower)
+        if match:
+            return self.field, "Yes", confidence, match.span()
+        return None
+
+    def asked_for(self, question: str) -> bool:
+        return self.asked.search(question) is not None
+
+
+Rule = Union[PatternRule, ChoiceRule, YesNoRule]
+
+
+# ---------- Shared rule builders ----------
+# Words that mean "i am ..." / "i'm ..." introduced something other than a name
+_NAME_STOP_WORDS = {"years", "old", "work", "working", "job", "salary", "loan", "looking", "interested",
+                    "not", "sure", "fine", "good", "from", "a", "an", "the",
+                    # Replies that aren't names even when the name was asked for
+                    "ok", "okay", "yes", "no", "hi", "hello", "hey", "thanks", "what", "why"}
+
+
+def _valid_name(name: str) -> bool:
+    return len(name) > 1 and not any(c.isdigit() for c in name) and _NAME_STOP_WORDS.isdisjoint(name.lower().split())
+
+
+def contact_rules() -> List[Rule]:
+    return [
+        PatternRule(
+            "Customer_Name",
+            [r"my name is\s+([a-zA-Z\s]+)", r"i am\s+([a-zA-Z\s]+)", r"i'm\s+([a-zA-Z\s]+)",
+             r"call me\s+([a-zA-Z\s]+)", r"name\s*:?\s*([a-zA-Z\s]+)"],
+            convert=lambda s: s.strip().title(), valid=_valid_name,
+            keywords=("name", "i am", "i'm", "call me"), numeric=False,
+            # Just a name (up to three words) when the assistant asked for it. Any short
+            # reply has that shape ("skip this"), so it is never trusted without OpenAI
+            asked=("name",), bare=r"^(?=.{2,50}$)([a-z]+(?:\s+[a-z]+){0,2})$", bare_confidence=LOOSE_MATCH,
+        ),
+        PatternRule("Customer_Email", [r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b"],
+                    convert=str, keywords=("@",), asked=("email", "e-mail"), raw=True, numeric=False,
+                    group=0, bare=None),
+        PatternRule(
+            "Customer_Phone",
+            [r"(\+91[\s-]?)?([6-9]\d{9})", r"(\+91[\s-]?)?([6-9]\d{4}[\s-]\d{5})", r"(\d{10})",
+             r"(\d{3}[\s-]\d{3}[\s-]\d{4})"],
+            convert=normalize_phone, valid=lambda p: len(p) == 10 and p[0] in "6789",
+            asked=("phone", "mobile", "contact number"), raw=True, group=0, bare=None,
+        ),
+    ]
+
+
+def age_rule(low: int, high: int) -> PatternRule:
+    return PatternRule(
+        "Age",
+        [r"i am (\d+) years? old", r"my age is (\d+)", r"age\s*:?\s*(\d+)", r"(\d+)\s+years?\s+old"],
+        valid=(low, high), keywords=("age", "old"), asked=("age", "how old"),
+    )
+
+
+def cibil_rule(field: str) -> PatternRule:
+    return PatternRule(
+        field,
+        [r"cibil.*?(\d{3})", r"credit.*?score.*?(\d{3})", r"(\d{3}).*?cibil", r"(\d{3}).*?credit.*?score"],
+        valid=(300, 900), keywords=("cibil", "credit"), asked=("cibil", "credit score"),
+    )
+
+
+def amount_rule(field: str, patterns: Iterable[str], minimum: float, keywords: Iterable[str],
+                asked: Iterable[str] = (), asked_minimum: Optional[float] = None, **kwargs) -> PatternRule:
+    """Rupee amount in lakh/crore/plain form; a bare amount is accepted when `asked`"""
+    return PatternRule(
+        field, patterns, convert=parse_amount, valid=(minimum, None), keywords=keywords,
+        asked=asked, bare=BARE_AMOUNT,
+        asked_valid=(asked_minimum if asked_minimum is not None else minimum, None), **kwargs
+    )
+
+
+def loan_amount_rule(field: str, minimum: float, asked: Iterable[str], extra_verbs: Iterable[str] = ()) -> PatternRule:
+    verbs = ["need", "want", *extra_verbs]
+    return amount_rule(
+        field,
+        [rf"{verb}.*?{AMOUNT}" for verb in verbs] + [rf"loan.*?amount.*?{AMOUNT}", rf"{AMOUNT}.*?loan"],
+        minimum, keywords=(*verbs, "loan"), asked=asked,
+    )
+
+
+# ---------- Per loan type rule tables ----------
+def _default_rules() -> List[Rule]:
+    return contact_rules() + [age_rule(18, 80)]
+
+
+def _education_rules() -> List[Rule]:
+    return contact_rules() + [
+        age_rule(18, 35),
+        PatternRule("Academic_Score",
+                    [r"academic score.*?(\d+)", r"score.*?(\d+)", r"(\d+)%", r"(\d+)\s*percent"],
+                    valid=(0, 100), keywords=("score", "%", "percent"), asked=("academic", "percentage", "marks")),
+        ChoiceRule("Intended_Course", {
+            "stem": "STEM", "mba": "MBA", "medicine": "Medicine", "medical": "Medicine",
+            "finance": "Finance", "law": "Law", "arts": "Arts", "other": "Other",
+        }, asked=("course",)),
+        PatternRule("University_Tier", [r"tier\s*(\d)", r"(\d)\s*tier"],
+                    convert=lambda d: f"Tier{d}", valid=lambda t: t in ("Tier1", "Tier2", "Tier3"),
+                    keywords=("tier",), asked=("tier",), bare=r"^(\d)$"),
+        amount_rule("Coapplicant_Income",
+                    [rf"coapplicant.*?income.*?{AMOUNT}", rf"co.*?applicant.*?{AMOUNT}", rf"{AMOUNT}.*?coapplicant"],
+                    1, keywords=("applicant",), asked=("co-applicant", "coapplicant", "co applicant")),
+        amount_rule("Guarantor_Networth",
+                    [rf"guarantor.*?networth.*?{AMOUNT}", rf"guarantor.*?assets.*?{AMOUNT}",
+                     rf"networth.*?{AMOUNT}", rf"assets.*?{AMOUNT}"],
+                    1, keywords=("networth", "assets"), asked=("networth", "net worth")),
+        cibil_rule("CIBIL_Score"),
+        ChoiceRule("Loan_Type", {"unsecured": "Unsecured", "secured": "Secured"}, asked=("secured",)),
+        PatternRule("Loan_Term",
+                    [r"(\d+)\s+years?.*?term", r"term.*?(\d+)\s+years?", r"(\d+)\s+years?.*?loan", r"loan.*?(\d+)\s+years?"],
+                    valid=(1, 15), keywords=("term", "loan"), asked=("term", "years")),
+        loan_amount_rule("Expected_Loan_Amount", 1, asked=("loan amount", "how much loan", "borrow")),
+    ]
+
+
+def _business_rules() -> List[Rule]:
+    return contact_rules() + [
+        PatternRule("Business_Age_Years",
+                    [r"business.*?(\d+)\s+years?", r"operating.*?(\d+)\s+years?",
+                     r"(\d+)\s+years?.*?business", r"(\d+)\s+years?.*?operating"],
+                    valid=(1, 50), keywords=("business", "operating"),
+                    asked=("how long", "how many years", "business age")),
+        amount_rule("Annual_Revenue",
+                    [rf"revenue.*?{AMOUNT}", rf"turnover.*?{AMOUNT}", rf"{AMOUNT}.*?revenue", rf"{AMOUNT}.*?turnover"],
+                    100000, keywords=("revenue", "turnover"), asked=("revenue", "turnover")),
+        amount_rule("Net_Profit", [rf"profit.*?{AMOUNT}", rf"{AMOUNT}.*?profit"],
+                    10000, keywords=("profit",), asked=("profit",)),
+        cibil_rule("CIBIL_Score"),
+        ChoiceRule("Business_Type", {
+            "retail": "Retail", "trading": "Trading", "service": "Services", "services": "Services",
+            "manufacturing": "Manufacturing", "manufacture": "Manufacturing",
+        }, asked=("business type", "type of business")),
+        YesNoRule("Has_Collateral", asked=("collateral",)),
+        YesNoRule("Has_Guarantor", asked=("guarantor",)),
+        loan_amount_rule("Expected_Loan_Amount", 100000, extra_verbs=("require",),
+                         asked=("loan amount", "how much loan", "borrow", "amount need", "amount require")),
+    ]
+
+
+def _car_rules() -> List[Rule]:
+    return contact_rules() + [
+        age_rule(18, 80),
+        amount_rule("applicant_annual_salary",
+                    [rf"salary.*?{AMOUNT}", rf"earn.*?{AMOUNT}", rf"income.*?{AMOUNT}", rf"{AMOUNT}.*?salary"],
+                    300000, keywords=("salary", "earn", "income"),
+                    asked=("salary", "income", "earn"), asked_minimum=100000,
+                    alt_field="Coapplicant_Annual_Income", alt_when=("co-applicant", "coapplicant", "co applicant")),
+        cibil_rule("CIBIL"),
+        ChoiceRule("Car_Type", {"sedan": "Sedan", "suv": "SUV", "hatchback": "Hatchback", "coupe": "Coupe"},
+                   asked=("car type", "type of car")),
+        PatternRule("down_payment_percent",
+                    [r"down.*?payment.*?(\d+)%", r"(\d+)%.*?down.*?payment", r"down.*?(\d+)\s*percent"],
+                    valid=(10, 50), keywords=("down",), asked=("down payment",), bare=BARE_PERCENT),
+        PatternRule("Tenure",
+                    [r"(\d+)\s+years?.*?tenure", r"tenure.*?(\d+)\s+years?", r"(\d+)\s+years?.*?loan", r"repay.*?(\d+)\s+years?"],
+                    valid=(1, 7), keywords=("tenure", "loan", "repay"), asked=("tenure",)),
+        loan_amount_rule("loan_amount", 100000, asked=("loan amount", "how much loan", "borrow", "amount need")),
+    ]
+
+
+PROFILES: Dict[str, Callable[[], List[Rule]]] = {
+    "default": _default_rules,
+    "education": _education_rules,
+    "home": lambda: _default_rules() + [cibil_rule("CIBIL_score")],
+    "personal": lambda: _default_rules() + [cibil_rule("CIBIL_Score")],
+    "gold": lambda: _default_rules() + [cibil_rule("CIBIL_Score")],
+    "business": _business_rules,
+    "car": _car_rules,
+}
+
+
+class ExtractionEngine:
+    """A loan type's compiled rules"""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+
+    def extract(self, user_text: str, conversation: List[Dict[str, str]]) -> Dict[str, Any]:
+        return self.extract_turn(Turn(user_text, conversation))
+
+    def extract_turn(self, turn: Turn) -> Dict[str, Any]:
+        return {field: value for field, value, _, _ in self._matches(turn).values()}
+
+    def _matches(self, turn: Turn) -> Dict[Rule, Match]:
+        matches = {}
+        for rule in self.rules:
+            match = rule.apply(turn)
+            if match is not None:
+                matches[rule] = match
+        return matches
+
+    def route(self, user_text: str, conversation: List[Dict[str, str]],
+              threshold: float = KEYWORD_MATCH) -> Tuple[Dict[str, Any], float]:
+        """Extracted fields and the confidence that they capture this reply
+
+        The confidence is that of the weakest field the assistant just asked for:
+        0 when the question isn't about any field these rules know (a free-form
+        turn) or one of its fields wasn't found, capped at AMBIGUOUS_ANSWER when one
+        bare reply fitted several asked fields, and scaled down for long replies.
+        When it reaches threshold, the asked fields are returned together with
+        keyword matches for other fields that are at least that confident and whose
+        value doesn't overlap any other match ("8 lakh" can't be both the loan
+        amount and the salary); otherwise everything found is returned for use as
+        a fallback.
+        """
+        return self.route_turn(Turn(user_text, conversation), threshold)
+
+    def route_turn(self, turn: Turn, threshold: float = KEYWORD_MATCH) -> Tuple[Dict[str, Any], float]:
+        matches = self._matches(turn)
+        asked = [rule for rule in self.rules if rule.asked_for(turn.question)]
+        confidence = min((matches[rule][2] if rule in matches else 0.0 for rule in asked), default=0.0)
+        if sum(1 for _, _, score, _ in matches.values() if score == BARE_ANSWER) > 1:
+            confidence = min(confidence, AMBIGUOUS_ANSWER)
+        if len(turn.lower.split()) > SHORT_ANSWER_WORDS:
+            confidence *= LONG_ANSWER_FACTOR
+
+        if confidence < threshold:
+            return {field: value for field, value, _, _ in matches.values()}, confidence
+        extracted = {matches[rule][0]: matches[rule][1] for rule in asked}
+        for rule, (field, value, score, span) in matches.items():
+            if rule in asked or score < threshold or field in extracted:
+                continue
+            if not any(_overlaps(span, other[3]) for other_rule, other in matches.items() if other_rule is not rule):
+                extracted[field] = value
+        return extracted, confidence
+
+    @property
+    def fields(self) -> List[str]:
+        return [rule.field for rule in self.rules]
+
+
+def _overlaps(a: Tuple[int, int], b: Tuple[int, int]) -> bool:
+    return a[0] < b[1] and b[0] < a[1]
+
+
+_ENGINES: Dict[str, ExtractionEngine] = {}
+
+
+def engine_for(profile: str) -> ExtractionEngine:
+    """Compiled engine for a loan type (compiled on first use, then shared)"""
+    engine = _ENGINES.get(profile)
+    if engine is None:
+        engine = _ENGINES[profile] = ExtractionEngine(PROFILES.get(profile, _default_rules)())
+    return engine
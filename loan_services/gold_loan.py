@@ -1,12 +1,18 @@
-from typing import Dict, List, Any, Tuple
+import logging
+from typing import Dict, List, Any, Tuple, Optional
 import pandas as pd
 import numpy as np
-import joblib
 from .base_loan import BaseLoanService
+from .compiled_scorer import CompiledScorer, label_codes, standard_scaler_params
+
+logger = logging.getLogger(__name__)
 
 class GoldLoanService(BaseLoanService):
     """Gold Loan Service with ML Model Integration"""
     
+    tenure_field = "Loan_Tenure"
+    extraction_profile = "gold"
+    
     def get_required_fields(self) -> List[str]:
         return [
             # Customer Contact Information
@@ -63,14 +69,10 @@ Start by introducing yourself as a gold loan specialist."""
     def get_fallback_greeting(self) -> str:
         return "Hello! I'm a gold loan specialist here to help you with your gold loan application. Gold loans offer quick financing against your gold jewelry. Let's start with your full name - what should I call you?"
     
-    def get_extraction_prompt(self, user_text: str, conversation: List[Dict[str, str]]) -> str:
-        return f"""
+    def get_extraction_instructions(self) -> str:
+        return """
 Based on the conversation history and the user's latest response, extract any gold loan-related information.
 
-Conversation so far: {conversation[-3:] if len(conversation) > 3 else conversation}
-
-User's latest response: "{user_text}"
-
 Extract information for these fields (only if clearly mentioned):
 
 Customer Information:
@@ -93,8 +95,8 @@ Important:
 - Extract only information that is clearly stated
 - Do NOT extract Gold_Weight, Gold_Purity, or Gold_Rate_Per_Gram - only Gold_Value
 
-Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {{}}.
-Example: {{"Customer_Name": "John Doe", "Age": 45, "Annual_Income": 900000, "Occupation": "Salaried", "Gold_Value": 400000, "Loan_Amount": 300000, "Loan_Tenure": 2}}
+Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {}.
+Example: {"Customer_Name": "John Doe", "Age": 45, "Annual_Income": 900000, "Occupation": "Salaried", "Gold_Value": 400000, "Loan_Amount": 300000, "Loan_Tenure": 2}
 """.strip()
     
     def validate_field(self, field_name: str, value: Any) -> Tuple[bool, str]:
@@ -170,111 +172,101 @@ Example: {{"Customer_Name": "John Doe", "Age": 45, "Annual_Income": 900000, "Occ
             field_display = field_name.replace('_', ' ').lower()
             return False, f"Please provide a valid {field_display} in the correct format."
 
+    def build_feature_record(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the gold loan feature record"""
+        # Model expects: ['Age', 'Occupation', 'Monthly_Income', 'CIBIL_Score', 'Gold_Value', 'Existing_EMI', 'Loan_Tenure_Years']
+        return {
+            'Age': float(user_input['Age']),
+            'Occupation': user_input['Occupation'],  # Will be encoded later
+            'Monthly_Income': float(user_input['Annual_Income']) / 12,
+            'CIBIL_Score': float(user_input['CIBIL_Score']),
+            'Gold_Value': float(user_input['Gold_Value']),
+            'Existing_EMI': 0.0,  # Default to 0 since we don't collect this anymore
+            'Loan_Tenure_Years': float(user_input['Loan_Tenure'])
+        }
+
     def prepare_model_input(self, user_input: Dict[str, Any]) -> pd.DataFrame:
         """Prepare input data for the gold loan model"""
         try:
-            # Convert Annual Income to Monthly Income
-            monthly_income = float(user_input['Annual_Income']) / 12
-            
-            # Create input dataframe matching your model's expected features
-            # Model expects: ['Age', 'Occupation', 'Monthly_Income', 'CIBIL_Score', 'Gold_Value', 'Existing_EMI', 'Loan_Tenure_Years']
-            input_data = {
-                'Age': float(user_input['Age']),
-                'Occupation': user_input['Occupation'],  # Will be encoded later
-                'Monthly_Income': monthly_income,
-                'CIBIL_Score': float(user_input['CIBIL_Score']),
-                'Gold_Value': float(user_input['Gold_Value']),
-                'Existing_EMI': 0.0,  # Default to 0 since we don't collect this anymore
-                'Loan_Tenure_Years': float(user_input['Loan_Tenure'])
-            }
-            
-            print(f"Gold Loan Input data prepared: {input_data}")
+            input_data = self.build_feature_record(user_input)
+            logger.debug("Gold loan input prepared: %s", input_data)
             
             input_df = pd.DataFrame([input_data])
             
-            print(f"Prepared input dataframe shape: {input_df.shape}")
-            print(f"Input columns: {list(input_df.columns)}")
+            logger.debug("Prepared input shape=%s columns=%s", input_df.shape, input_df.columns)
             
             return input_df
             
         except Exception as e:
-            print(f"Error in prepare_model_input: {e}")
+            logger.error("Error in prepare_model_input: %s", e)
             raise e
     
+    def score_features(self, input_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode Occupation, scale and run the multi-output gold loan model"""
+        package = self.models.get("gold_loan_model")
+        if not package:
+            raise Exception("Gold loan ML model not available. Cannot process loan prediction.")
+        
+        df_input = input_df.copy()
+        df_input["Occupation"] = package["encoder"].transform(df_input["Occupation"])
+        df_scaled = package["scaler"].transform(df_input[package["features"]])
+        
+        # prediction[:, 0] = Loan_Amount, prediction[:, 1] = Rate_of_Interest
+        prediction = np.asarray(package["model"].predict(df_scaled))
+        return prediction[:, 0], prediction[:, 1]
+    
+    def compile_scorer(self) -> Optional[CompiledScorer]:
+        """Compile the gold loan package to a fixed layout with Occupation codes and scaler vectors"""
+        package = self.models.get("gold_loan_model")
+        if not package:
+            return None
+        
+        features = list(package["features"])
+        occupation_codes = label_codes(package["encoder"])
+        mean, scale = standard_scaler_params(package["scaler"])
+        columns = [(f, occupation_codes, None) if f == "Occupation" else (f, None, None) for f in features]
+        return CompiledScorer(
+            features, columns,
+            predictors={"model": package["model"]},
+            outputs={"loan_amount": ("model", 0, None), "interest_rate": ("model", 1, None)},
+            mean=mean, scale=scale,
+        )
+    
+    def finalize_prediction(self, user_input: Dict[str, Any], loan_amount: float, interest_rate: float) -> tuple:
+        """Clamp raw gold loan output to lending bounds"""
+        # Gold loans typically offer 70-80% of gold value
+        max_loan_based_on_gold = float(user_input['Gold_Value']) * 0.8
+        loan_amount = min(float(loan_amount), max_loan_based_on_gold)
+        loan_amount = max(loan_amount, 5000)    # Min 5k
+        interest_rate = max(8.0, min(24.0, float(interest_rate)))   # Between 8% and 24%
+        return round(float(loan_amount), 0), round(float(interest_rate), 2)
+    
     def predict_loan(self, user_input: Dict[str, Any]) -> tuple:
         """Predict gold loan amount and interest rate using ML model"""
+        if self.scorer is not None:
+            return self.predict_compiled(user_input)
+        
         try:
-            print(f"Gold Loan Prediction - Input: {user_input}")
+            logger.debug("Gold loan prediction input: %s", user_input)
             
             # Prepare input data
             input_df = self.prepare_model_input(user_input)
-            print(f"Prepared input shape: {input_df.shape}")
-            print(f"Input columns: {list(input_df.columns)}")
             
             # Try to use actual ML model if available
             if self.models.get("gold_loan_model"):
                 try:
-                    print("Using ML model for prediction...")
-                    
-                    # Load the model package - matching your structure exactly
-                    package = self.models["gold_loan_model"]
-                    model = package["model"]
-                    scaler = package["scaler"]
-                    encoder = package["encoder"]  # Label encoder for Occupation
-                    features = package["features"]  # Feature order
-                    targets = package["targets"]  # Target names
-                    
-                    print("Model components loaded successfully")
-                    print(f"Expected features: {features}")
-                    print(f"Target variables: {targets}")
-                    
-                    # Prepare data for prediction
-                    df_input = input_df.copy()
-                    
-                    # Encode Occupation using your label encoder
-                    df_input["Occupation"] = encoder.transform(df_input["Occupation"])
-                    print(f"After encoding Occupation: {df_input['Occupation'].values}")
-                    
-                    # Select features in the correct order
-                    df_input = df_input[features]
-                    print(f"After feature selection: {list(df_input.columns)}")
-                    
-                    # Scale features using your scaler
-                    df_scaled = scaler.transform(df_input)
-                    print(f"Scaled features shape: {df_scaled.shape}")
-                    
-                    # Make predictions
-                    prediction = model.predict(df_scaled)[0]
-                    print(f"Raw predictions: {prediction}")
-                    
-                    # Handle predictions as per your structure
-                    # prediction[0] = Loan_Amount
-                    # prediction[1] = Rate_of_Interest
-                    loan_amount = float(prediction[0])
-                    interest_rate = float(prediction[1])
-                    
-                    print(f"ML Prediction - Loan: Rs.{loan_amount:,.0f}, Rate: {interest_rate:.2f}%")
-                    
-                    # Ensure reasonable bounds for gold loans
-                    # Gold loans typically offer 70-80% of gold value
-                    max_loan_based_on_gold = float(user_input['Gold_Value']) * 0.8
-                    loan_amount = min(loan_amount, max_loan_based_on_gold)
-                    loan_amount = max(loan_amount, 5000)    # Min 5k
-                    interest_rate = max(8.0, min(24.0, interest_rate))   # Between 8% and 24%
+                    loan_amounts, interest_rates = self.score_features(input_df)
+                    logger.debug("Model output - loan: %.0f, rate: %.2f", loan_amounts[0], interest_rates[0])
                     
-                    print(f"Final ML Prediction - Loan: Rs.{loan_amount:,.0f}, Rate: {interest_rate:.2f}%")
-                    return round(float(loan_amount), 0), round(float(interest_rate), 2)
+                    loan_amount, interest_rate = self.finalize_prediction(user_input, loan_amounts[0], interest_rates[0])
+                    logger.debug("Final prediction - loan: Rs.%.0f, rate: %.2f%%", loan_amount, interest_rate)
+                    return loan_amount, interest_rate
                     
                 except Exception as e:
-                    print(f"Model prediction error: {e}")
-                    import traceback
-                    traceback.print_exc()
                     raise Exception(f"ML model prediction failed: {str(e)}")
             else:
                 raise Exception("Gold loan ML model not available. Cannot process loan prediction.")
             
         except Exception as e:
-            print(f"Prediction error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Gold loan prediction failed")
             raise Exception(f"Gold loan prediction failed: {str(e)}")
\ No newline at end of file
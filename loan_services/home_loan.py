@@ -1,11 +1,18 @@
-from typing import Dict, List, Any, Tuple
+import logging
+from typing import Dict, List, Any, Tuple, Optional
 import pandas as pd
 import numpy as np
 from .base_loan import BaseLoanService
+from .compiled_scorer import CompiledScorer, one_hot
+
+logger = logging.getLogger(__name__)
 
 class HomeLoanService(BaseLoanService):
     """Home Loan Service with XGBoost Model Integration"""
     
+    tenure_field = "Tenure"
+    extraction_profile = "home"
+    
     def get_required_fields(self) -> List[str]:
         return [
             "Customer_Name",
@@ -66,14 +73,10 @@ Start by introducing yourself as a home loan specialist and asking about their h
     def get_fallback_greeting(self) -> str:
         return "Hello! I'm a home loan specialist. I'm here to help you with your home loan application. Let's start with your full name - what should I call you?"
     
-    def get_extraction_prompt(self, user_text: str, conversation: List[Dict[str, str]]) -> str:
-        return f"""
+    def get_extraction_instructions(self) -> str:
+        return """
 Based on the conversation history and the user's latest response, extract any home loan-related information.
 
-Conversation so far: {conversation[-3:] if len(conversation) > 3 else conversation}
-
-User's latest response: "{user_text}"
-
 Extract information for these fields (only if clearly mentioned):
 
 Customer Information:
@@ -98,8 +101,8 @@ Important:
 - Convert lakhs/crores to actual numbers (e.g., "50 lakhs" = 5000000)
 - Extract only information that is clearly stated
 
-Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {{}}.
-Example: {{"Customer_Name": "John Doe", "Age": 35, "Employment_type": "Salaried", "Income": 80000, "Property_value": 5000000}}
+Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {}.
+Example: {"Customer_Name": "John Doe", "Age": 35, "Employment_type": "Salaried", "Income": 80000, "Property_value": 5000000}
 """.strip()
     
     def validate_field(self, field_name: str, value: Any) -> Tuple[bool, str]:
@@ -175,91 +178,122 @@ Example: {{"Customer_Name": "John Doe", "Age": 35, "Employment_type": "Salaried"
         except (ValueError, TypeError) as e:
             return False, "There was an error validating your information. Please check all the values you provided."
     
+    def build_feature_record(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the home loan feature record with engineered ratios (matching training code)"""
+        # Validate complete data first
+        is_valid, error_msg = self.validate_complete_data(user_input)
+        if not is_valid:
+            raise ValueError(error_msg)
+        
+        income = float(user_input['Income'])
+        existing_emi = float(user_input.get('Existing_total_EMI') or 0)
+        down_payment = float(user_input['Down_payment'])
+        loan_amount = float(user_input['Loan_amount_requested'])
+        property_value = float(user_input['Property_value'])
+        
+        return {
+            'Age': float(user_input['Age']),
+            'Income': income,
+            'Guarantor_income': float(user_input.get('Guarantor_income') or 0),
+            'Tenure': float(user_input['Tenure']),
+            'CIBIL_score': float(user_input['CIBIL_score']),
+            'Down_payment': down_payment,
+            'Existing_total_EMI': existing_emi,
+            'Loan_amount_requested': loan_amount,
+            'Property_value': property_value,
+            'Employment_type': user_input['Employment_type'],
+            'LTV': loan_amount / property_value,
+            'EMI_to_income': existing_emi / income,
+            'DP_ratio': down_payment / property_value,
+        }
+    
     def prepare_model_input(self, user_input: Dict[str, Any]) -> pd.DataFrame:
         """Prepare input data for the XGBoost model with feature engineering"""
         try:
-            # Validate complete data first
-            is_valid, error_msg = self.validate_complete_data(user_input)
-            if not is_valid:
-                raise ValueError(error_msg)
-            
-            # Create input dataframe
-            input_data = {
-                'Age': float(user_input['Age']),
-                'Income': float(user_input['Income']),
-                'Guarantor_income': float(user_input.get('Guarantor_income', 0)),
-                'Tenure': float(user_input['Tenure']),
-                'CIBIL_score': float(user_input['CIBIL_score']),
-                'Down_payment': float(user_input['Down_payment']),
-                'Existing_total_EMI': float(user_input.get('Existing_total_EMI', 0)),
-                'Loan_amount_requested': float(user_input['Loan_amount_requested']),
-                'Property_value': float(user_input['Property_value']),
-                'Employment_type': user_input['Employment_type']
-            }
-            
-            print(f"Home Loan Input data prepared: {input_data}")
+            input_data = self.build_feature_record(user_input)
+            logger.debug("Home loan input prepared: %s", input_data)
             
             input_df = pd.DataFrame([input_data])
-            
-            # Ensure Guarantor_income is numeric
-            input_df['Guarantor_income'] = pd.to_numeric(input_df['Guarantor_income'], errors='coerce').fillna(0)
-            
-            # Feature Engineering: Calculate ratios (matching training code)
-            input_df['LTV'] = input_df['Loan_amount_requested'] / input_df['Property_value']
-            input_df['EMI_to_income'] = input_df['Existing_total_EMI'] / input_df['Income']
-            input_df['DP_ratio'] = input_df['Down_payment'] / input_df['Property_value']
-            
-            print(f"After feature engineering: LTV={input_df['LTV'].iloc[0]:.3f}, EMI_to_income={input_df['EMI_to_income'].iloc[0]:.3f}")
-            
-            # One-hot encode Employment_type (matching training code)
-            input_df = pd.get_dummies(input_df, columns=['Employment_type'], drop_first=True)
-            
-            print(f"Final prepared dataframe shape: {input_df.shape}")
+            logger.debug("Prepared input shape=%s columns=%s", input_df.shape, input_df.columns)
             return input_df
             
         except Exception as e:
-            print(f"Error in prepare_model_input: {e}")
+            logger.error("Error in prepare_model_input: %s", e)
             raise e
     
+    def score_features(self, input_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """One-hot encode Employment_type, align to the model columns and run both models"""
+        loan_model = self.models.get("loan_amount_model")
+        rate_model = self.models.get("interest_rate_model")
+        if not (loan_model and rate_model):
+            raise Exception("ML models not loaded. Please ensure loan_amount_model.pkl and interest_rate_model.pkl are available in models/home_loan_models/")
+        
+        if hasattr(loan_model, 'feature_names_in_'):
+            # Encode against the training layout rather than the categories present in this
+            # frame, so every row gets the same columns (drop_first baseline is implicit)
+            required_cols = list(loan_model.feature_names_in_)
+            prefix = 'Employment_type_'
+            features = input_df.drop(columns=['Employment_type'])
+            for col in required_cols:
+                if col.startswith(prefix):
+                    features[col] = (input_df['Employment_type'] == col[len(prefix):]).astype(int)
+            features = features.reindex(columns=required_cols, fill_value=0)
+        else:
+            features = pd.get_dummies(input_df, columns=['Employment_type'], drop_first=True)
+        
+        return loan_model.predict(features), rate_model.predict(features)
+    
+    def compile_scorer(self) -> Optional[CompiledScorer]:
+        """Compile the home loan models to a fixed layout with Employment_type one-hot lookups"""
+        loan_model = self.models.get("loan_amount_model")
+        rate_model = self.models.get("interest_rate_model")
+        if not (loan_model and rate_model) or not hasattr(loan_model, 'feature_names_in_'):
+            return None
+        
+        prefix = 'Employment_type_'
+        feature_names = list(loan_model.feature_names_in_)
+        columns = [
+            ('Employment_type', one_hot(col[len(prefix):]), 0.0) if col.startswith(prefix) else (col, None, None)
+            for col in feature_names
+        ]
+        return CompiledScorer(
+            feature_names, columns,
+            predictors={"loan_amount_model": loan_model, "interest_rate_model": rate_model},
+            outputs={
+                "loan_amount": ("loan_amount_model", None, None),
+                "interest_rate": ("interest_rate_model", None, None),
+            },
+        )
+    
+    def finalize_prediction(self, user_input: Dict[str, Any], loan_amount: float, interest_rate: float) -> tuple:
+        """Round raw home loan model output"""
+        return round(float(loan_amount), 0), round(float(interest_rate), 2)
+    
     def predict_loan(self, user_input: Dict[str, Any]) -> tuple:
         """Predict home loan amount and interest rate using XGBoost models"""
+        if self.scorer is not None:
+            return self.predict_compiled(user_input)
+        
         try:
-            print(f"Home Loan Prediction - Input: {user_input}")
+            logger.debug("Home loan prediction input: %s", user_input)
             
             # Prepare input data with feature engineering
             input_df = self.prepare_model_input(user_input)
-            print(f"Prepared input shape: {input_df.shape}")
-            print(f"Input columns: {list(input_df.columns)}")
             
             # Try to use actual ML models if available
             if self.models.get("loan_amount_model") and self.models.get("interest_rate_model"):
                 try:
-                    print("Using ML models for prediction...")
-                    # Get the training columns from the first model to align features
-                    loan_model = self.models["loan_amount_model"]
-                    rate_model = self.models["interest_rate_model"]
-                    
-                    # Ensure input has all required columns (fill missing with 0)
-                    if hasattr(loan_model, 'feature_names_in_'):
-                        required_cols = loan_model.feature_names_in_
-                        input_df = input_df.reindex(columns=required_cols, fill_value=0)
-                        print(f"Aligned to model columns: {len(required_cols)} features")
-                    
-                    # Make predictions
-                    predicted_loan = loan_model.predict(input_df)[0]
-                    predicted_rate = rate_model.predict(input_df)[0]
+                    loan_amounts, interest_rates = self.score_features(input_df)
+                    predicted_loan, predicted_rate = self.finalize_prediction(user_input, loan_amounts[0], interest_rates[0])
                     
-                    print(f"ML Prediction - Loan: Rs.{predicted_loan:,.0f}, Rate: {predicted_rate:.2f}%")
-                    return round(float(predicted_loan), 0), round(float(predicted_rate), 2)
+                    logger.debug("Final prediction - loan: Rs.%.0f, rate: %.2f%%", predicted_loan, predicted_rate)
+                    return predicted_loan, predicted_rate
                     
                 except Exception as e:
-                    print(f"🏠 Model prediction error: {e}")
                     raise Exception(f"ML model prediction failed: {str(e)}")
             else:
                 raise Exception("ML models not loaded. Please ensure loan_amount_model.pkl and interest_rate_model.pkl are available in models/home_loan_models/")
             
         except Exception as e:
-            print(f"🏠 Prediction error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Home loan prediction failed")
             raise Exception(f"Home loan prediction failed: {str(e)}")
\ No newline at end of file
@@ -1,5 +1,8 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Any, Iterable
 import os
+import time
+import logging
+import threading
 from .education_loan import EducationLoanService
 from .home_loan import HomeLoanService
 from .personal_loan import PersonalLoanService
@@ -8,20 +11,83 @@ from .business_loan import BusinessLoanService
 from .car_loan import CarLoanService
 from .base_loan import BaseLoanService
 
+logger = logging.getLogger(__name__)
+
 class LoanServiceFactory:
     """Factory class to create appropriate loan service instances"""
     
     _services: Dict[str, BaseLoanService] = {}
+    _lock = threading.Lock()
+    
+    # Defer joblib loading until a service first needs its models (LAZY_MODEL_LOADING=false to load eagerly)
+    lazy_loading = os.getenv("LAZY_MODEL_LOADING", "true").lower() != "false"
     
     @classmethod
     def get_service(cls, loan_type: str, openai_api_key: Optional[str] = None) -> BaseLoanService:
         """Get loan service instance for the specified loan type"""
         
         if loan_type not in cls._services:
-            cls._services[loan_type] = cls._create_service(loan_type, openai_api_key)
+            with cls._lock:
+                if loan_type not in cls._services:
+                    cls._services[loan_type] = cls._create_service(loan_type, openai_api_key)
         
         return cls._services[loan_type]
     
+    @classmethod
+    def warmup(cls, loan_types: Optional[Iterable[str]] = None,
+               openai_api_key: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Load the models for the given loan types (all by default) now and return the load report"""
+        loan_types = list(loan_types) if loan_types is not None else cls.get_available_loan_types()
+        started = time.perf_counter()
+        for loan_type in loan_types:
+            try:
+                cls.get_service(loan_type, openai_api_key).ensure_models_loaded()
+            except Exception as e:
+                logger.error("Warm-up failed for %s loan models: %s", loan_type, e)
+        logger.info("Warmed up %s loan models in %.2fs", ", ".join(loan_types) or "no", time.perf_counter() - started)
+        return cls.load_report(loan_types)
+    
+    @classmethod
+    def warmup_in_background(cls, loan_types: Optional[Iterable[str]] = None,
+                             openai_api_key: Optional[str] = None) -> threading.Thread:
+        """Start warmup() on a daemon thread so startup and /health don't wait on model loading"""
+        loan_types = list(loan_types) if loan_types is not None else None
+        thread = threading.Thread(target=cls.warmup, args=(loan_types, openai_api_key),
+                                  name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+    
+    @classmethod
+    def load_report(cls, loan_types: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Per loan type: whether models are loaded and how long each took"""
+        loan_types = list(loan_types) if loan_types is not None else cls.get_available_loan_types()
+        report = {}
+        for loan_type in loan_types:
+            service = cls._services.get(loan_type)
+            if service is None:
+                report[loan_type] = {"loaded": False}
+            else:
+                report[loan_type] = dict(service.load_report, prediction_cache=service.cache_stats())
+        return report
+    
+    @classmethod
+    def prompt_report(cls) -> Dict[str, Dict[str, Any]]:
+        """Per loan type follow-up prompt sizes and prompt / cached token counts reported by OpenAI"""
+        return {loan_type: service.prompt_stats() for loan_type, service in cls._services.items()}
+    
+    @classmethod
+    def extraction_report(cls) -> Dict[str, Any]:
+        """Per loan type extraction counters plus the share of all turns that skipped OpenAI"""
+        report: Dict[str, Any] = {loan_type: service.extraction_stats() for loan_type, service in cls._services.items()}
+        turns = sum(stats["turns"] for stats in report.values())
+        llm_calls = sum(stats["llm_calls"] for stats in report.values())
+        report["total"] = {
+            "turns": turns,
+            "llm_calls": llm_calls,
+            "llm_avoided_rate": round(1 - llm_calls / turns, 4) if turns else None,
+        }
+        return report
+    
     @classmethod
     def _create_service(cls, loan_type: str, openai_api_key: Optional[str] = None) -> BaseLoanService:
         """Create a new loan service instance"""
@@ -50,7 +116,7 @@ class LoanServiceFactory:
         model_path = model_paths[loan_type]
         service_class = service_classes[loan_type]
         
-        return service_class(model_path, openai_api_key)
+        return service_class(model_path, openai_api_key, lazy=cls.lazy_loading)
     
     @classmethod
     def get_available_loan_types(cls) -> list:
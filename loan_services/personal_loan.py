@@ -1,12 +1,18 @@
-from typing import Dict, List, Any, Tuple
+import logging
+from typing import Dict, List, Any, Tuple, Optional
 import pandas as pd
 import numpy as np
-import joblib
 from .base_loan import BaseLoanService
+from .compiled_scorer import CompiledScorer, label_codes, standard_scaler_params
+
+logger = logging.getLogger(__name__)
 
 class PersonalLoanService(BaseLoanService):
     """Personal Loan Service with ML Model Integration"""
     
+    tenure_field = "Loan_Term_Years"
+    extraction_profile = "personal"
+    
     def get_required_fields(self) -> List[str]:
         return [
             # Customer Contact Information
@@ -64,14 +70,10 @@ Start by introducing yourself as a personal loan specialist."""
     def get_fallback_greeting(self) -> str:
         return "Hello! I'm a personal loan specialist here to help you with your loan application. Let's start with your full name - what should I call you?"
     
-    def get_extraction_prompt(self, user_text: str, conversation: List[Dict[str, str]]) -> str:
-        return f"""
+    def get_extraction_instructions(self) -> str:
+        return """
 Based on the conversation history and the user's latest response, extract any personal loan-related information.
 
-Conversation so far: {conversation[-3:] if len(conversation) > 3 else conversation}
-
-User's latest response: "{user_text}"
-
 Extract information for these fields (only if clearly mentioned):
 
 Customer Information:
@@ -95,8 +97,8 @@ Important:
 - For Employment_Duration_Years, ask about years in current employment type, not total experience
 - Extract only information that is clearly stated
 
-Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {{}}.
-Example: {{"Customer_Name": "John Doe", "Age": 35, "Employment_Type": "Salaried", "Annual_Income": 1200000, "Employment_Duration_Years": 12}}
+Return ONLY a JSON object with the extracted fields. If no information is found, return empty JSON {}.
+Example: {"Customer_Name": "John Doe", "Age": 35, "Employment_Type": "Salaried", "Annual_Income": 1200000, "Employment_Duration_Years": 12}
 """.strip()
     
     def validate_field(self, field_name: str, value: Any) -> Tuple[bool, str]:
@@ -176,105 +178,99 @@ Example: {{"Customer_Name": "John Doe", "Age": 35, "Employment_Type": "Salaried"
         total_debt = existing_emi + proposed_emi
         return (total_debt / monthly_income) * 100 if monthly_income > 0 else 0
 
+    def build_feature_record(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the personal loan feature record"""
+        # Based on your code: Age, Employment_Type, Employment_Duration_Years, Annual_Income, CIBIL_Score, Existing_EMIs, Loan_Term_Years
+        return {
+            'Age': float(user_input['Age']),
+            'Employment_Type': user_input['Employment_Type'],  # Will be encoded later
+            'Employment_Duration_Years': float(user_input['Employment_Duration_Years']),
+            'Annual_Income': float(user_input['Annual_Income']),
+            'CIBIL_Score': float(user_input['CIBIL_Score']),
+            'Existing_EMIs': float(user_input.get('Existing_EMIs') or 0),
+            'Loan_Term_Years': float(user_input['Loan_Term_Years'])
+        }
+
     def prepare_model_input(self, user_input: Dict[str, Any]) -> pd.DataFrame:
         """Prepare input data for the personal loan model based on your exact model structure"""
         try:
-            # Create input dataframe matching your model's expected features
-            # Based on your code: Age, Employment_Type, Employment_Duration_Years, Annual_Income, CIBIL_Score, Existing_EMIs, Loan_Term_Years
-            
-            input_data = {
-                'Age': float(user_input['Age']),
-                'Employment_Type': user_input['Employment_Type'],  # Will be encoded later
-                'Employment_Duration_Years': float(user_input['Employment_Duration_Years']),
-                'Annual_Income': float(user_input['Annual_Income']),
-                'CIBIL_Score': float(user_input['CIBIL_Score']),
-                'Existing_EMIs': float(user_input.get('Existing_EMIs', 0)),
-                'Loan_Term_Years': float(user_input['Loan_Term_Years'])
-            }
-            
-            print(f"Personal Loan Input data prepared: {input_data}")
+            input_data = self.build_feature_record(user_input)
+            logger.debug("Personal loan input prepared: %s", input_data)
             
             input_df = pd.DataFrame([input_data])
             
-            print(f"Prepared input dataframe shape: {input_df.shape}")
-            print(f"Input columns: {list(input_df.columns)}")
+            logger.debug("Prepared input shape=%s columns=%s", input_df.shape, input_df.columns)
             
             return input_df
             
         except Exception as e:
-            print(f"Error in prepare_model_input: {e}")
+            logger.error("Error in prepare_model_input: %s", e)
             raise e
     
+    def score_features(self, input_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode Employment_Type, scale and run the multi-output personal loan model"""
+        package = self.models.get("personal_loan_model")
+        if not package:
+            raise Exception("Personal loan ML model not available. Cannot process loan prediction.")
+        
+        df_input = input_df.copy()
+        df_input["Employment_Type"] = package["encoder"].transform(df_input["Employment_Type"])
+        df_scaled = package["scaler"].transform(df_input[package["features"]])
+        
+        # prediction[:, 0] = log-transformed loan amount, prediction[:, 1] = interest rate
+        prediction = np.asarray(package["model"].predict(df_scaled))
+        return np.expm1(prediction[:, 0]), prediction[:, 1]
+    
+    def compile_scorer(self) -> Optional[CompiledScorer]:
+        """Compile the personal loan package to a fixed layout with Employment_Type codes and scaler vectors"""
+        package = self.models.get("personal_loan_model")
+        if not package:
+            return None
+        
+        features = list(package["features"])
+        employment_codes = label_codes(package["encoder"])
+        mean, scale = standard_scaler_params(package["scaler"])
+        columns = [(f, employment_codes, None) if f == "Employment_Type" else (f, None, None) for f in features]
+        return CompiledScorer(
+            features, columns,
+            predictors={"model": package["model"]},
+            # Loan amount was trained on log1p(amount)
+            outputs={"loan_amount": ("model", 0, "expm1"), "interest_rate": ("model", 1, None)},
+            mean=mean, scale=scale,
+        )
+    
+    def finalize_prediction(self, user_input: Dict[str, Any], loan_amount: float, interest_rate: float) -> tuple:
+        """Clamp raw personal loan output to lending bounds"""
+        loan_amount = max(50000, min(2000000, float(loan_amount)))  # Between 50k and 20L
+        interest_rate = max(8.0, min(18.0, float(interest_rate)))   # Between 8% and 18%
+        return round(float(loan_amount), 0), round(float(interest_rate), 2)
+    
     def predict_loan(self, user_input: Dict[str, Any]) -> tuple:
         """Predict personal loan amount and interest rate using ML model"""
+        if self.scorer is not None:
+            return self.predict_compiled(user_input)
+        
         try:
-            print(f"Personal Loan Prediction - Input: {user_input}")
+            logger.debug("Personal loan prediction input: %s", user_input)
             
             # Prepare input data
             input_df = self.prepare_model_input(user_input)
-            print(f"Prepared input shape: {input_df.shape}")
-            print(f"Input columns: {list(input_df.columns)}")
             
             # Try to use actual ML model if available
             if self.models.get("personal_loan_model"):
                 try:
-                    print("Using ML model for prediction...")
+                    loan_amounts, interest_rates = self.score_features(input_df)
+                    logger.debug("Model output - loan: %.0f, rate: %.2f", loan_amounts[0], interest_rates[0])
                     
-                    # Load the model package - matching your structure exactly
-                    package = self.models["personal_loan_model"]
-                    model = package["model"]
-                    scaler = package["scaler"]
-                    le = package["encoder"]  # Label encoder for Employment_Type
-                    features = package["features"]  # Feature order
-                    
-                    print("Model components loaded successfully")
-                    print(f"Expected features: {features}")
-                    
-                    # Prepare data for prediction
-                    df_input = input_df.copy()
-                    
-                    # Encode Employment_Type using your label encoder
-                    df_input["Employment_Type"] = le.transform(df_input["Employment_Type"])
-                    print(f"After encoding Employment_Type: {df_input['Employment_Type'].values}")
-                    
-                    # Select features in the correct order
-                    df_input = df_input[features]
-                    print(f"After feature selection: {list(df_input.columns)}")
-                    
-                    # Scale features using your scaler
-                    df_scaled = scaler.transform(df_input)
-                    print(f"Scaled features shape: {df_scaled.shape}")
-                    
-                    # Make predictions
-                    prediction = model.predict(df_scaled)[0]
-                    print(f"Raw predictions: {prediction}")
-                    
-                    # Handle predictions as per your structure
-                    # prediction[0] = log-transformed loan amount
-                    # prediction[1] = interest rate
-                    loan_amount = np.expm1(prediction[0])  # inverse log transformation
-                    interest_rate = float(prediction[1])
-                    
-                    print(f"After transformation - Loan: Rs.{loan_amount:,.0f}, Rate: {interest_rate:.2f}%")
-                    
-                    # Ensure reasonable bounds
-                    loan_amount = max(50000, min(2000000, loan_amount))  # Between 50k and 20L
-                    interest_rate = max(8.0, min(18.0, interest_rate))   # Between 8% and 18%
-                    
-                    print(f"Final ML Prediction - Loan: Rs.{loan_amount:,.0f}, Rate: {interest_rate:.2f}%")
-                    return round(float(loan_amount), 0), round(float(interest_rate), 2)
+                    loan_amount, interest_rate = self.finalize_prediction(user_input, loan_amounts[0], interest_rates[0])
+                    logger.debug("Final prediction - loan: Rs.%.0f, rate: %.2f%%", loan_amount, interest_rate)
+                    return loan_amount, interest_rate
                     
                 except Exception as e:
-                    print(f"Model prediction error: {e}")
-                    import traceback
-                    traceback.print_exc()
                     raise Exception(f"ML model prediction failed: {str(e)}")
             else:
                 raise Exception("Personal loan ML model not available. Cannot process loan prediction.")
             
         except Exception as e:
-            print(f"Prediction error: {e}")
-            import traceback
-            traceback.print_exc()
-            raise Exception(f"Personal loan prediction failed: {str(e)}")
-    
+            logger.exception("Personal loan prediction failed")
+            raise Exception(f"Personal loan prediction failed: {str(e)}")
\ No newline at end of file
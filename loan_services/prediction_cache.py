@@ -0,0 +1,64 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Hashable
+import os
+import time
+import threading
+
+# PREDICTION_CACHE_SIZE=0 turns the cache off
+DEFAULT_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+DEFAULT_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "3600"))
+
+
+class PredictionCache:
+    """Thread-safe LRU of raw model outputs with a time-to-live measured from insertion"""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE, ttl_seconds: float = DEFAULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (value, stored_at); least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "invalidations": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            value, stored_at = entry
+            if now - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evicted"] += 1
+
+    def clear(self):
+        """Drop every entry (models were reloaded)"""
+        with self._lock:
+            self._entries.clear()
+            self.counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_ratio": self.counters["hits"] / lookups if lookups else 0,
+                **self.counters,
+            }
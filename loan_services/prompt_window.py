@@ -0,0 +1,153 @@
+from collections import deque
+from typing import Dict, Any, List, Optional
+import os
+import json
+import threading
+
+# Most recent user/assistant exchanges sent with a follow-up request (0 = none)
+DEFAULT_WINDOW_TURNS = int(os.getenv("PROMPT_WINDOW_TURNS", "4"))
+# Estimated prompt tokens a follow-up request may use; older turns are dropped to fit
+DEFAULT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+
+# Chat format overhead per message (role, separators), as counted by OpenAI
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def _usage(response: Any):
+    """(prompt_tokens, cached_tokens) from a chat completion, or None without usage"""
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    if not isinstance(prompt_tokens, int):
+        return None
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    return prompt_tokens, cached if isinstance(cached, int) else 0
+
+
+class UsageCounter:
+    """Prompt tokens OpenAI reported for one kind of request, and how many were served from its prompt cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {"responses": 0, "prompt_tokens": 0, "cached_tokens": 0, "cache_hits": 0}
+
+    def record(self, response: Any):
+        usage = _usage(response)
+        if usage is None:
+            return
+        prompt_tokens, cached = usage
+        with self._lock:
+            self.counters["responses"] += 1
+            self.counters["prompt_tokens"] += prompt_tokens
+            self.counters["cached_tokens"] += cached
+            if cached:
+                self.counters["cache_hits"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        prompt_tokens = counters["prompt_tokens"]
+        return {
+            **counters,
+            "cached_token_rate": round(counters["cached_tokens"] / prompt_tokens, 4) if prompt_tokens else None,
+            "cache_hit_rate": round(counters["cache_hits"] / counters["responses"], 4) if counters["responses"] else None,
+        }
+
+
+def _percentile(values: List[int], fraction: float) -> Optional[int]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class ConversationWindow:
+    """Builds bounded follow-up prompts and keeps per-request prompt-size counters
+
+    Instead of the whole conversation plus an injected context message, a request
+    gets the system prompt, the instructions, the last max_turns exchanges and one
+    short system message with the collected profile and the missing fields.
+    Oldest turns are dropped until the estimate fits token_budget, so prompt size
+    stays flat however long the chat runs. The session's conversation is never
+    modified.
+
+    The system prompt and instructions are the same for every request of a loan
+    type and come first; everything that changes between requests comes after
+    them, so OpenAI's prompt cache can reuse that prefix.
+    """
+
+    def __init__(self, max_turns: int = DEFAULT_WINDOW_TURNS, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 recent: int = 1000):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "prompt_tokens": 0, "full_conversation_tokens": 0,
+                         "messages_dropped": 0, "over_budget": 0}
+        self.usage = UsageCounter()
+        # Estimated prompt tokens of the most recent requests
+        self._recent: "deque[int]" = deque(maxlen=recent)
+
+    @staticmethod
+    def summary(user_profile: Dict[str, Any], missing_fields: List[str]) -> str:
+        collected = json.dumps(user_profile, ensure_ascii=False, separators=(",", ":"), default=str)
+        return f"Collected so far: {collected}\nStill needed, in order: {', '.join(missing_fields) or 'nothing'}"
+
+    def build(self, conversation: List[Dict[str, str]], user_profile: Dict[str, Any],
+              missing_fields: List[str], instructions: str) -> List[Dict[str, str]]:
+        """Messages for one follow-up request"""
+        system = conversation[:1] if conversation and conversation[0].get("role") == "system" else []
+        # Context messages older code injected into the session are left out
+        history = [m for m in conversation[len(system):] if m.get("role") != "system"]
+        window = history[-2 * self.max_turns:] if self.max_turns > 0 else []
+        prefix = system + [{"role": "system", "content": instructions}]
+        context = [{"role": "system", "content": self.summary(user_profile, missing_fields)}]
+
+        fixed = message_tokens(prefix) + message_tokens(context)
+        window_tokens = message_tokens(window)
+        dropped = len(history) - len(window)
+        # Always keep the user's latest message
+        while len(window) > 1 and fixed + window_tokens > self.token_budget:
+            window_tokens -= message_tokens(window[:1])
+            window = window[1:]
+            dropped += 1
+
+        prompt_tokens = fixed + window_tokens
+        with self._lock:
+            self.counters["requests"] += 1
+            self.counters["prompt_tokens"] += prompt_tokens
+            # What the same request cost before: whole conversation plus the context message
+            self.counters["full_conversation_tokens"] += message_tokens(conversation) + fixed - message_tokens(system)
+            self.counters["messages_dropped"] += dropped
+            if prompt_tokens > self.token_budget:
+                self.counters["over_budget"] += 1
+            self._recent.append(prompt_tokens)
+        return prefix + window + context
+
+    def record_usage(self, response: Any):
+        """Add the prompt and cached token counts OpenAI reported for a request built here"""
+        self.usage.record(response)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            recent = list(self._recent)
+        requests, full = counters["requests"], counters["full_conversation_tokens"]
+        return {
+            "window_turns": self.max_turns,
+            "token_budget": self.token_budget,
+            **counters,
+            "mean_prompt_tokens": round(counters["prompt_tokens"] / requests, 1) if requests else None,
+            "p50_prompt_tokens": _percentile(recent, 0.5),
+            "p95_prompt_tokens": _percentile(recent, 0.95),
+            "max_prompt_tokens": max(recent) if recent else None,
+            "tokens_saved_rate": round(1 - counters["prompt_tokens"] / full, 4) if full else None,
+            "openai_usage": self.usage.stats(),
+        }
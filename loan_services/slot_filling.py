@@ -0,0 +1,311 @@
+"""
+Deterministic slot-filling dialog: asks for each required field with a fixed
+question and parses the reply without calling OpenAI.
+
+A loan type's questions are listed in DIALOGS as Slots in asking order; slots
+in one tuple are asked together (only for fields whose answers can't be
+confused, e.g. an email and a phone number). Fields a loan type doesn't list
+fall back to a generic question. The dialog keeps the fields it is waiting for
+in the session state, parses only those out of the next reply and asks again,
+with a format hint, when nothing usable was found. A reply the parser can't be
+sure of, such as a bare "skip this" after the name question, is read back to
+the user for a yes/no before it is recorded. Values are still checked by the
+service's validate_field() before they are recorded.
+"""
+
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from .extraction import Turn, contact_rules, parse_amount, KEYWORD_MATCH, _NO, _YES
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_NONE = re.compile(r"\b(zero|none|nil|no|nothing|don't|dont|do not|not applicable|n/a)\b")
+_CONTACT_RULES = {rule.field: rule for rule in contact_rules()}
+# What each contact rule needs to see in the question to take a bare answer
+_CONTACT_QUESTIONS = {"Customer_Name": "name", "Customer_Email": "email", "Customer_Phone": "phone"}
+MAX_REPROMPTS_BEFORE_OPTIONS = 2
+
+
+class Slot:
+    """One field: the question that asks for it and how to read the answer
+
+    kind is one of "contact", "int", "number", "amount", "percent", "choice" or
+    "yesno". options are the values a choice accepts, in the order listed in the
+    question (a bare "2" picks the second); aliases map other words to them.
+    none_is_zero takes "none" / "no" / "nil" as 0 for amounts like existing EMIs.
+    confirm is a question with a {value} placeholder, asked when a contact reply
+    was only read as a bare answer (see unsure()).
+    """
+
+    def __init__(self, field: str, question: str, kind: str = "number", hint: Optional[str] = None,
+                 options: Tuple[str, ...] = (), aliases: Optional[Dict[str, str]] = None,
+                 none_is_zero: bool = False, confirm: Optional[str] = None):
+        self.field = field
+        self.question = question
+        self.kind = kind
+        self.hint = hint or question
+        self.options = options
+        self.none_is_zero = none_is_zero
+        self.confirm = confirm
+        if options:
+            words = {option.lower(): option for option in options}
+            words.update(aliases or {})
+            self.choices = words
+            # Longest first so "self employed" wins over "employed"
+            keys = sorted(words, key=len, reverse=True)
+            self.pattern = re.compile(r"(?<![\w-])(" + "|".join(re.escape(k) for k in keys) + r")(?![\w-])")
+
+    def parse(self, text: str, alone: bool = True) -> Any:
+        """Value for this field in a reply, or None; alone=False when other fields were asked too"""
+        lower = text.strip().lower()
+        if self.kind == "contact":
+            match = self._contact_match(text)
+            return match[1] if match else None
+        if self.kind == "choice":
+            match = self.pattern.search(lower)
+            if match:
+                return self.choices[match.group(1)]
+            if alone and lower.isdigit() and 1 <= int(lower) <= len(self.options):
+                return self.options[int(lower) - 1]
+            return None
+        if self.kind == "yesno":
+            if _NO.search(lower):
+                return "No"
+            return "Yes" if _YES.search(lower) else None
+
+        if self.none_is_zero and not any(c.isdigit() for c in lower) and _NONE.search(lower):
+            return 0
+        if self.kind == "amount":
+            return parse_amount(lower)
+        match = _NUMBER.search(lower.replace(",", ""))
+        if not match:
+            return None
+        number = float(match.group())
+        if self.kind == "int" or (self.kind == "percent" and number.is_integer()):
+            return int(number)
+        return number
+
+    def unsure(self, text: str) -> bool:
+        """Whether a contact reply was only read as a bare answer, which any short phrase fits"""
+        if self.kind != "contact":
+            return False
+        match = self._contact_match(text)
+        return match is not None and match[2] < KEYWORD_MATCH
+
+    def _contact_match(self, text: str):
+        return _CONTACT_RULES[self.field].apply(Turn(text, [], _CONTACT_QUESTIONS[self.field]))
+
+    def reprompt(self) -> str:
+        return f"Sorry, I didn't catch that. {self.hint}"
+
+
+def _name_slots() -> List[Tuple[Slot, ...]]:
+    return [
+        (Slot("Customer_Name", "May I have your full name?", "contact",
+              hint="Please tell me your full name, e.g. Priya Sharma.",
+              confirm="Just to confirm, is your name {value}? (yes/no)"),),
+        (Slot("Customer_Email", "What is your email address?", "contact"),
+         Slot("Customer_Phone", "What is your 10-digit mobile number?", "contact",
+              hint="Please share your 10-digit mobile number, e.g. 9876543210.")),
+    ]
+
+
+def _age(low: int, high: int) -> Slot:
+    return Slot("Age", "How old are you?", "int", hint=f"Please reply with your age in years ({low}-{high}).")
+
+
+def _cibil(field: str) -> Slot:
+    return Slot(field, "What is your CIBIL score?", "int", hint="Please reply with your CIBIL score, a number between 300 and 900.")
+
+
+def _years(field: str, question: str, low: int, high: int) -> Slot:
+    return Slot(field, question, "int", hint=f"Please reply with a number of years between {low} and {high}.")
+
+
+def _amount(field: str, question: str, none_is_zero: bool = False) -> Slot:
+    return Slot(field, question, "amount", none_is_zero=none_is_zero,
+                hint=f"{question} You can reply like 850000, 8.5 lakh or 1.2 crore.")
+
+
+_TIERS = {"tier 1": "Tier1", "tier-1": "Tier1", "tier 2": "Tier2", "tier-2": "Tier2", "tier 3": "Tier3", "tier-3": "Tier3"}
+
+DIALOGS: Dict[str, List[Tuple[Slot, ...]]] = {
+    "education": _name_slots() + [
+        (_age(18, 35),),
+        (Slot("Academic_Score", "What was your academic score as a percentage?", "percent",
+              hint="Please reply with your academic score out of 100, e.g. 82."),),
+        (Slot("Intended_Course", "Which course will you study: STEM, MBA, Medicine, Finance, Law, Arts or Other?", "choice",
+              options=("STEM", "MBA", "Medicine", "Finance", "Law", "Arts", "Other"),
+              aliases={"medical": "Medicine", "engineering": "STEM", "science": "STEM"}),
+         Slot("University_Tier", "Is the university Tier 1, Tier 2 or Tier 3?", "choice",
+              options=("Tier1", "Tier2", "Tier3"), aliases=_TIERS)),
+        (_amount("Coapplicant_Income", "What is your co-applicant's annual income?"),),
+        (_amount("Guarantor_Networth", "What is your guarantor's net worth?"),),
+        (_cibil("CIBIL_Score"),),
+        (Slot("Loan_Type", "Would you like a Secured or Unsecured loan?", "choice", options=("Secured", "Unsecured")),),
+        (_years("Loan_Term", "Over how many years would you like to repay the loan?", 1, 15),),
+        (_amount("Expected_Loan_Amount", "How much would you like to borrow?"),),
+    ],
+    "home": _name_slots() + [
+        (_age(21, 50),),
+        (_amount("Income", "What is your monthly income?"),),
+        (_amount("Guarantor_income", "What is your guarantor's monthly income? Reply 0 if you don't have a guarantor.",
+                 none_is_zero=True),),
+        (_years("Tenure", "Over how many years would you like to repay the loan?", 5, 30),),
+        (_cibil("CIBIL_score"),),
+        (Slot("Employment_type", "Are you Salaried, Self-Employed, a Business Owner or a Government Employee?", "choice",
+              options=("Salaried", "Self-Employed", "Business Owner", "Government Employee"),
+              aliases={"self employed": "Self-Employed", "business": "Business Owner",
+                       "government": "Government Employee", "govt": "Government Employee"}),),
+        (_amount("Down_payment", "How much can you pay as a down payment? Reply 0 if none.", none_is_zero=True),),
+        (_amount("Existing_total_EMI", "How much do you pay each month in EMIs on existing loans? Reply 0 if none.",
+                 none_is_zero=True),),
+        (_amount("Loan_amount_requested", "How much would you like to borrow?"),),
+        (_amount("Property_value", "What is the value of the property you're buying?"),),
+    ],
+    "personal": _name_slots() + [
+        (_age(21, 65),),
+        (Slot("Employment_Type", "Are you Salaried or Self-Employed?", "choice", options=("Salaried", "Self-Employed"),
+              aliases={"self employed": "Self-Employed", "business": "Self-Employed"}),),
+        (_years("Employment_Duration_Years", "How many years have you been working?", 1, 45),),
+        (_amount("Annual_Income", "What is your annual income?"),),
+        (_cibil("CIBIL_Score"),),
+        (_amount("Existing_EMIs", "How much do you pay each month in EMIs on existing loans? Reply 0 if none.",
+                 none_is_zero=True),),
+        (_years("Loan_Term_Years", "Over how many years would you like to repay the loan?", 1, 7),),
+        (_amount("Expected_Loan_Amount", "How much would you like to borrow?"),),
+    ],
+    "gold": _name_slots() + [
+        (_age(21, 75),),
+        (_amount("Annual_Income", "What is your annual income?"),),
+        (_cibil("CIBIL_Score"),),
+        (Slot("Occupation", "Are you Salaried, in Business, Self-employed or Retired?", "choice",
+              options=("Salaried", "Business", "Self-employed", "Retired"),
+              aliases={"self employed": "Self-employed", "self-employed": "Self-employed"}),),
+        (_amount("Gold_Value", "What is the current market value of your gold?"),),
+        (_amount("Loan_Amount", "How much would you like to borrow?"),),
+        (_years("Loan_Tenure", "Over how many years would you like to repay the loan?", 1, 3),),
+    ],
+    "business": _name_slots() + [
+        (_years("Business_Age_Years", "How many years has your business been operating?", 1, 50),),
+        (_amount("Annual_Revenue", "What is your business's annual revenue?"),),
+        (_amount("Net_Profit", "What was your net profit last year?"),),
+        (_cibil("CIBIL_Score"),),
+        (Slot("Business_Type", "Is your business in Retail, Trading, Services or Manufacturing?", "choice",
+              options=("Retail", "Trading", "Services", "Manufacturing"),
+              aliases={"service": "Services", "manufacture": "Manufacturing"}),),
+        (_amount("Existing_Loan_Amount", "How much do you owe on existing business loans? Reply 0 if none.",
+                 none_is_zero=True),),
+        (_years("Loan_Tenure_Years", "Over how many years would you like to repay the loan?", 1, 10),),
+        (Slot("Has_Collateral", "Can you offer collateral for the loan (yes or no)?", "yesno"),),
+        (Slot("Has_Guarantor", "Do you have a guarantor (yes or no)?", "yesno"),),
+        (Slot("Industry_Risk_Rating", "Which industry are you in: Healthcare, FMCG, IT Services, Education, Automobile, "
+                                      "Telecom, Real Estate, Hospitality, Crypto or Airlines?", "choice",
+              options=("Healthcare", "FMCG", "IT Services", "Education", "Automobile", "Telecom", "Real Estate",
+                       "Hospitality", "Crypto", "Airlines"),
+              aliases={"software": "IT Services", "health": "Healthcare", "hotel": "Hospitality",
+                       "auto": "Automobile", "property": "Real Estate"}),
+         Slot("Location_Tier", "Is the business in a Tier-1, Tier-2 or Tier-3 city, or in a rural area?", "choice",
+              options=("Tier-1 City", "Tier-2 City", "Tier-3 City", "Rural"),
+              aliases={"tier 1": "Tier-1 City", "tier-1": "Tier-1 City", "tier 2": "Tier-2 City",
+                       "tier-2": "Tier-2 City", "tier 3": "Tier-3 City", "tier-3": "Tier-3 City", "village": "Rural"})),
+        (_amount("Expected_Loan_Amount", "How much would you like to borrow?"),),
+    ],
+    "car": _name_slots() + [
+        (_age(18, 80),),
+        (_amount("applicant_annual_salary", "What is your annual salary?"),),
+        (_amount("Coapplicant_Annual_Income", "What is your co-applicant's annual income? Reply 0 if there is no co-applicant.",
+                 none_is_zero=True),),
+        (_cibil("CIBIL"),),
+        (Slot("Car_Type", "Which type of car are you buying: Sedan, SUV, Hatchback or Coupe?", "choice",
+              options=("Sedan", "SUV", "Hatchback", "Coupe")),),
+        (Slot("down_payment_percent", "What percentage of the price will you pay as a down payment?", "percent",
+              hint="Please reply with the down payment as a percentage, e.g. 20."),),
+        (_years("Tenure", "Over how many years would you like to repay the loan?", 1, 7),),
+        (_amount("loan_amount", "How much would you like to borrow?"),),
+    ],
+}
+
+
+class SlotFillingDialog:
+    """Question-by-question dialog over a service's required fields (no OpenAI calls)
+
+    The fields being waited for live in state["dialog"], so the dialog object
+    itself is stateless and shared by all sessions of a loan type.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        groups = DIALOGS.get(service.extraction_profile, _name_slots())
+        self.slots: Dict[str, Slot] = {slot.field: slot for group in groups for slot in group}
+        self.group_of: Dict[str, Tuple[str, ...]] = {
+            slot.field: tuple(s.field for s in group) for group in groups for slot in group
+        }
+        for field in service.get_required_fields():
+            if field not in self.slots:
+                label = field.replace("_", " ").lower()
+                self.slots[field] = Slot(field, f"What is your {label}?")
+                self.group_of[field] = (field,)
+
+    def start(self, state: Dict[str, Any]) -> str:
+        """Opening message; asks for the first required field"""
+        first = self.service.get_required_fields()[0]
+        state["dialog"] = {"mode": "slots", "asking": [first], "reprompts": 0}
+        if first == "Customer_Name":
+            return self.service.get_fallback_greeting()
+        return self.slots[first].question
+
+    def parse(self, state: Dict[str, Any], message: str) -> Dict[str, Any]:
+        """Values for the fields the last question asked for"""
+        dialog = state.get("dialog", {})
+        pending = dialog.pop("confirm", None)
+        if pending:
+            lower = message.lower()
+            if _YES.search(lower) and not _NO.search(lower):
+                return dict(pending)
+            # Anything else is a new attempt at the same question
+        asking = dialog.get("asking", [])
+        alone = len(asking) == 1
+        extracted = {}
+        for field in asking:
+            slot = self.slots[field]
+            value = slot.parse(message, alone)
+            if value is None:
+                continue
+            if slot.confirm and slot.unsure(message):
+                dialog["confirm"] = {field: value}
+            else:
+                extracted[field] = value
+        return extracted
+
+    def question(self, missing_fields: List[str]) -> str:
+        """The question for the first missing field and any still-missing fields grouped with it"""
+        asking = self._asking(missing_fields)
+        return " ".join(self.slots[field].question for field in asking)
+
+    def next_question(self, state: Dict[str, Any], missing_fields: List[str], recorded: Dict[str, Any]) -> str:
+        """Ask for the next fields, or re-ask with a hint if the reply gave nothing usable"""
+        dialog = state.setdefault("dialog", {"mode": "slots", "asking": [], "reprompts": 0})
+        pending = dialog.get("confirm")
+        if pending:
+            field, value = next(iter(pending.items()))
+            return self.slots[field].confirm.format(value=value)
+        asking = self._asking(missing_fields)
+        if not recorded and asking == dialog.get("asking"):
+            dialog["reprompts"] = dialog.get("reprompts", 0) + 1
+            message = " ".join(self.slots[field].reprompt() if i == 0 else self.slots[field].hint
+                               for i, field in enumerate(asking))
+            # Still stuck on a single choice: number the options so "2" is enough
+            options = self.slots[asking[0]].options if len(asking) == 1 else ()
+            if options and dialog["reprompts"] >= MAX_REPROMPTS_BEFORE_OPTIONS:
+                message += " Options: " + ", ".join(f"{i}. {option}" for i, option in enumerate(options, 1))
+            return message
+        dialog["asking"] = asking
+        dialog["reprompts"] = 0
+        return " ".join(self.slots[field].question for field in asking)
+
+    def _asking(self, missing_fields: List[str]) -> List[str]:
+        if not missing_fields:
+            return []
+        missing = set(missing_fields)
+        return [field for field in self.group_of.get(missing_fields[0], (missing_fields[0],)) if field in missing]
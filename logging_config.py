@@ -0,0 +1,149 @@
+"""
+Logging setup for the loan chatbot APIs and command-line tools.
+
+Modules log through logging.getLogger(__name__); configure_logging() wires the
+root logger once per process from environment variables:
+    LOG_LEVEL         root level (default INFO)
+    LOG_LEVELS        per-logger overrides, e.g. "loan_services=DEBUG,customer_data=WARNING"
+    LOG_FORMAT        "text" (default) or "json" (one object per line)
+    LOG_DEBUG_SAMPLE  fraction of DEBUG records kept (default 1.0)
+    LOG_DEBUG_RATE    max DEBUG records per second from any one call site (default 20, 0 = no limit)
+
+Records pass through a QueueHandler into a bounded in-memory queue; a single
+listener thread formats them and writes to stderr, so request threads never
+wait on stream I/O. When the queue is full records are dropped and counted.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import logging.handlers
+from typing import Dict, Any, Optional, Tuple
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+_configure_lock = threading.Lock()
+
+
+class DebugSampler(logging.Filter):
+    """Keeps every INFO+ record; samples DEBUG records and caps them per call site per second"""
+
+    def __init__(self, sample_rate: float = 1.0, per_second: int = 0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.per_second = per_second
+        # (logger name, line) -> (window start, records emitted in that window)
+        self._windows: Dict[Tuple[str, int], Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.suppressed += 1
+            return False
+        if not self.per_second:
+            return True
+
+        key = (record.name, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            start, count = self._windows.get(key, (now, 0))
+            if now - start >= 1.0:
+                start, count = now, 0
+            if count >= self.per_second:
+                self.suppressed += 1
+                return False
+            self._windows[key] = (start, count + 1)
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of raising when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: Optional[str] = None):
+    """Install the queue-backed root handler (idempotent)"""
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        stream = logging.StreamHandler(sys.stderr)
+        if os.getenv("LOG_FORMAT", "text").lower() == "json":
+            stream.setFormatter(JsonFormatter())
+        else:
+            stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=10000))
+        _queue_handler.addFilter(DebugSampler(
+            sample_rate=float(os.getenv("LOG_DEBUG_SAMPLE", "1.0")),
+            per_second=int(os.getenv("LOG_DEBUG_RATE", "20")),
+        ))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+        for name, logger_level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(name).setLevel(logger_level)
+
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Records dropped on a full queue and DEBUG records suppressed by sampling"""
+    if _queue_handler is None:
+        return {"configured": False}
+    sampler = next(f for f in _queue_handler.filters if isinstance(f, DebugSampler))
+    return {
+        "configured": True,
+        "level": logging.getLevelName(logging.getLogger().level),
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+        "debug_suppressed": sampler.suppressed,
+    }
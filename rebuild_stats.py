@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Recompute the running application statistics served by /admin/stats.
+
+Uses MongoDB when MONGODB_URI is set and reachable, otherwise local file storage.
+    python rebuild_stats.py              # recompute stats from stored applications
+    python rebuild_stats.py --reindex    # local storage: also rescan the JSON files
+"""
+
+import argparse
+from dotenv import load_dotenv
+
+from customer_data.storage_manager import CustomerDataManager
+from logging_config import configure_logging
+
+
+def get_storage_manager():
+    """MongoDB storage if configured and connected, local storage otherwise"""
+    try:
+        from customer_data.mongodb_storage_manager import MongoDBStorageManager
+        storage = MongoDBStorageManager()
+        if storage._is_connected():
+            print("✅ Using MongoDB storage")
+            return storage
+    except Exception as e:
+        print(f"⚠️  MongoDB unavailable ({e})")
+    print("📁 Using local file storage")
+    return CustomerDataManager()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reindex", action="store_true", help="rescan local application files before rebuilding")
+    args = parser.parse_args()
+
+    load_dotenv()
+    configure_logging()
+    storage = get_storage_manager()
+
+    if args.reindex and isinstance(storage, CustomerDataManager):
+        print(f"Indexed {storage.rebuild_index()} application files")
+    storage.rebuild_stats()
+
+    for loan_type, stats in storage.get_all_stats().items():
+        print(f"{loan_type:<10} total={stats['total']:<6} completed={stats['completed']:<6} "
+              f"approved={stats['approved']:<6} partial={stats['partial']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+"""
+Chat session storage for the loan chatbot APIs.
+
+SESSION_BACKEND selects the backend:
+    memory  - in-process LRU with idle TTL (default)
+    sqlite  - LRU cache in front of a SQLite file, written behind by a background thread
+    shared  - SQLite file read and written on every access, so any worker process
+              (uvicorn --workers N, or several pods on one volume) can serve any session
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Tuple
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SessionState = Dict[str, Any]
+
+# Returns the system prompt a session was started with, so it can be left out of stored copies
+SystemPromptFor = Callable[[SessionState], Optional[str]]
+
+
+def encode_session(state: SessionState, system_prompt_for: Optional[SystemPromptFor] = None) -> str:
+    """Serialize a session, dropping the leading system prompt when it can be rebuilt on load"""
+    conversation = state.get("conversation") or []
+    if system_prompt_for and conversation and conversation[0].get("role") == "system":
+        try:
+            prompt = system_prompt_for(state)
+        except Exception:
+            prompt = None
+        if prompt is not None and conversation[0].get("content") == prompt:
+            state = dict(state, conversation=conversation[1:], system_prompt_elided=True)
+    return json.dumps(state, ensure_ascii=False, default=str)
+
+
+def decode_session(payload: str, system_prompt_for: Optional[SystemPromptFor] = None) -> SessionState:
+    """Inverse of encode_session"""
+    state = json.loads(payload)
+    if state.pop("system_prompt_elided", False):
+        prompt = system_prompt_for(state) if system_prompt_for else None
+        state["conversation"] = [{"role": "system", "content": prompt or ""}] + state.get("conversation", [])
+    return state
+
+
+class SessionStore(ABC):
+    """Dict-like store of chat session state keyed by session_id"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[SessionState]:
+        """Return the live session state, or None if unknown or expired"""
+        pass
+
+    @abstractmethod
+    def put(self, session_id: str, state: SessionState):
+        """Insert or replace a session"""
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Remove a session"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Size, configuration and eviction counters"""
+        pass
+
+    def save(self, session_id: str, state: Optional[SessionState] = None):
+        """Record changes made to a session returned by get()
+
+        Backends that hand out copies need the modified state passed back in.
+        """
+        if state is None:
+            state = self.get(session_id)
+        if state is not None:
+            self.put(session_id, state)
+
+    def close(self):
+        """Flush pending writes and release resources"""
+        pass
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __getitem__(self, session_id: str) -> SessionState:
+        state = self.get(session_id)
+        if state is None:
+            raise KeyError(session_id)
+        return state
+
+    def __setitem__(self, session_id: str, state: SessionState):
+        self.put(session_id, state)
+
+    def __delitem__(self, session_id: str):
+        self.delete(session_id)
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU bounded by session count and approximate bytes, with idle TTL"""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 7200,
+                 max_bytes: Optional[int] = None, system_prompt_for: Optional[SystemPromptFor] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.system_prompt_for = system_prompt_for
+
+        # session_id -> (state, last_access, approx_bytes); least recently used first
+        self._entries: "OrderedDict[str, Tuple[SessionState, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def _size_of(self, state: SessionState) -> int:
+        if not self.max_bytes:
+            return 0
+        try:
+            return len(encode_session(state, self.system_prompt_for).encode("utf-8"))
+        except (TypeError, ValueError, RuntimeError):
+            return 0
+
+    def _remove(self, session_id: str):
+        _, _, nbytes = self._entries.pop(session_id)
+        self._bytes -= nbytes
+
+    def _purge_expired(self, now: float):
+        # Entries are ordered by last access, so expired ones are all at the front
+        while self._entries:
+            session_id, (_, last_access, _) = next(iter(self._entries.items()))
+            if now - last_access <= self.ttl_seconds:
+                break
+            self._remove(session_id)
+            self.counters["expired"] += 1
+
+    def _evict_over_limits(self):
+        while self._entries and (len(self._entries) > self.max_sessions or
+                                 (self.max_bytes and self._bytes > self.max_bytes and len(self._entries) > 1)):
+            self._remove(next(iter(self._entries)))
+            self.counters["evicted"] += 1
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            state, last_access, nbytes = entry
+            if now - last_access > self.ttl_seconds:
+                self._remove(session_id)
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries[session_id] = (state, now, nbytes)
+            self._entries.move_to_end(session_id)
+            self.counters["hits"] += 1
+            return state
+
+    def put(self, session_id: str, state: SessionState):
+        nbytes = self._size_of(state)
+        now = time.time()
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+            self._entries[session_id] = (state, now, nbytes)
+            self._bytes += nbytes
+            self._purge_expired(now)
+            self._evict_over_limits()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge_expired(time.time())
+            return {
+                "backend": "memory",
+                "sessions": len(self._entries),
+                "approx_bytes": self._bytes if self.max_bytes else None,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                **self.counters,
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Memory LRU in front of a SQLite file; changes are written behind in batches"""
+
+    def __init__(self, db_path: str = "sessions.db", max_sessions: int = 10000, ttl_seconds: float = 7200,
+                 max_bytes: Optional[int] = None, flush_interval: float = 1.0,
+                 system_prompt_for: Optional[SystemPromptFor] = None):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval = flush_interval
+        self.system_prompt_for = system_prompt_for
+        self.cache = MemorySessionStore(max_sessions, ttl_seconds, max_bytes, system_prompt_for)
+
+        # session_id -> state to write, or None to delete
+        self._pending: Dict[str, Optional[SessionState]] = {}
+        self._pending_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.counters = {"loaded": 0, "flushes": 0, "written": 0, "flush_errors": 0}
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at)")
+        self._conn.commit()
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _load(self, session_id: str) -> Optional[SessionState]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE session_id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.ttl_seconds)
+            ).fetchone()
+        if row is None:
+            return None
+        self.counters["loaded"] += 1
+        return decode_session(row[0], self.system_prompt_for)
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        state = self.cache.get(session_id)
+        if state is not None:
+            return state
+
+        with self._pending_lock:
+            if session_id in self._pending:
+                state = self._pending[session_id]
+                if state is None:
+                    return None
+        if state is None:
+            state = self._load(session_id)
+            if state is None:
+                return None
+        self.cache.put(session_id, state)
+        return state
+
+    def put(self, session_id: str, state: SessionState):
+        self.cache.put(session_id, state)
+        with self._pending_lock:
+            self._pending[session_id] = state
+
+    def delete(self, session_id: str):
+        self.cache.delete(session_id)
+        with self._pending_lock:
+            self._pending[session_id] = None
+
+    def flush(self):
+        """Write pending changes to SQLite and drop expired rows"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+
+        now = time.time()
+        upserts: List[Tuple[str, str, float]] = []
+        deletes: List[Tuple[str]] = []
+        retry: Dict[str, Optional[SessionState]] = {}
+        for session_id, state in pending.items():
+            if state is None:
+                deletes.append((session_id,))
+                continue
+            try:
+                upserts.append((session_id, encode_session(state, self.system_prompt_for), now))
+            except (TypeError, ValueError, RuntimeError):
+                # State was mutated by a request while being serialized; pick it up next round
+                retry[session_id] = state
+
+        try:
+            with self._db_lock:
+                if upserts:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)", upserts
+                    )
+                if deletes:
+                    self._conn.executemany("DELETE FROM sessions WHERE session_id = ?", deletes)
+                self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+                self._conn.commit()
+            self.counters["flushes"] += 1
+            self.counters["written"] += len(upserts) + len(deletes)
+        except sqlite3.Error as e:
+            logger.warning("Session flush failed, retrying on the next flush: %s", e)
+            self.counters["flush_errors"] += 1
+            retry.update(pending)
+
+        if retry:
+            with self._pending_lock:
+                for session_id, state in retry.items():
+                    self._pending.setdefault(session_id, state)
+
+    def close(self):
+        self._stop.set()
+        self._flusher.join(timeout=self.flush_interval + 5)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._db_lock:
+            persisted = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            **self.cache.stats(),
+            "backend": "sqlite",
+            "db_path": self.db_path,
+            "persisted_sessions": persisted,
+            "pending_writes": pending,
+            **self.counters,
+        }
+
+
+class SharedSQLiteSessionStore(SessionStore):
+    """Session state kept only in a SQLite file, shared by every process that opens it
+
+    Nothing is cached in-process: get() returns a fresh copy and put()/save() commit
+    immediately, so consecutive turns of one chat can land on different workers.
+    Concurrent writes to the same session are last-writer-wins.
+    """
+
+    def __init__(self, db_path: str = "sessions.db", ttl_seconds: float = 7200,
+                 purge_interval: float = 60.0, system_prompt_for: Optional[SystemPromptFor] = None):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self.system_prompt_for = system_prompt_for
+        self._local = threading.local()
+        # Every thread's connection, so close() can reach the threadpool's too
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        self._last_purge = 0.0
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "expired": 0}
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers in other processes proceed during a write
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False only so close() may close it from another thread
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        row = self._conn().execute(
+            "SELECT state FROM sessions WHERE session_id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.ttl_seconds)
+        ).fetchone()
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        return decode_session(row[0], self.system_prompt_for)
+
+    def put(self, session_id: str, state: SessionState):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)",
+                (session_id, encode_session(state, self.system_prompt_for), now)
+            )
+            if now - self._last_purge > self.purge_interval:
+                self._last_purge = now
+                purged = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+                self.counters["expired"] += purged.rowcount
+        self.counters["writes"] += 1
+
+    def delete(self, session_id: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        # Threads that keep running open a new connection on their next access
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Any]:
+        sessions = self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE updated_at >= ?", (time.time() - self.ttl_seconds,)
+        ).fetchone()[0]
+        return {
+            "backend": "shared",
+            "db_path": self.db_path,
+            "sessions": sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "pid": os.getpid(),
+            **self.counters,
+        }
+
+
+def create_session_store(system_prompt_for: Optional[SystemPromptFor] = None) -> SessionStore:
+    """Build the session store configured by SESSION_* environment variables"""
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    max_sessions = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+    ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", "7200"))
+    max_mb = float(os.getenv("SESSION_MAX_MB", "0"))
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb > 0 else None
+
+    if backend == "sqlite":
+        db_path = os.getenv("SESSION_DB_PATH", "sessions.db")
+        flush_interval = float(os.getenv("SESSION_FLUSH_INTERVAL", "1.0"))
+        logger.info("Using SQLite session store: %s", db_path)
+        return SQLiteSessionStore(db_path, max_sessions, ttl_seconds, max_bytes, flush_interval, system_prompt_for)
+    if backend == "shared":
+        db_path = os.getenv("SESSION_DB_PATH", "sessions.db")
+        logger.info("Using shared SQLite session store: %s", db_path)
+        return SharedSQLiteSessionStore(db_path, ttl_seconds, system_prompt_for=system_prompt_for)
+    if backend != "memory":
+        raise ValueError(f"Unsupported SESSION_BACKEND: {backend}")
+    return MemorySessionStore(max_sessions, ttl_seconds, max_bytes, system_prompt_for)
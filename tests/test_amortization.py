@@ -0,0 +1,40 @@
+import math
+
+import numpy as np
+import pytest
+
+from loan_services import amortization
+
+
+@pytest.mark.parametrize("principal, rate, months, expected", [
+    (100000, 12, 12, 8884.88),      # textbook example: 1 lakh at 12% for a year
+    (1000000, 8.5, 240, 8678.23),   # 10 lakh home loan at 8.5% for 20 years
+    (120000, 0, 12, 10000.00),      # zero interest is principal / months
+])
+def test_emi_matches_known_values(principal, rate, months, expected):
+    assert amortization.emi(principal, rate, months) == pytest.approx(expected, abs=0.01)
+
+
+def test_emi_broadcasts_over_many_loans():
+    payments = amortization.emi([100000, 1000000], [12, 8.5], [12, 240])
+    np.testing.assert_allclose(payments, [8884.88, 8678.23], atol=0.01)
+    assert math.isnan(amortization.emi(100000, 10, 0))
+
+
+def test_schedule_repays_the_principal_with_the_summarized_interest():
+    principal, rates, months = [100000, 250000], [12, 9], [12, 36]
+    rows = amortization.schedule(principal, rates, months)
+    totals = amortization.summarize(principal, rates, months)
+
+    np.testing.assert_allclose(rows["principal"].sum(axis=1), principal)
+    np.testing.assert_allclose(rows["interest"].sum(axis=1), totals["total_interest"], atol=1e-6)
+    np.testing.assert_allclose(rows["payment"][0, :12], totals["emi"][0])
+    # The shorter loan's schedule is zero-padded past its tenure
+    assert rows["payment"].shape == (2, 36) and not rows["payment"][0, 12:].any()
+    assert rows["balance"][1, 35] == pytest.approx(0, abs=1e-6)
+
+
+def test_schedule_table_rounds_one_loan():
+    table = amortization.schedule_table(100000, 12, 12)
+    assert table["month"] == list(range(1, 13))
+    assert table["interest"][0] == 1000.00 and table["balance"][-1] == 0.0
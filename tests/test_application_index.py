@@ -0,0 +1,119 @@
+import json
+import sqlite3
+import multiprocessing
+
+import pytest
+
+from customer_data.application_index import ApplicationIndex
+from customer_data.application_query import normalize_fields, project
+
+
+def write_application(directory, loan_type, n, cibil=700):
+    path = directory / f"{loan_type}_{n}.json"
+    application = {"loan_type": loan_type, "session_id": f"s{n}", "timestamp": f"2026-01-01T00:00:{n:02d}",
+                   "status": "completed", "loan_data": {"CIBIL_Score": cibil + n}}
+    path.write_text(json.dumps(application))
+    return application, str(path)
+
+
+def open_index(db_path, results):
+    try:
+        ApplicationIndex(db_path)
+        results.put(None)
+    except Exception as e:
+        results.put(repr(e))
+
+
+def test_old_index_migrates_once_across_processes(tmp_path):
+    db_path = tmp_path / "index.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("CREATE TABLE applications (file_path TEXT PRIMARY KEY, loan_type TEXT NOT NULL, "
+                 "session_id TEXT, timestamp TEXT NOT NULL, status TEXT, approval_status TEXT, "
+                 "customer_name TEXT, customer_email TEXT, approved_amount REAL, interest_rate REAL, "
+                 "requested_amount REAL)")
+    for n in range(5):
+        _, path = write_application(tmp_path, "education", n)
+        conn.execute("INSERT INTO applications (file_path, loan_type, timestamp, status, approval_status) "
+                     "VALUES (?, 'education', ?, 'completed', 'APPROVED')", (path, f"2026-01-01T00:00:{n:02d}"))
+    conn.commit()
+    conn.close()
+
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=open_index, args=(db_path, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    assert [results.get(timeout=5) for _ in workers] == [None] * 4
+
+    index = ApplicationIndex(db_path)
+    assert len(index.page("education", 10, cibil_min=703)) == 2
+
+
+@pytest.mark.parametrize("fields, expected", [
+    (["loan_data", "loan_data.Age"], ["loan_data"]),
+    (["loan_data.Age", "loan_data"], ["loan_data"]),
+    (["status", "status", "loan_data.Age", "loan_data.Income"], ["status", "loan_data.Age", "loan_data.Income"]),
+    (["loan_data_extra", "loan_data.Age"], ["loan_data_extra", "loan_data.Age"]),
+])
+def test_overlapping_fields_are_normalized(fields, expected):
+    assert normalize_fields(fields) == expected
+
+
+def test_project_with_overlapping_fields_keeps_the_parent():
+    document = {"loan_data": {"Age": 30, "Income": 5}, "status": "completed"}
+    assert project(document, ["loan_data.Age", "loan_data"]) == {"loan_data": {"Age": 30, "Income": 5}}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    from customer_data.storage_manager import CustomerDataManager
+    return CustomerDataManager(str(tmp_path / "customer_data"))
+
+
+def save(storage, n, created_at, status="APPROVED"):
+    return storage.save_customer_application(
+        "education", f"session{n:04d}", {"name": f"Customer {n}", "email": f"c{n}@example.com"},
+        {"CIBIL_Score": 650 + n}, {"result": {"status": status, "eligible_amount": 1000.0 * n}},
+        created_at=created_at)
+
+
+def page_all(storage, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        applications, cursor = storage.page_applications("education", limit, cursor, **filters)
+        pages.append([a["session_id"] for a in applications])
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_cover_every_application_once_newest_first(storage):
+    # Pairs share a second, so pages must break timestamp ties on the file path
+    for n in range(7):
+        save(storage, n, 1767225600 + n // 2)
+    pages = page_all(storage, 3)
+    seen = [sid for page in pages for sid in page]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert seen == [f"session{n:04d}" for n in range(6, -1, -1)]
+
+
+def test_keyset_pages_apply_filters(storage):
+    for n in range(6):
+        save(storage, n, 1767225600 + n, status="APPROVED" if n % 2 else "REJECTED")
+    pages = page_all(storage, 2, approval_status="APPROVED", cibil_min=652)
+    # A full last page still returns a cursor; the page after it is empty
+    assert pages == [["session0005", "session0003"], []]
+
+
+def test_rebuild_indexes_files_copied_in_by_hand(storage, tmp_path):
+    for n in range(3):
+        save(storage, n, 1767225600 + n)
+    applications = storage.base_path / "education" / "applications"
+    copied = json.loads(next(applications.glob("*.json")).read_text())
+    copied["session_id"] = "copied"
+    (applications / "20260101_000010_copied.json").write_text(json.dumps(copied))
+
+    assert storage.rebuild_index() == 4
+    assert sum(len(page) for page in page_all(storage, 2)) == 4
+    assert storage.get_application_stats("education")["total"] == 4
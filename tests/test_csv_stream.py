@@ -0,0 +1,66 @@
+import csv
+import gzip
+import io
+from datetime import datetime
+
+import pytest
+
+from customer_data.csv_stream import BASE_COLUMNS, gzip_chunks, iter_csv_chunks, write_csv
+
+
+def rows(count):
+    return ({"session_id": f"s{n}", "status": "completed", "note": 'quoted, "text"'} for n in range(count))
+
+
+def parse(payload: bytes):
+    return list(csv.DictReader(io.StringIO(payload.decode("utf-8"))))
+
+
+def test_chunks_hold_rows_per_chunk_rows_and_one_header():
+    chunks = list(iter_csv_chunks(rows(5), rows_per_chunk=2))
+    assert len(chunks) == 3
+    assert chunks[0].startswith(b"session_id,status,note\r\n") and not chunks[1].startswith(b"session_id")
+    parsed = parse(b"".join(chunks))
+    assert [row["session_id"] for row in parsed] == [f"s{n}" for n in range(5)]
+    assert parsed[0]["note"] == 'quoted, "text"'
+
+
+def test_fieldnames_fix_the_columns():
+    parsed = parse(b"".join(iter_csv_chunks(rows(2), fieldnames=["status", "session_id", "missing"])))
+    assert list(parsed[0]) == ["status", "session_id", "missing"] and parsed[0]["missing"] == ""
+
+
+def test_no_rows_still_yields_a_header():
+    assert b"".join(iter_csv_chunks(iter([]))).decode("utf-8").strip() == ",".join(BASE_COLUMNS)
+
+
+def test_gzip_stream_decompresses_to_the_plain_csv():
+    plain = b"".join(iter_csv_chunks(rows(1000), rows_per_chunk=100))
+    assert gzip.decompress(b"".join(gzip_chunks(iter_csv_chunks(rows(1000), rows_per_chunk=100)))) == plain
+
+
+def test_write_csv_returns_bytes_written(tmp_path):
+    path = tmp_path / "export.csv"
+    assert write_csv(path, rows(3)) == path.stat().st_size
+    assert len(parse(path.read_bytes())) == 3
+
+
+def test_export_rows_filter_on_naive_utc_timestamps(tmp_path):
+    from customer_data.storage_manager import CustomerDataManager
+    storage = CustomerDataManager(str(tmp_path / "customer_data"))
+    for n, created_at in enumerate([1767225599, 1767225600, 1767311999, 1767312000]):  # around 2026-01-01/02 UTC
+        storage.save_customer_application("home", f"session{n}", {"name": f"C{n}"}, {}, None, created_at=created_at)
+    exported = storage.iter_export_rows("home", start=datetime(2026, 1, 1), end=datetime(2026, 1, 2))
+    assert [row["session_id"] for row in exported] == ["session1", "session2"]
+
+
+@pytest.mark.parametrize("value, end_of_range, expected", [
+    ("2026-01-01", False, datetime(2026, 1, 1)),
+    ("2026-01-01", True, datetime(2026, 1, 2)),
+    ("2026-01-01T05:30:00+05:30", False, datetime(2026, 1, 1)),
+    ("2026-01-01T10:00:00Z", True, datetime(2026, 1, 1, 10)),
+])
+def test_export_dates_parse_to_naive_utc(value, end_of_range, expected):
+    pytest.importorskip("fastapi")
+    from loan_app import _parse_export_date
+    assert _parse_export_date(value, end_of_range) == expected
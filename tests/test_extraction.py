@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import pytest
+
+from loan_services.extraction import engine_for, BARE_ANSWER, KEYWORD_MATCH
+from loan_services.slot_filling import SlotFillingDialog
+
+
+def route(profile, question, reply):
+    return engine_for(profile).route(reply, [{"role": "assistant", "content": question}], KEYWORD_MATCH)
+
+
+def test_bare_amount_answers_the_asked_field():
+    assert route("car", "How much loan amount do you need?", "8 lakh") == ({"loan_amount": 800000}, BARE_ANSWER)
+    assert route("car", "How much loan amount do you need?", "rs 12,50,000")[0] == {"loan_amount": 1250000}
+
+
+def test_amount_for_another_field_is_not_a_bare_answer():
+    extracted, confidence = route("car", "How much loan amount do you need?", "salary is 8 lakh")
+    assert confidence < KEYWORD_MATCH
+    assert "loan_amount" not in extracted
+
+
+def test_confident_turn_drops_matches_sharing_the_asked_value():
+    extracted, confidence = route("car", "How much loan amount do you need?", "I want 8 lakh loan, my salary")
+    assert confidence >= KEYWORD_MATCH
+    assert extracted == {"loan_amount": 800000}
+
+
+def test_confident_turn_keeps_separate_keyword_matches():
+    extracted, confidence = route("education", "What is your CIBIL score?", "cibil 750, I am 24 years old")
+    assert confidence >= KEYWORD_MATCH
+    assert extracted == {"CIBIL_Score": 750, "Age": 24}
+
+
+@pytest.mark.parametrize("reply", ["skip this", "Priya Sharma"])
+def test_bare_name_is_not_confident(reply):
+    extracted, confidence = route("education", "May I have your full name?", reply)
+    assert confidence < KEYWORD_MATCH
+    assert "Customer_Name" in extracted  # still available as a fallback
+
+
+def test_introduced_name_is_confident():
+    assert route("education", "May I have your full name?", "My name is Priya Sharma") == (
+        {"Customer_Name": "Priya Sharma"}, 0.9)
+
+
+@pytest.fixture
+def dialog():
+    service = SimpleNamespace(extraction_profile="car", get_fallback_greeting=lambda: "Hello!",
+                              get_required_fields=lambda: ["Customer_Name", "Customer_Email", "Customer_Phone"])
+    return SlotFillingDialog(service)
+
+
+def answer(dialog, state, message):
+    extracted = dialog.parse(state, message)
+    state["user_profile"].update(extracted)
+    missing = [f for f in dialog.service.get_required_fields() if f not in state["user_profile"]]
+    return extracted, dialog.next_question(state, missing, extracted)
+
+
+def test_slot_dialog_confirms_bare_names(dialog):
+    state = {"user_profile": {}}
+    dialog.start(state)
+    assert answer(dialog, state, "skip this") == ({}, "Just to confirm, is your name Skip This? (yes/no)")
+    extracted, question = answer(dialog, state, "no")
+    assert extracted == {} and "full name" in question
+    answer(dialog, state, "priya sharma")
+    assert answer(dialog, state, "yes")[0] == {"Customer_Name": "Priya Sharma"}
+
+
+def test_slot_dialog_records_introduced_names(dialog):
+    state = {"user_profile": {}}
+    dialog.start(state)
+    assert answer(dialog, state, "I'm Priya Sharma")[0] == {"Customer_Name": "Priya Sharma"}
@@ -0,0 +1,80 @@
+import os
+import multiprocessing
+
+import pytest
+
+from customer_data.file_lock import try_lock
+from customer_data.outbox import ApplicationOutbox
+
+
+def job(i):
+    return {"session_id": f"s{i}", "version": 1}
+
+
+@pytest.fixture
+def outboxes(tmp_path):
+    first = ApplicationOutbox(str(tmp_path), segment_records=2)
+    second = ApplicationOutbox(str(tmp_path), segment_records=2)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_pending_clears_when_another_instance_replays(outboxes):
+    first, second = outboxes
+    first.append([job(1), job(2)])  # fills and seals a segment
+    assert first.stats()["pending"] == 2 and first.append_if_pending([job(3)])
+
+    saved = []
+    second.drain(saved.extend)
+    assert [j["session_id"] for j in saved] == ["s1", "s2"]
+    # The live active segment holding s3 is left to its owner
+    assert first.stats()["pending"] == 1
+
+    first.drain(saved.extend)
+    assert [j["session_id"] for j in saved] == ["s1", "s2", "s3"]
+    assert first.stats()["pending"] == 0 and not first.append_if_pending([job(4)])
+    assert not first.has_segments()
+
+
+def test_failed_replay_keeps_the_segment_pending(outboxes):
+    first, second = outboxes
+    first.append([job(1), job(2)])
+
+    def down(jobs):
+        raise ConnectionError("mongodb down")
+
+    with pytest.raises(ConnectionError):
+        second.drain(down)
+    assert first.stats()["pending"] == 2 and first.append_if_pending([job(3)])
+
+
+def write_and_die(directory):
+    outbox = ApplicationOutbox(directory)
+    outbox.append([job(1), job(2), job(3)])
+    os._exit(0)  # no close(): the segment is left .active
+
+
+def test_segment_of_an_exited_process_is_recovered_and_replayed(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    writer = ctx.Process(target=write_and_die, args=(str(tmp_path),))
+    writer.start()
+    writer.join(10)
+    assert [path.suffix for path in tmp_path.iterdir()] == [".active"]
+
+    outbox = ApplicationOutbox(str(tmp_path))
+    saved = []
+    assert outbox.drain(saved.extend) == 3
+    assert sorted(j["session_id"] for j in saved) == ["s1", "s2", "s3"]
+    assert not outbox.has_segments()
+
+
+def test_new_segments_are_locked_before_they_are_named_active(outboxes):
+    first, second = outboxes
+    first.append([job(1)])
+    active = first._active_path
+    assert active.suffix == ".active" and not list(active.parent.glob("*.creating"))
+    with open(active, "rb") as f:
+        assert not try_lock(f.fileno())  # held by its writer, so recovery leaves it alone
+    second.drain(lambda jobs: None)
+    assert active.exists()
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from customer_data.persistence_queue import PersistenceQueue
+
+
+class Storage:
+    """Records saved applications; save_applications() fails while down is set"""
+
+    def __init__(self, down=False):
+        self.down = down
+        self.saved = []
+        self.lock = threading.Lock()
+
+    def build_application(self, **job):
+        return {"session_id": job["session_id"], "loan_type": job["loan_type"]}
+
+    def save_applications(self, applications):
+        if self.down:
+            raise ConnectionError("storage down")
+        with self.lock:
+            self.saved.extend(a["session_id"] for a in applications)
+        return [a["session_id"] for a in applications]
+
+
+@pytest.fixture
+def spill_path(tmp_path):
+    return str(tmp_path / "pending.ndjson")
+
+
+def enqueue(queue, count, prefix="s"):
+    for n in range(count):
+        queue.enqueue("home", f"{prefix}{n}", {}, {})
+
+
+def test_queued_applications_are_written_in_batches(spill_path):
+    storage = Storage()
+    queue = PersistenceQueue(storage, batch_size=10, flush_interval=0.01, spill_path=spill_path)
+    try:
+        enqueue(queue, 25)
+        assert queue.flush(5)
+        assert sorted(storage.saved) == sorted(f"s{n}" for n in range(25))
+        assert queue.stats()["batches"] >= 3 and queue.stats()["spill_file"] is None
+    finally:
+        queue.close()
+
+
+def wait_for(condition, timeout=5.0):
+    stop = threading.Event()
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return True
+        stop.wait(0.02)
+    return condition()
+
+
+def test_full_queue_spills_and_the_spill_is_replayed(spill_path):
+    storage = Storage(down=True)
+    queue = PersistenceQueue(storage, max_size=1, max_retries=0, flush_interval=0.01, spill_path=spill_path)
+    try:
+        queued = [queue.enqueue("home", f"s{n}", {}, {}) for n in range(5)]
+        assert not all(queued)  # the queue holds one job; the rest went straight to disk
+        assert queue.flush(5) and storage.saved == []
+        storage.down = False
+
+        def replayed():
+            # Returns 0 while the writer thread holds the replay lock
+            queue.replay_spill()
+            return len(storage.saved) == 5
+
+        assert wait_for(replayed)
+        assert sorted(storage.saved) == [f"s{n}" for n in range(5)]
+        assert queue.stats()["spill_file"] is None
+    finally:
+        queue.close()
+
+
+def test_spill_from_one_instance_is_replayed_once_by_two_others(spill_path):
+    failing = PersistenceQueue(Storage(down=True), max_retries=0, flush_interval=0.01, spill_path=spill_path)
+    enqueue(failing, 40)
+    failing.flush(5)
+    failing.close()
+    assert failing.stats()["spill_file"] == spill_path
+
+    storage = Storage()
+    # Replayed by their writer threads as soon as they are idle, racing for the spill file
+    replayers = [PersistenceQueue(storage, flush_interval=0.01, spill_path=spill_path) for _ in range(2)]
+    try:
+        assert wait_for(lambda: len(storage.saved) >= 40 and replayers[0].stats()["spill_file"] is None)
+        assert sorted(storage.saved) == sorted(f"s{n}" for n in range(40))
+        assert sum(r.stats()["replayed"] for r in replayers) == 40
+    finally:
+        for replayer in replayers:
+            replayer.close()
@@ -0,0 +1,42 @@
+from loan_services.prompt_window import ConversationWindow, message_tokens
+
+
+SYSTEM = {"role": "system", "content": "You are a loan assistant."}
+
+
+def chat(turns, words=50):
+    conversation = [SYSTEM]
+    for n in range(turns):
+        conversation.append({"role": "assistant", "content": f"Question {n}? " + "word " * words})
+        conversation.append({"role": "user", "content": f"Answer {n} " + "word " * words})
+    return conversation
+
+
+def test_window_keeps_the_last_turns_and_the_fixed_prefix():
+    window = ConversationWindow(max_turns=2, token_budget=10000)
+    conversation = chat(10)
+    messages = window.build(conversation, {"Age": 30}, ["Income"], "INSTRUCTIONS")
+    assert messages[:2] == [SYSTEM, {"role": "system", "content": "INSTRUCTIONS"}]
+    assert messages[2:-1] == conversation[-4:]
+    assert messages[-1]["content"] == 'Collected so far: {"Age":30}\nStill needed, in order: Income'
+    assert conversation == chat(10)  # the session's conversation is not changed
+
+
+def test_oldest_turns_are_dropped_to_fit_the_token_budget():
+    budget = 300
+    window = ConversationWindow(max_turns=10, token_budget=budget)
+    for turns in (1, 5, 20, 60):
+        messages = window.build(chat(turns), {}, ["Income"], "INSTRUCTIONS")
+        assert message_tokens(messages) <= budget
+        assert messages[-2]["content"].startswith(f"Answer {turns - 1}")  # the latest message is always sent
+    stats = window.stats()
+    assert stats["requests"] == 4 and stats["over_budget"] == 0 and stats["max_prompt_tokens"] <= budget
+    assert stats["messages_dropped"] > 0 and stats["tokens_saved_rate"] > 0
+
+
+def test_latest_message_is_kept_even_over_budget():
+    window = ConversationWindow(max_turns=4, token_budget=10)
+    messages = window.build(chat(3, words=200), {}, ["Income"], "INSTRUCTIONS")
+    assert messages[2]["content"].startswith("Answer 2") and len(messages) == 4
+    assert window.stats()["over_budget"] == 1
+
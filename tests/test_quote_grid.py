@@ -0,0 +1,46 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+import loan_app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    def get_service(loan_type, api_key=None):
+        try:
+            asyncio.get_running_loop()
+            on_event_loop = True
+        except RuntimeError:
+            on_event_loop = False
+        calls.append((loan_type, on_event_loop))
+        return SimpleNamespace(
+            get_prediction_fields=lambda: ["Tenure", "Loan_amount_requested"],
+            predict_grid=lambda profile, axes: {"axes": axes, "profile": profile},
+        )
+
+    monkeypatch.setattr(loan_app.LoanServiceFactory, "get_service", staticmethod(get_service))
+    client = TestClient(loan_app.app)
+    client.calls = calls
+    return client
+
+
+def test_grid_accepts_any_case_loan_type(client):
+    response = client.post("/quote/Home/grid", json={
+        "profile": {"Tenure": "10"}, "axes": {"Tenure": {"start": 5, "stop": 15, "step": 5}}})
+    assert response.status_code == 200
+    assert response.json()["loan_type"] == "home" and response.json()["points"] == 3
+    assert [loan_type for loan_type, _ in client.calls] == ["home"]
+
+
+def test_grid_loads_the_service_off_the_event_loop(client):
+    response = client.post("/quote/home/grid", json={"profile": {}, "axes": {"Loan_amount_requested": [1, 2]}})
+    assert response.status_code == 200
+    assert client.calls and not any(on_loop for _, on_loop in client.calls)
@@ -0,0 +1,122 @@
+import sqlite3
+import threading
+
+import pytest
+
+import session_store
+from session_store import (MemorySessionStore, SQLiteSessionStore, SharedSQLiteSessionStore,
+                           decode_session, encode_session)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store.time, "time", clock)
+    return clock
+
+
+def test_lru_evicts_the_least_recently_used_session(clock):
+    store = MemorySessionStore(max_sessions=2)
+    store.put("a", {"n": 1})
+    store.put("b", {"n": 2})
+    assert store.get("a") == {"n": 1}  # b is now least recently used
+    store.put("c", {"n": 3})
+    assert "b" not in store and "a" in store and "c" in store
+    assert store.stats()["evicted"] == 1
+
+
+def test_byte_limit_evicts_until_the_store_fits(clock):
+    store = MemorySessionStore(max_bytes=100)
+    store.put("a", {"text": "x" * 60})
+    store.put("b", {"text": "y" * 60})
+    assert "a" not in store and "b" in store
+    assert store.stats()["approx_bytes"] <= 100
+
+
+def test_idle_sessions_expire_after_the_ttl(clock):
+    store = MemorySessionStore(ttl_seconds=60)
+    store.put("idle", {})
+    store.put("active", {})
+    clock.now += 45
+    assert store.get("active") == {}
+    clock.now += 30
+    assert store.get("idle") is None and store.get("active") == {}
+    assert store.stats()["expired"] == 1
+
+
+def test_system_prompt_is_left_out_of_stored_copies():
+    state = {"loan_type": "home", "conversation": [{"role": "system", "content": "PROMPT"},
+                                                   {"role": "user", "content": "hi"}]}
+    prompt_for = lambda s: "PROMPT"
+    payload = encode_session(state, prompt_for)
+    assert "PROMPT" not in payload
+    assert decode_session(payload, prompt_for) == state
+
+
+def test_write_behind_flush_persists_puts_and_deletes(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(db_path, flush_interval=3600)
+    store.put("kept", {"n": 1})
+    store.put("dropped", {"n": 2})
+    assert store.stats()["pending_writes"] == 2
+    store.flush()
+    store.delete("dropped")
+    store.close()  # flushes the delete
+
+    reopened = SQLiteSessionStore(db_path, flush_interval=3600)
+    try:
+        assert reopened.get("kept") == {"n": 1}
+        assert reopened.get("dropped") is None
+        assert reopened.stats()["persisted_sessions"] == 1
+    finally:
+        reopened.close()
+
+
+def test_sessions_evicted_from_the_cache_load_from_sqlite(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), max_sessions=1, flush_interval=3600)
+    try:
+        store.put("a", {"n": 1})
+        store.put("b", {"n": 2})  # evicts a from memory before it was flushed
+        assert store.get("a") == {"n": 1}
+        store.flush()
+        store.put("c", {"n": 3})
+        assert store.get("b") == {"n": 2} and store.stats()["loaded"] == 1
+    finally:
+        store.close()
+
+
+def test_shared_store_serves_sessions_across_instances(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    first, second = SharedSQLiteSessionStore(db_path), SharedSQLiteSessionStore(db_path)
+    try:
+        first.put("s", {"turn": 1})
+        state = second.get("s")
+        state["turn"] = 2
+        second.save("s", state)
+        assert first.get("s") == {"turn": 2}
+    finally:
+        first.close()
+        second.close()
+
+
+def test_shared_store_close_closes_every_thread_connection(tmp_path):
+    store = SharedSQLiteSessionStore(str(tmp_path / "sessions.db"))
+    threads = [threading.Thread(target=store.put, args=(f"s{i}", {"n": i})) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    connections = list(store._conns)
+    assert len(connections) == 4  # the constructor's thread and the three writers
+    store.close()
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
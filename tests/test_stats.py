@@ -0,0 +1,59 @@
+import pytest
+
+from customer_data.stats import COUNTERS, application_contribution, summarize
+
+
+@pytest.fixture
+def storage(tmp_path):
+    from customer_data.storage_manager import CustomerDataManager
+    return CustomerDataManager(str(tmp_path / "customer_data"))
+
+
+RESULTS = [
+    {"result": {"status": "APPROVED", "eligible_amount": 500000, "interest_rate": 9.5}},
+    {"result": {"status": "PARTIAL_APPROVAL", "approved_amount": 200000, "interest_rate": 11.0}},
+    {"result": {"status": "REJECTED"}},
+    None,  # incomplete application
+]
+
+
+def applications(storage, loan_type, count):
+    return [storage.build_application(loan_type, f"{loan_type}{n:04d}", {"name": f"Customer {n}"},
+                                      {"CIBIL_Score": 700}, RESULTS[n % len(RESULTS)], created_at=1767225600 + n)
+            for n in range(count)]
+
+
+def recompute(apps):
+    """Aggregates summed from scratch, the way a full rebuild sees them"""
+    totals = {c: 0 for c in COUNTERS}
+    extremes = {}
+    for application in apps:
+        contribution = application_contribution(application)
+        for c in COUNTERS:
+            totals[c] += contribution[c]
+        for c, pick in (("amount_min", min), ("amount_max", max), ("interest_min", min), ("interest_max", max)):
+            if contribution[c] is not None:
+                extremes[c] = pick(extremes.get(c, contribution[c]), contribution[c])
+    return summarize({**totals, **extremes})
+
+
+def test_running_stats_match_a_full_recompute(storage):
+    apps = applications(storage, "education", 10)
+    for start in range(0, len(apps), 3):
+        storage.save_applications(apps[start:start + 3])
+    # Re-saving sessions replaces their files' contributions instead of adding them again
+    storage.save_applications(apps[:2])
+
+    running = storage.get_application_stats("education")
+    assert running == recompute(apps)
+    storage.rebuild_stats()
+    assert storage.get_application_stats("education") == running
+
+
+def test_recompute_handles_loan_types_without_completed_applications(storage):
+    apps = [dict(application, prediction_result=None, status="incomplete")
+            for application in applications(storage, "home", 3)]
+    storage.save_applications(apps)
+    storage.rebuild_stats()
+    assert storage.get_application_stats("home") == recompute(apps)
+    assert storage.get_application_stats("home")["total"] == 3